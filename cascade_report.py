@@ -0,0 +1,102 @@
+"""
+Offline report for the moderation cascade.
+Runs prompts through the screening tier and through the full pipeline and
+reports how many prompts escalate, how often the screen agrees with the full
+pipeline, and the time each tier takes.
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def load_prompts(args) -> list:
+    """Prompts from a file (one per line), recent generations in the database, or the parity prompts"""
+    if args.prompts:
+        with open(args.prompts, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    if args.database:
+        with sqlite3.connect(args.database) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT prompt FROM image_generations ORDER BY rowid DESC LIMIT ?", (args.limit,)
+            ).fetchall()
+        return [row[0] for row in rows if row[0]]
+
+    from src.application.content_filter.inference_backend import PARITY_PROMPTS
+    return list(PARITY_PROMPTS)
+
+def full_verdict(transformer_filter, prompt: str) -> bool:
+    """Whether the full two-model pipeline allows a prompt, as ContentFilterService runs it"""
+    is_safe = transformer_filter.check_prompt_for_child_content(prompt)[0]
+    return is_safe and transformer_filter.check_content(prompt)[0]
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the escalation rate and agreement of the moderation cascade')
+    parser.add_argument('--prompts', help='File with one prompt per line')
+    parser.add_argument('--database', help='Database to read recent generation prompts from, e.g. database.db')
+    parser.add_argument('--limit', type=int, default=1000, help='Number of prompts to read from the database')
+    parser.add_argument('--safe-below', type=float, help='Screening band to evaluate (CONTENT_FILTER_SCREEN_SAFE_BELOW)')
+    parser.add_argument('--show', type=int, default=10, help='Number of disagreeing prompts to list')
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ['CONTENT_FILTER_CASCADE'] = 'true'
+    # Every prompt is scored by both tiers, so the cache would only hide the latencies
+    os.environ['CONTENT_FILTER_CACHE_SIZE'] = '0'
+    if args.safe_below is not None:
+        os.environ['CONTENT_FILTER_SCREEN_SAFE_BELOW'] = str(args.safe_below)
+
+    from src.application.content_filter.enhanced_transformer_filter import EnhancedTransformerFilter
+
+    prompts = load_prompts(args)
+    transformer_filter = EnhancedTransformerFilter()
+    screen_classifier = transformer_filter.screen_classifier
+    if screen_classifier is None:
+        print("The screening model could not be loaded")
+        return
+
+    screen_times, full_times = [], []
+    escalated = 0
+    screened_blocked = []  # cleared by the screen but blocked by the full pipeline
+    for prompt in prompts:
+        start = time.perf_counter()
+        clearly_safe, unsafe_score = transformer_filter.screen(prompt, record=False)
+        screen_times.append(time.perf_counter() - start)
+
+        # Run the full pipeline without the screen to get the reference verdict
+        transformer_filter.screen_classifier = None
+        start = time.perf_counter()
+        allowed = full_verdict(transformer_filter, prompt)
+        full_times.append(time.perf_counter() - start)
+        transformer_filter.screen_classifier = screen_classifier
+
+        if not clearly_safe:
+            escalated += 1
+        elif not allowed:
+            screened_blocked.append((unsafe_score, prompt))
+
+    total = len(prompts)
+    screened = total - escalated
+    print(f"\nPrompts: {total}, screening band: unsafe score < {transformer_filter.screen_safe_below}")
+    print(f"Escalated to the full models: {escalated} ({escalated / total:.1%})")
+    print(f"Cleared by the screen: {screened} ({screened / total:.1%})")
+    if screened:
+        print(f"Agreement with the full pipeline on cleared prompts: {1 - len(screened_blocked) / screened:.1%} "
+              f"({len(screened_blocked)} would have been blocked)")
+    print(f"Agreement with the full pipeline overall: {1 - len(screened_blocked) / total:.1%}")
+
+    screen_median = statistics.median(screen_times)
+    full_median = statistics.median(full_times)
+    expected = screen_median + full_median * escalated / total
+    print(f"\nMedian screen time: {screen_median * 1000:.1f} ms, full pipeline: {full_median * 1000:.1f} ms")
+    print(f"Expected time per prompt with the cascade: {expected * 1000:.1f} ms")
+
+    for unsafe_score, prompt in sorted(screened_blocked, reverse=True)[:args.show]:
+        print(f"  cleared at {unsafe_score:.4f} but blocked: {prompt}")
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,13 @@ logger = logging.getLogger(__name__)
 
 client_id = str(uuid.uuid4())
 
+# Phase marks for the job trace, as [phase, time.monotonic()] pairs. The monotonic
+# clock is system-wide, so the bot merges these into the trace it started.
+trace_marks = []
+
+def mark_phase(phase):
+    trace_marks.append([phase, time.monotonic()])
+
 def queue_prompt(server_address, workflow, client_id):
     """Queue a prompt for processing with enhanced validation and debugging"""
     try:
@@ -180,7 +187,7 @@ def send_progress_update(bot_server, request_id, progress_data):
                     timeout=120
                 )
                 if response.status_code == 200:
-                    logger.info(f"Progress update sent: {progress_data}")
+                    logger.debug("Progress update sent for %s: %s", request_id, progress_data.get('status'))
                     return
                 else:
                     logger.warning(f"Progress update failed with status {response.status_code}: {response.text}")
@@ -196,19 +203,23 @@ def send_progress_update(bot_server, request_id, progress_data):
 
 def get_images(server_address, bot_server, request_id, ws, workflow, client_id, is_video=False):
     try:
-        # Record the start time when we send the request to ComfyUI
-        generation_start_time = time.time()
-        logger.info(f"Starting {'video' if is_video else 'image'} generation at {generation_start_time}")
+        logger.info(f"Starting {'video' if is_video else 'image'} generation")
 
         # Initialize variables
         output_images = {}
         last_milestone = 0
+        current_node = None
+        seen_progress = False
 
         # Queue the prompt to ComfyUI
         prompt_response = queue_prompt(server_address, workflow, client_id)
         if 'prompt_id' not in prompt_response:
             raise ValueError("No prompt_id in response from queue_prompt")
 
+        # Generation time is measured from submission to the end of execution
+        mark_phase('submitted')
+        generation_start_time = time.monotonic()
+
         prompt_id = prompt_response['prompt_id']
         logger.info(f"Queued prompt with ID: {prompt_id}")
 
@@ -229,6 +240,7 @@ def get_images(server_address, bot_server, request_id, ws, workflow, client_id,
                     continue
 
                 if message['type'] == 'execution_start':
+                    mark_phase('execution_start')
                     send_progress_update(bot_server, request_id, {
                         "status": "execution",
                         "message": "Starting execution..."
@@ -242,10 +254,16 @@ def get_images(server_address, bot_server, request_id, ws, workflow, client_id,
 
                 elif message['type'] == 'executing':
                     data = message['data']
+                    if data.get('prompt_id') == prompt_id:
+                        # A node finishes when the next one starts executing
+                        if current_node is not None:
+                            mark_phase(f"node_executed:{current_node}")
+                        current_node = data['node']
+
                     if data['node'] is None and data['prompt_id'] == prompt_id:
                         # Record the end time when generation is complete
-                        generation_end_time = time.time()
-                        generation_time = generation_end_time - generation_start_time
+                        mark_phase('execution_end')
+                        generation_time = time.monotonic() - generation_start_time
                         logger.info(f"Image generation completed in {generation_time:.2f} seconds")
 
                         send_progress_update(bot_server, request_id, {
@@ -264,6 +282,9 @@ def get_images(server_address, bot_server, request_id, ws, workflow, client_id,
 
                 elif message['type'] == 'progress':
                     data = message['data']
+                    if not seen_progress:
+                        mark_phase('first_progress')
+                        seen_progress = True
                     current_step = data['value']
                     max_steps = data['max']
                     progress = int((current_step / max_steps) * 100)
@@ -436,10 +457,8 @@ def get_images(server_address, bot_server, request_id, ws, workflow, client_id,
             if not output_images:
                 raise ValueError("No outputs generated from workflow")
 
-        # Calculate final generation time
-        generation_end_time = time.time()
-        generation_time = generation_end_time - generation_start_time
-        logger.info(f"Total image processing completed in {generation_time:.2f} seconds")
+        mark_phase('output_fetched')
+        logger.info(f"Total image processing completed in {time.monotonic() - generation_start_time:.2f} seconds")
 
         # Return both the images and the generation time
         return output_images, generation_time
@@ -448,7 +467,8 @@ def get_images(server_address, bot_server, request_id, ws, workflow, client_id,
         logger.error(f"Error in get_images: {str(e)}")
         send_progress_update(bot_server, request_id, {
             "status": "error",
-            "message": str(e)
+            "message": str(e),
+            "trace": trace_marks
         })
         raise
 
@@ -743,9 +763,12 @@ def send_final_image(bot_server, request_id, images, is_video=False, workflow_fi
         else:
             files = {'image_data': (filename, output_data)}
 
-        # The request_id is sent as form data
+        mark_phase('encoded')
+
+        # The request_id and phase marks are sent as form data
         data = {
             'request_id': request_id,
+            'trace': json.dumps(trace_marks),
         }
 
         logger.info(f"Sending image to http://{bot_server}:8090/send_image")
@@ -1235,7 +1258,8 @@ if __name__ == "__main__":
         if 'request_id' in locals() and 'bot_server' in locals():
             send_progress_update(bot_server, request_id, {
                 'status': 'error',
-                'message': f'Error: {str(e)}'
+                'message': f'Error: {str(e)}',
+                'trace': trace_marks
             })
     finally:
         # Clean up WebSocket connection
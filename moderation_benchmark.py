@@ -0,0 +1,110 @@
+"""
+Moderation model benchmark.
+Loads a moderation model with each inference backend in a separate process
+and reports load time, resident memory, latency and agreement with the fp32
+model on the parity prompts.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Loads the model with one backend, classifies the parity prompts and prints the results as JSON
+PROBE = """
+import json, sys, time
+from src.infrastructure.metrics.metrics_registry import get_process_rss
+from src.application.content_filter.inference_backend import create_classifier, PARITY_PROMPTS
+
+model_path, backend, cache_dir, threads, runs = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5])
+baseline_rss = get_process_rss()
+start = time.perf_counter()
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+tokenizer = AutoTokenizer.from_pretrained(model_path)
+classifier = create_classifier(model, tokenizer, model_path, backend=backend, cache_dir=cache_dir,
+                               num_threads=threads, parity_tolerance=1.0)
+# Drop the fp32 model as the filter does, so the RSS reflects the backend alone
+model = None
+load_time = time.perf_counter() - start
+
+probs = [classifier.predict(prompt).tolist() for prompt in PARITY_PROMPTS]
+latencies = []
+for _ in range(runs):
+    for prompt in PARITY_PROMPTS:
+        started = time.perf_counter()
+        classifier.predict(prompt)
+        latencies.append(time.perf_counter() - started)
+
+print('MODERATION_RESULT ' + json.dumps({
+    'backend': classifier.backend,
+    'load_time': load_time,
+    'rss': get_process_rss() - baseline_rss,
+    'latencies': latencies,
+    'probs': probs
+}))
+"""
+
+def run_backend(python: str, model_path: str, backend: str, cache_dir: str, threads: int, runs: int):
+    """
+    Benchmark one backend in a fresh process.
+
+    Returns:
+        Result dictionary, or None if the probe failed
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    result = subprocess.run(
+        [python, '-c', PROBE, model_path, backend, cache_dir, str(threads), str(runs)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    line = next((line for line in result.stdout.splitlines() if line.startswith('MODERATION_RESULT ')), None)
+    if result.returncode != 0 or line is None:
+        print(f"{backend} probe failed:\n{result.stderr[-2000:]}")
+        return None
+    return json.loads(line[len('MODERATION_RESULT '):])
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the inference backends of a moderation model')
+    parser.add_argument('--model', default='s-nlp/roberta_toxicity_classifier', help='Hub ID or local path of the model')
+    parser.add_argument('--backends', default='torch,quantized,onnx', help='Comma separated backends to compare')
+    parser.add_argument('--runs', type=int, default=5, help='Times to classify each parity prompt')
+    parser.add_argument('--threads', type=int, default=0, help='Inference threads, 0 to choose from the CPUs')
+    parser.add_argument('--cache-dir', default=os.path.join('models', 'onnx'), help='Directory for ONNX exports')
+    parser.add_argument('--python', default=sys.executable, help='Python interpreter to benchmark')
+    args = parser.parse_args()
+
+    results = {}
+    for backend in args.backends.split(','):
+        result = run_backend(args.python, args.model, backend.strip(), args.cache_dir, args.threads, args.runs)
+        if result is not None:
+            if result['backend'] != backend.strip():
+                print(f"{backend} was unavailable, the probe fell back to {result['backend']}")
+            results[backend.strip()] = result
+
+    reference = results.get('torch')
+    print(f"\n{'Backend':<12}{'Load (s)':>10}{'RSS (MB)':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{'Agreement':>11}{'Max diff':>10}")
+    for backend, result in results.items():
+        agreement, max_diff = '', ''
+        if reference is not None:
+            pairs = list(zip(reference['probs'], result['probs']))
+            agreed = sum(ref.index(max(ref)) == got.index(max(got)) for ref, got in pairs)
+            agreement = f"{agreed / len(pairs):.0%}"
+            max_diff = f"{max(abs(a - b) for ref, got in pairs for a, b in zip(ref, got)):.4f}"
+        latencies = result['latencies']
+        print(f"{backend:<12}{result['load_time']:>10.2f}{result['rss'] / 2**20:>10.0f}"
+              f"{statistics.median(latencies) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}"
+              f"{agreement:>11}{max_diff:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,55 @@
 AI service for enhancing prompts.
 """
 
+import asyncio
 import logging
 import os
 import json
-import google.generativeai as genai
-import openai
-from typing import Optional, Dict, Any, Tuple
+import importlib
+import time
+from typing import Optional, Dict, Any, Tuple, List, AsyncIterator, Awaitable, Callable
 
 from src.infrastructure.config.config_manager import ConfigManager
 from src.infrastructure.ai_providers.provider_factory import AIProviderFactory
+from src.infrastructure.database.database_service import DatabaseService
+from src.application.ai.enhancement_cache import EnhancementCache
+from src.application.ai.request_scheduler import LLMRequestScheduler, SchedulerTimeout
+from src.application.ai.provider_health import ProviderHealth
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
 
 logger = logging.getLogger(__name__)
 
+# Called with the text generated so far while an enhancement streams in
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+# SDK modules imported lazily for each provider
+PROVIDER_SDKS = {
+    'gemini': 'google.generativeai',
+    'openai': 'openai',
+}
+
 class AIService:
-    """Service for AI-related functionality"""
+    """
+    Service for AI-related functionality.
+    A single instance lives for the lifetime of the bot, so provider SDKs are
+    configured once rather than for every enhancement.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern to ensure only one AI service exists"""
+        if cls._instance is None:
+            cls._instance = super(AIService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
 
     def __init__(self):
         """Initialize the AI service"""
+        # Only initialize once (singleton pattern)
+        if self._initialized:
+            return
+
         config_manager = ConfigManager()
         self.config = {}
 
@@ -42,22 +74,95 @@ class AIService:
         self.config['openai_api_key'] = os.getenv('OPENAI_API_KEY')
         self.config['xai_api_key'] = os.getenv('XAI_API_KEY')
 
-        # Initialize the appropriate AI provider
-        if self.ai_provider == 'gemini':
-            self._init_gemini()
-        elif self.ai_provider == 'openai':
-            self._init_openai()
-        elif self.ai_provider == 'xai':
-            self._init_xai()
-        elif self.ai_provider == 'lmstudio':
-            self._init_lmstudio()
-        else:
-            logger.warning(f"Unknown AI provider: {self.ai_provider}. Defaulting to Gemini.")
-            self.ai_provider = 'gemini'
+        # Initialize the configured AI providers; with several, the first is preferred
+        # until the others prove faster
+        initializers = {
+            'gemini': self._init_gemini,
+            'openai': self._init_openai,
+            'xai': self._init_xai,
+            'lmstudio': self._init_lmstudio,
+        }
+        self.providers: List[str] = []
+        for provider in config_manager.ai_providers or [self.ai_provider]:
+            if provider not in initializers:
+                logger.warning(f"Unknown AI provider: {provider}")
+            elif provider not in self.providers:
+                initializers[provider]()
+                self.providers.append(provider)
+        if not self.providers:
+            logger.warning("No known AI provider configured. Defaulting to Gemini.")
             self._init_gemini()
+            self.providers.append('gemini')
+        self.ai_provider = self.providers[0]
+        self.config['ai_provider'] = self.ai_provider
 
-        logger.info(f"AI service initialized with provider: {self.ai_provider}")
+        # Cache of enhanced prompts, so repeated enhancements skip the LLM
+        self.enhancement_cache = EnhancementCache(
+            max_entries=config_manager.enhancement_cache_size,
+            ttl=config_manager.enhancement_cache_ttl,
+            database_service=DatabaseService() if config_manager.enhancement_cache_persist else None
+        )
+
+        # Limits concurrent requests to each provider, e.g. one at a time for a local LM Studio model
+        self.schedulers = {
+            provider: LLMRequestScheduler(
+                provider,
+                max_concurrency=config_manager.llm_max_concurrency.get(
+                    provider, config_manager.llm_default_concurrency
+                ),
+                max_wait=config_manager.llm_queue_timeout
+            )
+            for provider in self.providers
+        }
+
+        # Latency and errors of each provider, to pick the fastest healthy one and time hedges
+        self.health = {
+            provider: ProviderHealth(provider, cooldown=config_manager.ai_provider_cooldown)
+            for provider in self.providers
+        }
+        self.hedge_delay = config_manager.ai_hedge_delay
+        self.hedge_min_delay = config_manager.ai_hedge_min_delay
+        registry = MetricsRegistry()
+        self._attempts = registry.counter(
+            "ai_enhancement_attempts_total", "Prompt enhancement requests by provider and outcome",
+            ("provider", "outcome")
+        )
+        self._hedges = registry.counter(
+            "ai_enhancement_hedges_total", "Hedged prompt enhancement requests by provider", ("provider",)
+        )
+
+        logger.info(f"AI service initialized with providers: {', '.join(self.providers)}")
         logger.info(f"Prompt enhancement enabled: {self.enable_prompt_enhancement}")
+        self._initialized = True
+
+    @staticmethod
+    def preload(provider: Optional[str] = None):
+        """
+        Import the SDK of an AI provider ahead of its first use, e.g. from a warm-up task.
+
+        Args:
+            provider: Provider name, defaults to the configured provider
+        """
+        provider = (provider or ConfigManager().ai_provider or 'gemini').lower()
+        module = PROVIDER_SDKS.get(provider)
+        if not module:
+            return
+        try:
+            importlib.import_module(module)
+            logger.info(f"Preloaded {module} for the {provider} provider")
+        except ImportError as e:
+            logger.warning(f"Could not preload {module}: {e}")
+
+    def can_enhance_before_moderation(self) -> bool:
+        """
+        Whether a prompt may be enhanced while it is still being moderated. Any of the
+        providers may be asked, so all of them must be trusted with unmoderated prompts.
+
+        Returns:
+            True if every configured provider is listed in ENHANCE_BEFORE_MODERATION_PROVIDERS
+        """
+        allowed = ConfigManager().enhance_before_moderation_providers
+        return all(provider in allowed for provider in self.providers)
 
     def _init_gemini(self):
         """Initialize Gemini API"""
@@ -70,6 +175,8 @@ class AIService:
         model_name = self.config.get('gemini_model', 'gemini-pro')
         logger.info(f"Using Gemini model from config: {model_name}")
 
+        # Imported here, as the SDK is slow to import and only needed for this provider
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.gemini_model = genai.GenerativeModel(model_name)
         logger.info(f"Gemini API initialized with model: {model_name}")
@@ -81,6 +188,7 @@ class AIService:
             logger.error("OpenAI API key not found in configuration")
             return
 
+        import openai
         openai.api_key = api_key
         self.openai_model = self.config.get('openai_model', 'gpt-3.5-turbo')
         logger.info(f"OpenAI API initialized with model: {self.openai_model}")
@@ -109,13 +217,24 @@ class AIService:
 
         logger.info(f"LMStudio API initialized with host: {self.lmstudio_host}, port: {self.lmstudio_port}")
 
-    async def enhance_prompt(self, prompt: str, enhancement_level: int = 1) -> str:
+    async def enhance_prompt(self, prompt: str, enhancement_level: int = 1, reroll: bool = False,
+                             user_id: Optional[str] = None, priority: int = 0,
+                             deadline: Optional[float] = None,
+                             on_progress: Optional[ProgressCallback] = None) -> str:
         """
-        Enhance a prompt using AI.
+        Enhance a prompt using AI, reusing a cached enhancement of the same prompt and level.
+        Requests to a provider wait their turn in the provider's scheduler. With several
+        providers, a slow request is hedged and a failed one retried on the next provider.
+        If no provider answers in time the original prompt is returned.
 
         Args:
             prompt: The original prompt to enhance
             enhancement_level: Level of enhancement from 1-10 (1 = minimal, 10 = maximum)
+            reroll: Ask the AI for a new enhancement instead of using the cached one
+            user_id: User asking for the enhancement, for fairness between users
+            priority: Scheduling priority, lower values are served first
+            deadline: time.monotonic() after which the enhancement is no longer useful
+            on_progress: Streams the enhancement, calling this with the text generated so far
 
         Returns:
             Enhanced prompt
@@ -133,29 +252,232 @@ class AIService:
                 logger.info("Enhancement level 1: Using original prompt without enhancement")
                 return prompt
 
-            # Store enhancement level for use in provider-specific methods
-            self.__dict__["enhancement_level"] = enhancement_level
-
             # Create system prompt based on enhancement level
             system_prompt = self._create_system_prompt(enhancement_level)
 
-            # Call the appropriate AI provider
-            if self.ai_provider == 'gemini':
-                return await self._enhance_with_gemini(prompt, system_prompt)
-            elif self.ai_provider == 'openai':
-                return await self._enhance_with_openai(prompt, system_prompt)
-            elif self.ai_provider == 'xai':
-                return await self._enhance_with_xai(prompt, system_prompt)
-            elif self.ai_provider == 'lmstudio':
-                return await self._enhance_with_lmstudio(prompt, system_prompt)
+            cache_key = self._enhancement_cache_key(prompt, system_prompt, enhancement_level)
+            if reroll:
+                self.enhancement_cache.record_reroll()
             else:
-                logger.warning(f"Unknown AI provider: {self.ai_provider}. Returning original prompt.")
+                cached = await self.enhancement_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Using cached enhancement (level {enhancement_level})")
+                    return cached
+
+            enhanced_prompt = await self._enhance_hedged(
+                prompt, system_prompt, enhancement_level, user_id, priority, deadline, on_progress
+            )
+            if enhanced_prompt is None:
+                logger.warning("No AI provider enhanced the prompt, using the original prompt")
                 return prompt
 
+            await self.enhancement_cache.put(cache_key, enhanced_prompt)
+            return enhanced_prompt
+
         except Exception as e:
             logger.error(f"Error enhancing prompt: {str(e)}", exc_info=True)
             return prompt
 
+    async def _enhance_hedged(self, prompt: str, system_prompt: str, enhancement_level: int,
+                              user_id: Optional[str], priority: int, deadline: Optional[float],
+                              on_progress: Optional[ProgressCallback] = None) -> Optional[str]:
+        """
+        Ask the providers in order of preference until one answers. The next provider is
+        asked as soon as one fails, or as a hedge when the only pending request takes
+        longer than its provider's p95 latency. The first good answer wins and the
+        other request is cancelled.
+
+        Args:
+            prompt: The original prompt
+            system_prompt: System prompt chosen for the enhancement level
+            enhancement_level: Level of enhancement from 2-10
+            user_id: User asking for the enhancement
+            priority: Scheduling priority
+            deadline: time.monotonic() after which the enhancement is no longer useful
+            on_progress: Called with the text streamed so far by the first provider to stream
+
+        Returns:
+            Enhanced prompt, or None if no provider enhanced it
+        """
+        ranked = self._rank_providers()
+        pending: Dict[asyncio.Task, str] = {}
+        streaming = []
+
+        def progress_of(provider: str) -> Optional[ProgressCallback]:
+            if on_progress is None:
+                return None
+
+            async def report(text: str):
+                # Only show one provider's text, even when a hedge is streaming too
+                if not streaming:
+                    streaming.append(provider)
+                if streaming[0] == provider:
+                    await on_progress(text)
+            return report
+
+        def ask_next() -> str:
+            provider = ranked.pop(0)
+            task = asyncio.create_task(self._attempt(
+                provider, prompt, system_prompt, enhancement_level, user_id, priority, deadline,
+                progress_of(provider)
+            ))
+            pending[task] = provider
+            return provider
+
+        ask_next()
+        try:
+            while pending:
+                hedge_after = None
+                if ranked and len(pending) == 1:
+                    hedge_after = self._hedge_delay(next(iter(pending.values())))
+
+                done, _ = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    provider = ask_next()
+                    self._hedges.inc((provider,))
+                    logger.info(f"Hedging prompt enhancement with {provider} after {hedge_after:.1f} s")
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    enhanced_prompt = task.result()
+                    if enhanced_prompt is not None:
+                        return enhanced_prompt
+
+                # Fail over to the next provider
+                if ranked and not pending:
+                    ask_next()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, provider: str, prompt: str, system_prompt: str, enhancement_level: int,
+                       user_id: Optional[str], priority: int, deadline: Optional[float],
+                       on_progress: Optional[ProgressCallback] = None) -> Optional[str]:
+        """
+        Enhance a prompt with one provider through its scheduler, recording the outcome.
+
+        Returns:
+            Enhanced prompt, or None if the provider failed or couldn't start in time
+        """
+        started = time.monotonic()
+        try:
+            enhanced_prompt = await self.schedulers[provider].run(
+                lambda: self._call_provider(provider, prompt, system_prompt, enhancement_level, on_progress),
+                user_id=user_id, priority=priority, deadline=deadline
+            )
+        except SchedulerTimeout as e:
+            logger.warning(f"Skipping {provider} for prompt enhancement: {e}")
+            self._attempts.inc((provider, "rejected"))
+            return None
+        except asyncio.CancelledError:
+            self.health[provider].record_cancelled(time.monotonic() - started)
+            self._attempts.inc((provider, "cancelled"))
+            raise
+        except Exception as e:
+            logger.error(f"Error enhancing prompt with {provider}: {str(e)}", exc_info=True)
+            enhanced_prompt = None
+
+        # Failed enhancements come back as the original prompt or an error message
+        ok = bool(enhanced_prompt) and enhanced_prompt != prompt and not enhanced_prompt.startswith("Error:")
+        self.health[provider].record(time.monotonic() - started, ok)
+        self._attempts.inc((provider, "success" if ok else "error"))
+        return enhanced_prompt if ok else None
+
+    def _rank_providers(self) -> List[str]:
+        """
+        Order the providers for a request: healthy ones first, then by median latency.
+        Providers without enough latency samples keep their configured order ahead of
+        measured ones, so they get measured.
+
+        Returns:
+            Provider names, most preferred first
+        """
+        def preference(item):
+            index, provider = item
+            health = self.health[provider]
+            median = health.percentile(0.5)
+            return (not health.healthy, median if median is not None else 0.0, index)
+
+        return [provider for _, provider in sorted(enumerate(self.providers), key=preference)]
+
+    def _hedge_delay(self, provider: str) -> float:
+        """Seconds to wait on a provider before hedging, its p95 latency once known"""
+        p95 = self.health[provider].percentile(0.95)
+        return max(p95 if p95 is not None else self.hedge_delay, self.hedge_min_delay)
+
+    async def _call_provider(self, provider: str, prompt: str, system_prompt: str, enhancement_level: int,
+                             on_progress: Optional[ProgressCallback] = None) -> str:
+        """
+        Enhance a prompt with an AI provider.
+
+        Args:
+            provider: Provider name
+            prompt: The original prompt
+            system_prompt: System prompt chosen for the enhancement level
+            enhancement_level: Level of enhancement from 2-10
+            on_progress: Streams the enhancement, calling this with the text generated so far
+
+        Returns:
+            Enhanced prompt
+        """
+        if provider == 'gemini':
+            return await self._enhance_with_gemini(prompt, system_prompt, on_progress)
+        elif provider == 'openai':
+            return await self._enhance_with_openai(prompt, system_prompt, on_progress)
+        elif provider == 'xai':
+            return await self._enhance_with_xai(prompt, system_prompt, enhancement_level, on_progress)
+        elif provider == 'lmstudio':
+            return await self._enhance_with_lmstudio(prompt, system_prompt, enhancement_level, on_progress)
+        logger.warning(f"Unknown AI provider: {provider}. Returning original prompt.")
+        return prompt
+
+    @staticmethod
+    async def _collect_stream(chunks: AsyncIterator[str], on_progress: ProgressCallback) -> str:
+        """
+        Read a streamed enhancement, reporting the text as it grows.
+
+        Args:
+            chunks: Pieces of the enhanced prompt
+            on_progress: Called with the text generated so far
+
+        Returns:
+            The whole enhanced prompt
+        """
+        text = ""
+        async for chunk in chunks:
+            if chunk:
+                text += chunk
+                await on_progress(text)
+        return text.strip()
+
+    def _enhancement_cache_key(self, prompt: str, system_prompt: str, enhancement_level: int) -> str:
+        """
+        Build the enhancement cache key for the configured providers and models.
+
+        Args:
+            prompt: The original prompt
+            system_prompt: System prompt chosen for the enhancement level
+            enhancement_level: Level of enhancement from 2-10
+
+        Returns:
+            Cache key
+        """
+        models, variants = [], set()
+        for provider in self.providers:
+            if provider in ('xai', 'lmstudio'):
+                # These providers build their instructions and temperature from the level itself
+                variants.add(f"level:{enhancement_level}")
+                models.append(self.config.get('xai_model') if provider == 'xai' else
+                              f"{self.config.get('lmstudio_host')}:{self.config.get('lmstudio_port')}")
+            else:
+                variants.add(system_prompt)
+                models.append(self.config.get(f"{provider}_model", ''))
+        return self.enhancement_cache.make_key(
+            ",".join(self.providers), ",".join(models), "\0".join(sorted(variants)), prompt
+        )
+
     def _create_system_prompt(self, enhancement_level: int) -> str:
         """
         Create a system prompt based on the enhancement level.
@@ -183,13 +505,15 @@ class AIService:
         else:
             return base_prompt + " Make significant enhancements, adding many details to create a rich, vivid description."
 
-    async def _enhance_with_gemini(self, prompt: str, system_prompt: str) -> str:
+    async def _enhance_with_gemini(self, prompt: str, system_prompt: str,
+                                   on_progress: Optional[ProgressCallback] = None) -> str:
         """
         Enhance a prompt using Gemini.
 
         Args:
             prompt: The original prompt
             system_prompt: The system prompt
+            on_progress: Streams the enhancement, calling this with the text generated so far
 
         Returns:
             Enhanced prompt
@@ -198,11 +522,17 @@ class AIService:
             # Combine system prompt and user prompt
             full_prompt = f"{system_prompt}\n\nOriginal prompt: {prompt}\n\nEnhanced prompt:"
 
-            # Generate response
-            response = await self.gemini_model.generate_content_async(full_prompt)
+            if on_progress:
+                response = await self.gemini_model.generate_content_async(full_prompt, stream=True)
+                enhanced_prompt = await self._collect_stream(
+                    (chunk.text async for chunk in response), on_progress
+                )
+            else:
+                # Generate response
+                response = await self.gemini_model.generate_content_async(full_prompt)
 
-            # Extract and return the enhanced prompt
-            enhanced_prompt = response.text.strip()
+                # Extract and return the enhanced prompt
+                enhanced_prompt = response.text.strip()
 
             logger.info(f"Enhanced prompt with Gemini: {enhanced_prompt}")
             return enhanced_prompt
@@ -211,13 +541,15 @@ class AIService:
             logger.error(f"Error enhancing prompt with Gemini: {str(e)}", exc_info=True)
             return prompt
 
-    async def _enhance_with_openai(self, prompt: str, system_prompt: str) -> str:
+    async def _enhance_with_openai(self, prompt: str, system_prompt: str,
+                                   on_progress: Optional[ProgressCallback] = None) -> str:
         """
         Enhance a prompt using OpenAI.
 
         Args:
             prompt: The original prompt
             system_prompt: The system prompt
+            on_progress: Streams the enhancement, calling this with the text generated so far
 
         Returns:
             Enhanced prompt
@@ -230,15 +562,22 @@ class AIService:
             ]
 
             # Generate response
+            import openai
             response = await openai.ChatCompletion.acreate(
                 model=self.openai_model,
                 messages=messages,
                 temperature=0.7,
-                max_tokens=300
+                max_tokens=300,
+                stream=bool(on_progress)
             )
 
-            # Extract and return the enhanced prompt
-            enhanced_prompt = response.choices[0].message.content.strip()
+            if on_progress:
+                enhanced_prompt = await self._collect_stream(
+                    (chunk.choices[0].delta.get("content") async for chunk in response), on_progress
+                )
+            else:
+                # Extract and return the enhanced prompt
+                enhanced_prompt = response.choices[0].message.content.strip()
 
             logger.info(f"Enhanced prompt with OpenAI: {enhanced_prompt}")
             return enhanced_prompt
@@ -247,13 +586,16 @@ class AIService:
             logger.error(f"Error enhancing prompt with OpenAI: {str(e)}", exc_info=True)
             return prompt
 
-    async def _enhance_with_xai(self, prompt: str, system_prompt: str) -> str:
+    async def _enhance_with_xai(self, prompt: str, system_prompt: str, enhancement_level: int,
+                               on_progress: Optional[ProgressCallback] = None) -> str:
         """
         Enhance a prompt using XAI (Grok).
 
         Args:
             prompt: The original prompt
             system_prompt: The system prompt
+            enhancement_level: Level of enhancement from 2-10
+            on_progress: Streams the enhancement, calling this with the text generated so far
 
         Returns:
             Enhanced prompt
@@ -265,13 +607,6 @@ class AIService:
                 logger.error("Failed to get XAI provider")
                 return prompt
 
-            # Extract enhancement level from system prompt
-            enhancement_level = 1  # Default to no enhancement
-
-            # Get enhancement level if available
-            if "enhancement_level" in self.__dict__:
-                enhancement_level = self.__dict__["enhancement_level"]
-
             # Map enhancement level directly to temperature
             # This ensures each level gets the exact temperature needed for the corresponding system prompt
             # Note: Level 1 is handled directly in enhance_prompt method and should never reach here
@@ -302,7 +637,12 @@ class AIService:
             # We don't use the system_prompt parameter directly because
             # the XAI provider generates its own system prompt based on temperature
             # Generate the enhanced prompt
-            enhanced_prompt = await xai_provider.generate_response(prompt, temperature)
+            if on_progress:
+                enhanced_prompt = await self._collect_stream(
+                    xai_provider.stream_response(prompt, temperature), on_progress
+                )
+            else:
+                enhanced_prompt = await xai_provider.generate_response(prompt, temperature)
 
             logger.info(f"Enhanced prompt with XAI: {enhanced_prompt}")
             return enhanced_prompt
@@ -311,13 +651,16 @@ class AIService:
             logger.error(f"Error enhancing prompt with XAI: {str(e)}", exc_info=True)
             return prompt
 
-    async def _enhance_with_lmstudio(self, prompt: str, system_prompt: str) -> str:
+    async def _enhance_with_lmstudio(self, prompt: str, system_prompt: str, enhancement_level: int,
+                                    on_progress: Optional[ProgressCallback] = None) -> str:
         """
         Enhance a prompt using LMStudio.
 
         Args:
             prompt: The original prompt
             system_prompt: The system prompt
+            enhancement_level: Level of enhancement from 2-10
+            on_progress: Streams the enhancement, calling this with the text generated so far
 
         Returns:
             Enhanced prompt
@@ -329,13 +672,6 @@ class AIService:
                 logger.error("Failed to get LMStudio provider")
                 return prompt
 
-            # Extract enhancement level from system prompt
-            enhancement_level = 1  # Default to no enhancement
-
-            # Get enhancement level if available
-            if "enhancement_level" in self.__dict__:
-                enhancement_level = self.__dict__["enhancement_level"]
-
             # Map enhancement level directly to temperature
             # This ensures each level gets the exact temperature needed for the corresponding system prompt
             if enhancement_level == 1:
@@ -360,7 +696,12 @@ class AIService:
 
             # Generate the enhanced prompt using the LMStudio provider
             # We pass the system_prompt through the provider's own method
-            enhanced_prompt = await lmstudio_provider.generate_response(prompt, temperature)
+            if on_progress:
+                enhanced_prompt = await self._collect_stream(
+                    lmstudio_provider.stream_response(prompt, temperature), on_progress
+                )
+            else:
+                enhanced_prompt = await lmstudio_provider.generate_response(prompt, temperature)
 
             logger.info(f"Enhanced prompt with LMStudio: {enhanced_prompt}")
             return enhanced_prompt
@@ -0,0 +1,158 @@
+"""
+Cache of enhanced prompts.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+class EnhancementCache:
+    """
+    LRU cache of enhanced prompts with a time to live, optionally persisted
+    to SQLite so enhancements survive restarts. Lookups that miss the memory
+    cache read the database in an executor, off the event loop.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400.0,
+                 database_service: Optional[DatabaseService] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of enhancements kept in memory, 0 to disable the cache
+            ttl: Seconds an enhancement stays valid
+            database_service: Database to persist enhancements to, None to keep them in memory only
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.database_service = database_service
+        # key -> (stored_at, enhanced prompt)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lookups = MetricsRegistry().counter(
+            "prompt_enhancement_cache_total", "Prompt enhancement cache lookups by result", ("result",)
+        )
+
+        if self.database_service:
+            try:
+                self.database_service.create_table(
+                    "prompt_enhancement_cache",
+                    {
+                        "key": "TEXT PRIMARY KEY",
+                        "enhanced_prompt": "TEXT NOT NULL",
+                        "created_at": "REAL NOT NULL"
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error creating prompt enhancement cache table, not persisting: {e}")
+                self.database_service = None
+
+    @staticmethod
+    def make_key(provider: str, model: str, variant: str, prompt: str) -> str:
+        """
+        Build the cache key of an enhancement.
+
+        Args:
+            provider: AI provider
+            model: Model of the provider
+            variant: What determines the provider's instructions, e.g. the system prompt
+            prompt: Prompt to enhance
+
+        Returns:
+            Hash of the provider, model, variant and normalized prompt
+        """
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{provider}\0{model}\0{variant}\0{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached enhancement.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The enhanced prompt, or None if it isn't cached or has expired
+        """
+        if not self.max_entries:
+            return None
+
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self.database_service:
+            row = await asyncio.get_running_loop().run_in_executor(
+                None, self._load, key, now - self.ttl
+            )
+            if row:
+                entry = (row[1], row[0])
+                self._store(key, entry)
+
+        if entry is None:
+            self._lookups.inc(("miss",))
+            return None
+
+        self._entries.move_to_end(key)
+        self._lookups.inc(("hit",))
+        return entry[1]
+
+    async def put(self, key: str, enhanced_prompt: str):
+        """
+        Cache an enhancement.
+
+        Args:
+            key: Cache key
+            enhanced_prompt: The enhanced prompt
+        """
+        if not self.max_entries:
+            return
+
+        entry = (time.time(), enhanced_prompt)
+        self._store(key, entry)
+        if self.database_service:
+            await asyncio.get_running_loop().run_in_executor(None, self._save, key, entry)
+
+    def record_reroll(self):
+        """Count an enhancement that skipped the cache on request"""
+        self._lookups.inc(("reroll",))
+
+    def _store(self, key: str, entry: Tuple[float, str]):
+        """Add an entry to memory, evicting the least recently used entries when full"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str, min_created_at: float) -> Optional[Tuple]:
+        """Read an unexpired entry from the database"""
+        try:
+            return self.database_service.fetch_one(
+                "SELECT enhanced_prompt, created_at FROM prompt_enhancement_cache WHERE key = ? AND created_at >= ?",
+                (key, min_created_at)
+            )
+        except Exception as e:
+            logger.error(f"Error reading prompt enhancement cache: {e}")
+            return None
+
+    def _save(self, key: str, entry: Tuple[float, str]):
+        """Write an entry to the database and drop expired entries"""
+        try:
+            self.database_service.execute(
+                "INSERT OR REPLACE INTO prompt_enhancement_cache (key, enhanced_prompt, created_at) VALUES (?, ?, ?)",
+                (key, entry[1], entry[0])
+            )
+            self.database_service.execute(
+                "DELETE FROM prompt_enhancement_cache WHERE created_at < ?", (entry[0] - self.ttl,)
+            )
+        except Exception as e:
+            logger.error(f"Error writing prompt enhancement cache: {e}")
@@ -0,0 +1,92 @@
+"""
+Rolling latency and error tracking for AI providers.
+"""
+
+import time
+from collections import deque
+from typing import Deque, Optional
+
+class ProviderHealth:
+    """
+    Latencies and outcomes of a provider's recent requests. A provider whose
+    recent error rate is too high, or that failed several times in a row, is
+    unhealthy until its cooldown ends, after which it gets another try.
+    """
+
+    def __init__(self, name: str, window: int = 50, error_threshold: float = 0.5,
+                 failure_limit: int = 3, cooldown: float = 30.0):
+        """
+        Initialize the tracker.
+
+        Args:
+            name: Provider name
+            window: Number of recent requests considered
+            error_threshold: Error rate above which the provider is unhealthy
+            failure_limit: Consecutive failures after which the provider cools down
+            cooldown: Seconds an unhealthy provider is skipped
+        """
+        self.name = name
+        self.error_threshold = error_threshold
+        self.failure_limit = failure_limit
+        self.cooldown = cooldown
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+
+    def record(self, latency: float, ok: bool):
+        """
+        Record the outcome of a request.
+
+        Args:
+            latency: Seconds the request took
+            ok: Whether it returned a usable answer
+        """
+        self._outcomes.append(ok)
+        if ok:
+            self._latencies.append(latency)
+            self._consecutive_failures = 0
+            return
+
+        self._consecutive_failures += 1
+        too_many_errors = len(self._outcomes) >= 5 and self.error_rate > self.error_threshold
+        if self._consecutive_failures >= self.failure_limit or too_many_errors:
+            self._retry_at = time.monotonic() + self.cooldown
+
+    def record_cancelled(self, elapsed: float):
+        """
+        Record a request cancelled before it finished, e.g. one that lost a hedge.
+        It took at least the elapsed time, which is kept as a latency sample so a
+        provider that keeps losing still ranks as slow.
+
+        Args:
+            elapsed: Seconds the request ran before it was cancelled
+        """
+        self._latencies.append(elapsed)
+
+    @property
+    def error_rate(self) -> float:
+        """Share of recent requests that failed"""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the provider should be tried first"""
+        return time.monotonic() >= self._retry_at
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Latency percentile of recent successful requests.
+
+        Args:
+            fraction: Percentile between 0 and 1, e.g. 0.95
+
+        Returns:
+            The latency in seconds, or None with fewer than 5 samples
+        """
+        if len(self._latencies) < 5:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
@@ -0,0 +1,162 @@
+"""
+Scheduler for requests to an LLM provider.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Schedulers by provider, for the queue depth gauge
+_schedulers: Dict[str, "LLMRequestScheduler"] = {}
+
+class SchedulerTimeout(Exception):
+    """Raised when a request can't start before its deadline"""
+
+class _Waiter:
+    """A request waiting for a slot"""
+
+    __slots__ = ("user_id", "future", "cancelled")
+
+    def __init__(self, user_id: Optional[str], future: asyncio.Future):
+        self.user_id = user_id
+        self.future = future
+        self.cancelled = False
+
+class LLMRequestScheduler:
+    """
+    Limits the number of concurrent requests to a provider and queues the rest.
+    Waiting requests are ordered by priority, then round robin between users
+    so one user's burst can't starve everyone else, then first come first
+    served. A request that is unlikely to start before its deadline, judging
+    by the queue depth and recent request times, fails immediately so the
+    caller can fall back instead of waiting to time out.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 1, max_wait: float = 30.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            name: Provider name, used in logs and metrics
+            max_concurrency: Maximum number of requests in flight
+            max_wait: Longest a request may wait for a slot, in seconds
+        """
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_wait = max_wait
+        self.active = 0
+        # (priority, user round, sequence, waiter)
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        # Requests per user that are queued or running, for the round robin
+        self._user_load: Dict[str, int] = {}
+        # Moving average of request time, seeded with a conservative guess
+        self._average_duration = 5.0
+
+        registry = MetricsRegistry()
+        self._wait_seconds = registry.histogram(
+            "llm_queue_wait_seconds", "Time LLM requests waited for a slot", ("provider",)
+        )
+        self._rejected = registry.counter(
+            "llm_requests_rejected_total", "LLM requests that fell back instead of waiting", ("provider", "reason")
+        )
+        registry.gauge(
+            "llm_queue_depth", "LLM requests waiting for a slot", ("provider",),
+            function=lambda: {(name,): scheduler.queued for name, scheduler in _schedulers.items()}
+        )
+        _schedulers[name] = self
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot"""
+        return sum(1 for entry in self._queue if not entry[3].cancelled)
+
+    def estimated_wait(self) -> float:
+        """Expected wait in seconds for a request queued now"""
+        if self.active < self.max_concurrency and not self.queued:
+            return 0.0
+        return (self.queued // self.max_concurrency + 1) * self._average_duration
+
+    async def run(self, request: Callable[[], Awaitable[Any]], user_id: Optional[str] = None,
+                  priority: int = 0, deadline: Optional[float] = None) -> Any:
+        """
+        Run a request once a slot is free.
+
+        Args:
+            request: Function returning the request's coroutine
+            user_id: User the request is for, for fairness between users
+            priority: Lower values are served first
+            deadline: time.monotonic() after which the result is no longer useful,
+                      e.g. when the Discord interaction expires
+
+        Returns:
+            The request's result
+
+        Raises:
+            SchedulerTimeout: If the request can't start in time
+        """
+        now = time.monotonic()
+        timeout = self.max_wait if deadline is None else min(self.max_wait, deadline - now)
+        if timeout <= 0 or self.estimated_wait() > timeout:
+            self._rejected.inc((self.name, "queue_full"))
+            raise SchedulerTimeout(
+                f"{self.name} queue too deep: {self.queued} waiting, about {self.estimated_wait():.0f} s"
+            )
+
+        user_round = self._user_load.get(user_id, 0) if user_id else 0
+        if user_id:
+            self._user_load[user_id] = user_round + 1
+        try:
+            await self._acquire(user_id, priority, user_round, timeout)
+            self._wait_seconds.observe(time.monotonic() - now, (self.name,))
+
+            started = time.monotonic()
+            try:
+                return await request()
+            finally:
+                self._average_duration = 0.8 * self._average_duration + 0.2 * (time.monotonic() - started)
+                self._release()
+        finally:
+            if user_id:
+                remaining = self._user_load.get(user_id, 1) - 1
+                if remaining:
+                    self._user_load[user_id] = remaining
+                else:
+                    self._user_load.pop(user_id, None)
+
+    async def _acquire(self, user_id: Optional[str], priority: int, user_round: int, timeout: float):
+        """Wait for a slot"""
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            return
+
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (priority, user_round, next(self._sequence), waiter))
+        try:
+            # The slot is handed over by _release, already counted in active
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            waiter.cancelled = True
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot arrived as we gave up, so pass it on
+                self._release()
+            if isinstance(e, asyncio.TimeoutError):
+                self._rejected.inc((self.name, "timeout"))
+                raise SchedulerTimeout(f"Timed out after {timeout:.0f} s waiting for {self.name}") from None
+            raise
+
+    def _release(self):
+        """Hand the slot to the next waiting request, or free it"""
+        while self._queue:
+            waiter = heapq.heappop(self._queue)[3]
+            if not waiter.cancelled and not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self.active -= 1
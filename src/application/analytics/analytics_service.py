@@ -9,7 +9,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
 from src.domain.interfaces.analytics_repository import AnalyticsRepository
-from src.domain.events.event_bus import EventBus
+from src.domain.events.event_bus import EventBus, DispatchPolicy, OVERFLOW_DROP
 from src.domain.events.common_events import (
     CommandExecutedEvent,
     UserActivityEvent,
@@ -56,6 +56,11 @@ class AnalyticsService:
         """Register event handlers for analytics events"""
         logger.info("ANALYTICS: Registering event handlers for analytics events")
 
+        # Command and activity telemetry may be dropped under load; generations and violations may not
+        telemetry_policy = DispatchPolicy(max_queue=500, concurrency=2, overflow=OVERFLOW_DROP)
+        self.event_bus.configure(CommandExecutedEvent, telemetry_policy)
+        self.event_bus.configure(UserActivityEvent, telemetry_policy)
+
         # Register command executed event handler
         self.event_bus.subscribe(CommandExecutedEvent, self._handle_command_executed)
         logger.info("ANALYTICS: Registered CommandExecutedEvent handler")
@@ -113,8 +118,9 @@ class AnalyticsService:
         """
         try:
             # Log the event with more details
-            logger.info(f"ANALYTICS: Handling image generation completed event: {event.request_id}, user: {event.user_id}, time: {event.generation_time:.2f}s, is_video: {event.is_video}, type: {event.generation_type}")
-            logger.info(f"ANALYTICS: Current working directory: {os.getcwd()}")
+            log_extra = {'category': 'analytics', 'request_id': event.request_id}
+            logger.debug("ANALYTICS: Handling image generation completed event: user: %s, time: %.2fs, is_video: %s, type: %s",
+                         event.user_id, event.generation_time, event.is_video, event.generation_type, extra=log_extra)
 
             # Connect directly to the analytics.db database
             import sqlite3
@@ -123,7 +129,7 @@ class AnalyticsService:
 
             # Get the path to the analytics.db file
             analytics_db_path = os.path.join(os.getcwd(), 'analytics.db')
-            logger.info(f"ANALYTICS: Database path: {analytics_db_path}")
+            logger.debug("ANALYTICS: Database path: %s", analytics_db_path, extra=log_extra)
 
             # Check if the file exists
             if not os.path.exists(analytics_db_path):
@@ -162,7 +168,7 @@ class AnalyticsService:
             c.execute("SELECT generation_time FROM image_stats WHERE user_id = ? ORDER BY timestamp DESC LIMIT 1", (event.user_id,))
             result = c.fetchone()
             if result:
-                logger.info(f"ANALYTICS: Verified generation time in database: {result[0]:.2f} seconds")
+                logger.debug("ANALYTICS: Verified generation time in database: %.2f seconds", result[0], extra=log_extra)
             else:
                 logger.error(f"ANALYTICS: Failed to verify insertion - no record found")
 
@@ -170,15 +176,16 @@ class AnalyticsService:
             conn.commit()
             conn.close()
 
-            logger.info(f"ANALYTICS: Successfully recorded image generation for user {event.user_id}")
+            logger.debug("ANALYTICS: Successfully recorded image generation for user %s", event.user_id, extra=log_extra)
 
-            # Verify the record was inserted by querying the database again
-            conn = sqlite3.connect(analytics_db_path)
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM image_stats WHERE timestamp > ?", (current_time - 10,))
-            count = c.fetchone()[0]
-            logger.info(f"ANALYTICS: Found {count} records inserted in the last 10 seconds")
-            conn.close()
+            # Verify the record was inserted by querying the database again, only when it will be logged
+            if logger.isEnabledFor(logging.DEBUG):
+                conn = sqlite3.connect(analytics_db_path)
+                c = conn.cursor()
+                c.execute("SELECT COUNT(*) FROM image_stats WHERE timestamp > ?", (current_time - 10,))
+                count = c.fetchone()[0]
+                logger.debug("ANALYTICS: Found %d records inserted in the last 10 seconds", count, extra=log_extra)
+                conn.close()
 
         except Exception as e:
             logger.error(f"ANALYTICS: Error handling image generation completed event: {e}", exc_info=True)
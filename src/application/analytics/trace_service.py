@@ -0,0 +1,190 @@
+"""
+Service for tracing the phases of generation jobs.
+"""
+
+import logging
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.domain.models.job_trace import JobTrace, PHASE_ENQUEUED
+from src.infrastructure.database.trace_repository import TraceRepository
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+class TraceService:
+    """
+    Service for tracing the phases of generation jobs.
+    Keeps the traces of in-flight jobs in memory and persists each one when
+    the job finishes, so per-phase latency percentiles can be queried.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern to ensure only one trace service exists"""
+        if cls._instance is None:
+            cls._instance = super(TraceService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, repository: Optional[TraceRepository] = None, max_active: int = 1000):
+        """
+        Initialize the trace service.
+
+        Args:
+            repository: Repository for trace data access
+            max_active: Maximum number of in-flight traces kept; the oldest are dropped beyond this
+        """
+        # Only initialize once (singleton pattern)
+        if self._initialized:
+            return
+
+        self.repository = repository
+        self.max_active = max_active
+        self._active: Dict[str, JobTrace] = {}
+        self._phase_seconds = MetricsRegistry().histogram(
+            "job_phase_seconds", "Time to reach each job phase since the previous one", ("workflow_type", "phase")
+        )
+        self._initialized = True
+
+    def start(self, request_id: str, workflow_type: str = "standard", trace: Optional[JobTrace] = None) -> JobTrace:
+        """
+        Start tracing a job when it is enqueued.
+
+        Args:
+            request_id: ID of the request
+            workflow_type: Type of workflow (standard, pulid, redux, reduxprompt, video)
+            trace: Trace started before the job had an ID (e.g. covering moderation)
+
+        Returns:
+            The job's trace
+        """
+        trace = trace or JobTrace(workflow_type)
+        trace.workflow_type = workflow_type
+        trace.mark(PHASE_ENQUEUED)
+
+        self._active[request_id] = trace
+        while len(self._active) > self.max_active:
+            # Jobs that never finished; dicts keep insertion order so this is the oldest
+            self._active.pop(next(iter(self._active)))
+
+        return trace
+
+    def get(self, request_id: str) -> Optional[JobTrace]:
+        """
+        Get the trace of an in-flight job.
+
+        Args:
+            request_id: ID of the request
+
+        Returns:
+            The trace or None if the job isn't being traced
+        """
+        return self._active.get(request_id)
+
+    def mark(self, request_id: str, phase: str, at: Optional[float] = None):
+        """
+        Record that a job reached a phase.
+
+        Args:
+            request_id: ID of the request
+            phase: Name of the phase
+            at: Monotonic timestamp, defaults to now
+        """
+        trace = self._active.get(request_id)
+        if trace is not None:
+            trace.mark(phase, at)
+
+    def extend(self, request_id: str, marks: List[Tuple[str, float]]):
+        """
+        Merge marks recorded by the generation process into a job's trace.
+
+        Args:
+            request_id: ID of the request
+            marks: List of (phase, monotonic timestamp) pairs
+        """
+        trace = self._active.get(request_id)
+        if trace is not None:
+            trace.extend(marks)
+
+    def discard(self, request_id: str):
+        """
+        Stop tracing a job without persisting its trace, e.g. when it is cancelled.
+
+        Args:
+            request_id: ID of the request
+        """
+        self._active.pop(request_id, None)
+
+    async def finish(self, request_id: str, phase: Optional[str] = None) -> Optional[JobTrace]:
+        """
+        Stop tracing a job and persist its trace.
+
+        Args:
+            request_id: ID of the request
+            phase: Final phase to mark before saving
+
+        Returns:
+            The finished trace or None if the job wasn't being traced
+        """
+        trace = self._active.pop(request_id, None)
+        if trace is None:
+            return None
+
+        if phase:
+            trace.mark(phase)
+        self._observe(trace)
+        if self.repository:
+            await self.repository.save_trace(request_id, trace)
+        return trace
+
+    def _observe(self, trace: JobTrace):
+        """Record a finished trace's phase durations"""
+        for phase, duration in trace.segments():
+            # Keep one series for all nodes rather than one per node ID
+            self._phase_seconds.observe(duration, (trace.workflow_type, phase.split(":", 1)[0]))
+        self._phase_seconds.observe(trace.total_time, (trace.workflow_type, "total"))
+
+    async def get_phase_percentiles(self, workflow_type: Optional[str] = None,
+                                    days: Optional[int] = 7) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Get latency percentiles of each phase by workflow type.
+
+        Args:
+            workflow_type: Only include this workflow type
+            days: Only include jobs started in the last N days, None for all
+
+        Returns:
+            Mapping of workflow type to phase to count, p50, p95 and p99 in seconds.
+            A phase's duration is the time since the previous mark; "total" covers the whole job.
+        """
+        if not self.repository:
+            return {}
+
+        samples: Dict[str, Dict[str, List[float]]] = {}
+        for trace in await self.repository.get_traces(workflow_type=workflow_type, days=days):
+            phases = samples.setdefault(trace.workflow_type, {})
+            for phase, duration in trace.segments():
+                phases.setdefault(phase, []).append(duration)
+            phases.setdefault("total", []).append(trace.total_time)
+
+        return {
+            workflow: {phase: self._summarize(durations) for phase, durations in phases.items()}
+            for workflow, phases in samples.items()
+        }
+
+    @staticmethod
+    def _summarize(durations: List[float]) -> Dict[str, Any]:
+        """Nearest-rank percentiles of a list of durations"""
+        durations = sorted(durations)
+
+        def percentile(p: float) -> float:
+            return durations[max(math.ceil(p / 100 * len(durations)) - 1, 0)]
+
+        return {
+            'count': len(durations),
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'p99': percentile(99)
+        }
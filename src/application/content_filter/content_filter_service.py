@@ -3,7 +3,10 @@ Service for filtering inappropriate content.
 """
 
 import re
+import asyncio
+import difflib
 import logging
+import threading
 import json
 import os
 import time
@@ -12,6 +15,8 @@ from typing import Dict, Any, List, Optional, Tuple, Set
 from src.domain.events.event_bus import EventBus
 from src.domain.events.common_events import ContentFilterViolationEvent
 from src.infrastructure.database.database_service import DatabaseService
+from src.application.content_filter.moderation_state_cache import ModerationStateCache
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
 # Import both the original and enhanced transformer filters
 from src.application.content_filter.transformer_content_filter import TransformerContentFilter
 from src.application.content_filter.enhanced_transformer_filter import EnhancedTransformerFilter
@@ -47,6 +52,9 @@ class ContentFilterService:
 
         self.database_service = database_service
         self.event_bus = EventBus()
+        self._moderation_seconds = MetricsRegistry().histogram(
+            "moderation_seconds", "Time to check a prompt against the content filters", ("outcome",)
+        )
         self.banned_words: Set[str] = set()
         self.regex_patterns: List[Dict[str, Any]] = []
         self.context_rules: List[Dict[str, Any]] = []
@@ -58,6 +66,13 @@ class ContentFilterService:
         # Initialize database tables
         self._init_database_tables()
 
+        # Load bans and warning counts into memory
+        self.moderation_state = ModerationStateCache(self._lift_expired_restriction)
+        try:
+            self.moderation_state.load(self.database_service)
+        except Exception as e:
+            logger.error(f"Error loading moderation state: {e}")
+
         # Define the paths to the backup JSON files
         self.banned_words_backup_path = os.path.join('src', 'application', 'content_filter', 'banned_words.json')
         self.context_rules_backup_path = os.path.join('src', 'application', 'content_filter', 'context_rules.json')
@@ -65,18 +80,9 @@ class ContentFilterService:
         # Ensure the content_filter directory exists
         os.makedirs(os.path.dirname(self.banned_words_backup_path), exist_ok=True)
 
-        # Initialize the enhanced transformer-based content filter
-        logger.info("Initializing enhanced transformer-based content filter (will download models if needed)...")
-        try:
-            # Try to use the enhanced filter first
-            self.transformer_filter = EnhancedTransformerFilter()
-            logger.info("Enhanced transformer-based content filter initialized successfully")
-        except Exception as e:
-            # Fall back to the original filter if there's an issue
-            logger.warning(f"Failed to initialize enhanced transformer filter: {e}")
-            logger.info("Falling back to original transformer filter...")
-            self.transformer_filter = TransformerContentFilter()
-            logger.info("Original transformer-based content filter initialized successfully")
+        # The transformer models are loaded by warm_up(), so startup isn't held up by torch
+        self.transformer_filter = EnhancedTransformerFilter(defer_loading=True)
+        self.models_ready = threading.Event()
 
         self._initialized = True
 
@@ -388,15 +394,207 @@ class ContentFilterService:
         self._load_banned_words()
         self._load_regex_patterns()
         self._load_context_rules()
+        if isinstance(self.transformer_filter, EnhancedTransformerFilter):
+            self.transformer_filter.score_cache.clear()
+
+    async def warm_up(self):
+        """Load the transformer models off the event loop; prompts are refused until they are ready"""
+        loop = asyncio.get_running_loop()
+        start = time.time()
+        logger.info("Loading transformer content filter models (will download models if needed)...")
+        try:
+            await loop.run_in_executor(None, self.transformer_filter.load_models)
+            logger.info("Enhanced transformer-based content filter initialized successfully")
+        except Exception as e:
+            # Fall back to the original filter if there's an issue
+            logger.warning(f"Failed to initialize enhanced transformer filter: {e}")
+            logger.info("Falling back to original transformer filter...")
+            try:
+                fallback = TransformerContentFilter(defer_loading=True)
+                await loop.run_in_executor(None, fallback.load_models)
+                self.transformer_filter = fallback
+                logger.info("Original transformer-based content filter initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize original transformer filter: {e}")
+        finally:
+            # Without a model the filters fall back to rule-based checks, as before
+            self.models_ready.set()
+            logger.info(f"Content filter ready after {time.time() - start:.2f} seconds")
 
     def check_prompt(self, user_id: str, prompt: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """
+        Check a prompt against the content filters, recording the moderation latency.
+
+        Args:
+            user_id: ID of the user who submitted the prompt
+            prompt: Prompt to check
+
+        Returns:
+            Tuple of (is_allowed, violation_type, violation_details)
+        """
+        if not self.models_ready.is_set():
+            return False, "not_ready", "The content filter is still starting up. Please try again in a moment."
+
+        start = time.perf_counter()
+        # Banned users are refused without running the models
+        classification = None if self.is_user_banned(user_id) else self._classify(prompt)
+        result = self._check_prompt(user_id, prompt, classification)
+        self._moderation_seconds.observe(time.perf_counter() - start, ("allowed" if result[0] else "blocked",))
+        return result
+
+    async def check_prompt_async(self, user_id: str, prompt: str) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Check a prompt like check_prompt, running the transformer models in an
+        executor so other work, such as prompt enhancement, can go on meanwhile.
+        Violations are still recorded on the event loop.
+
+        Args:
+            user_id: ID of the user who submitted the prompt
+            prompt: Prompt to check
+
+        Returns:
+            Tuple of (is_allowed, violation_type, violation_details)
+        """
+        if not self.models_ready.is_set():
+            return False, "not_ready", "The content filter is still starting up. Please try again in a moment."
+
+        start = time.perf_counter()
+        # Banned users are refused without running the models
+        if self.is_user_banned(user_id):
+            classification = None
+        else:
+            classification = await asyncio.get_running_loop().run_in_executor(None, self._classify, prompt)
+        result = self._check_prompt(user_id, prompt, classification)
+        self._moderation_seconds.observe(time.perf_counter() - start, ("allowed" if result[0] else "blocked",))
+        return result
+
+    async def check_enhanced_prompt(self, user_id: str, original_prompt: str,
+                                    enhanced_prompt: str) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Check a prompt returned by prompt enhancement for an already checked prompt.
+        The term rules, context rules, banned words and patterns see the whole enhanced
+        prompt, so a term added by the enhancement is judged together with the
+        original prompt; the transformer models only see the added words. A violation
+        counts against the enhancement rather than the user, so no warning is given.
+
+        Args:
+            user_id: ID of the user who submitted the prompt
+            original_prompt: Prompt the user submitted, already checked
+            enhanced_prompt: Prompt returned by the enhancement
+
+        Returns:
+            Tuple of (is_allowed, violation_type, violation_details)
+        """
+        added = self.added_text(original_prompt, enhanced_prompt)
+        if not added:
+            return True, None, None
+
+        violation = self._find_rule_violation(enhanced_prompt)
+        if violation is None:
+            classification = await asyncio.get_running_loop().run_in_executor(None, self._classify, added)
+            if classification is not None:
+                is_safe, reason = classification[0][:2]
+                if is_safe and classification[1] is not None:
+                    is_safe, reason = classification[1][0], classification[1][2]
+                if not is_safe:
+                    violation = reason
+
+        if violation is not None:
+            logger.warning(f"Enhanced prompt for user {user_id} blocked: {violation}")
+            return False, "enhancement", "The enhanced prompt was flagged by our content filter. Try a lower enhancement level."
+        return True, None, None
+
+    def _find_rule_violation(self, prompt: str) -> Optional[str]:
+        """
+        Apply the rules that need no model, as _check_prompt does, without recording anything.
+
+        Args:
+            prompt: Prompt to check
+
+        Returns:
+            Description of the first violation found, or None if the prompt passes
+        """
+        # The term rules need no model, so they apply even when the fallback filter is used
+        decided = EnhancedTransformerFilter(defer_loading=True).match_term_rules(prompt)
+        if decided is not None and not decided[0]:
+            return f"term rule {decided[1]}"
+
+        prompt_lower = prompt.lower()
+        allowed_triggers = set()
+        for rule in self.context_rules:
+            trigger_word = rule["trigger_word"].lower()
+            if trigger_word not in prompt_lower:
+                continue
+            if any(context.lower() in prompt_lower for context in rule["allowed_contexts"]):
+                allowed_triggers.add(trigger_word)
+                continue
+            for context in rule["disallowed_contexts"]:
+                if context.lower() in prompt_lower:
+                    return f"context rule {rule['trigger_word']} with {context}"
+            if rule["allowed_contexts"]:
+                return f"context rule {rule['trigger_word']} without allowed context"
+
+        for word in self.banned_words:
+            if word in prompt_lower and word not in allowed_triggers:
+                return f"banned word '{word}'"
+        for pattern in self.regex_patterns:
+            if pattern["compiled"].search(prompt):
+                return f"pattern {pattern['name']}"
+        return None
+
+    @staticmethod
+    def added_text(original_prompt: str, enhanced_prompt: str) -> str:
+        """
+        The words of an enhanced prompt that aren't in the original prompt.
+
+        Args:
+            original_prompt: The original prompt
+            enhanced_prompt: The enhanced prompt
+
+        Returns:
+            The added runs of words, one per line
+        """
+        original_words = original_prompt.split()
+        enhanced_words = enhanced_prompt.split()
+        matcher = difflib.SequenceMatcher(None, original_words, enhanced_words, autojunk=False)
+        runs = [
+            " ".join(enhanced_words[j1:j2])
+            for tag, _, _, j1, j2 in matcher.get_opcodes() if tag in ("insert", "replace")
+        ]
+        return "\n".join(runs)
+
+    def _classify(self, prompt: str) -> Optional[Tuple[tuple, Optional[tuple]]]:
+        """
+        Run the transformer models on a prompt. Safe to call from an executor thread.
+
+        Args:
+            prompt: Prompt to check
+
+        Returns:
+            Tuple of the child content check and the general check (None when the first
+            already failed), or None if the models failed
+        """
+        try:
+            # First check for child-related inappropriate content
+            child_check = self.transformer_filter.check_prompt_for_child_content(prompt)
+            # Then do a general content safety check
+            content_check = self.transformer_filter.check_content(prompt) if child_check[0] else None
+            return child_check, content_check
+        except Exception as e:
+            logger.error(f"Error using transformer content filter: {e}")
+            # Continue with rule-based checks if transformer filter fails
+            return None
+
+    def _check_prompt(self, user_id: str, prompt: str,
+                      classification: Optional[Tuple[tuple, Optional[tuple]]]) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
         Check a prompt against the content filters.
         Implements a three-strike warning system.
 
         Args:
             user_id: ID of the user who submitted the prompt
             prompt: Prompt to check
+            classification: Transformer results from _classify, None to use the rules only
 
         Returns:
             Tuple of (is_allowed, violation_type, violation_details)
@@ -405,75 +603,77 @@ class ContentFilterService:
         if self.is_user_banned(user_id):
             return False, "banned_user", "You are banned from using this service. Please contact an administrator."
 
-        # Check with transformer-based content filter first
+        # Check with transformer-based content filter first; without results
+        # (the models failed) continue with the rule-based checks
         try:
-            # First check for child-related inappropriate content
-            is_safe, reason, confidence, threshold_name = self.transformer_filter.check_prompt_for_child_content(prompt)
-
-            if not is_safe:
-                # Record violation with threshold information
-                self._record_violation(
-                    user_id,
-                    prompt,
-                    "ai_content_filter",
-                    f"AI detected inappropriate content: {reason} (confidence: {confidence:.2f}, threshold: {threshold_name})"
-                )
+            if classification is not None:
+                # First check for child-related inappropriate content
+                is_safe, reason, confidence, threshold_name = classification[0]
 
-                # Get current warning count
-                warning_count = self.get_warning_count(user_id)
-
-                # Add a warning
-                self.add_user_warning(user_id, prompt, f"ai_filter:{reason}")
-
-                # Check if max warnings reached
-                if warning_count >= self.max_warnings - 1:  # Max warnings reached (0-indexed)
-                    if self.enable_permanent_ban:
-                        # Permanently ban the user
-                        self.ban_user(user_id, f"AI detected inappropriate content after {self.max_warnings-1} warnings: {reason}")
-                        return False, "ai_content_filter", f"🚫 You have been permanently banned for submitting potentially inappropriate content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Please contact an administrator if you believe this is an error.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
-                    else:
-                        # Temporarily restrict the user
-                        self.temp_restrict_user(user_id, f"AI detected inappropriate content after {self.max_warnings-1} warnings: {reason}")
-                        return False, "ai_content_filter", f"🚫 You have been temporarily restricted for 24 hours for submitting potentially inappropriate content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Your warnings will be reset after 24 hours.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
-                elif warning_count == self.max_warnings - 2:  # One warning away from max
-                    return False, "ai_content_filter", f"⚠️ FINAL WARNING: Your prompt may generate inappropriate content.\nThis is warning {warning_count+1} of {self.max_warnings}. One more violation will result in {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
-                else:  # Earlier warnings
-                    warnings_remaining = self.max_warnings - warning_count - 1
-                    return False, "ai_content_filter", f"⚠️ WARNING: Your prompt may generate inappropriate content.\nThis is warning {warning_count+1} of {self.max_warnings}. You have {warnings_remaining} {'warning' if warnings_remaining == 1 else 'warnings'} remaining before {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
+                if not is_safe:
+                    # Record violation with threshold information
+                    self._record_violation(
+                        user_id,
+                        prompt,
+                        "ai_content_filter",
+                        f"AI detected inappropriate content: {reason} (confidence: {confidence:.2f}, threshold: {threshold_name})"
+                    )
 
-            # Then do a general content safety check
-            is_safe, scores, violation_type, violation_score, threshold_name = self.transformer_filter.check_content(prompt)
+                    # Get current warning count
+                    warning_count = self.get_warning_count(user_id)
 
-            if not is_safe:
-                # Record violation with detailed information
-                self._record_violation(
-                    user_id,
-                    prompt,
-                    "ai_content_filter",
-                    f"AI detected {violation_type} content (score: {violation_score:.2f}, threshold: {threshold_name})"
-                )
+                    # Add a warning
+                    self.add_user_warning(user_id, prompt, f"ai_filter:{reason}")
+
+                    # Check if max warnings reached
+                    if warning_count >= self.max_warnings - 1:  # Max warnings reached (0-indexed)
+                        if self.enable_permanent_ban:
+                            # Permanently ban the user
+                            self.ban_user(user_id, f"AI detected inappropriate content after {self.max_warnings-1} warnings: {reason}")
+                            return False, "ai_content_filter", f"🚫 You have been permanently banned for submitting potentially inappropriate content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Please contact an administrator if you believe this is an error.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
+                        else:
+                            # Temporarily restrict the user
+                            self.temp_restrict_user(user_id, f"AI detected inappropriate content after {self.max_warnings-1} warnings: {reason}")
+                            return False, "ai_content_filter", f"🚫 You have been temporarily restricted for 24 hours for submitting potentially inappropriate content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Your warnings will be reset after 24 hours.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
+                    elif warning_count == self.max_warnings - 2:  # One warning away from max
+                        return False, "ai_content_filter", f"⚠️ FINAL WARNING: Your prompt may generate inappropriate content.\nThis is warning {warning_count+1} of {self.max_warnings}. One more violation will result in {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
+                    else:  # Earlier warnings
+                        warnings_remaining = self.max_warnings - warning_count - 1
+                        return False, "ai_content_filter", f"⚠️ WARNING: Your prompt may generate inappropriate content.\nThis is warning {warning_count+1} of {self.max_warnings}. You have {warnings_remaining} {'warning' if warnings_remaining == 1 else 'warnings'} remaining before {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={confidence:.2f}"
+
+                # Then do a general content safety check
+                is_safe, scores, violation_type, violation_score, threshold_name = classification[1]
+
+                if not is_safe:
+                    # Record violation with detailed information
+                    self._record_violation(
+                        user_id,
+                        prompt,
+                        "ai_content_filter",
+                        f"AI detected {violation_type} content (score: {violation_score:.2f}, threshold: {threshold_name})"
+                    )
 
-                # Get current warning count
-                warning_count = self.get_warning_count(user_id)
+                    # Get current warning count
+                    warning_count = self.get_warning_count(user_id)
 
-                # Add a warning
-                self.add_user_warning(user_id, prompt, f"ai_filter:{violation_type}")
-
-                # Check if max warnings reached
-                if warning_count >= self.max_warnings - 1:  # Max warnings reached (0-indexed)
-                    if self.enable_permanent_ban:
-                        # Permanently ban the user
-                        self.ban_user(user_id, f"AI detected {violation_type} content after {self.max_warnings-1} warnings")
-                        return False, "ai_content_filter", f"🚫 You have been permanently banned for submitting potentially {violation_type} content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Please contact an administrator if you believe this is an error.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
-                    else:
-                        # Temporarily restrict the user
-                        self.temp_restrict_user(user_id, f"AI detected {violation_type} content after {self.max_warnings-1} warnings")
-                        return False, "ai_content_filter", f"🚫 You have been temporarily restricted for 24 hours for submitting potentially {violation_type} content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Your warnings will be reset after 24 hours.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
-                elif warning_count == self.max_warnings - 2:  # One warning away from max
-                    return False, "ai_content_filter", f"⚠️ FINAL WARNING: Your prompt may generate {violation_type} content.\nThis is warning {warning_count+1} of {self.max_warnings}. One more violation will result in {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
-                else:  # Earlier warnings
-                    warnings_remaining = self.max_warnings - warning_count - 1
-                    return False, "ai_content_filter", f"⚠️ WARNING: Your prompt may generate {violation_type} content.\nThis is warning {warning_count+1} of {self.max_warnings}. You have {warnings_remaining} {'warning' if warnings_remaining == 1 else 'warnings'} remaining before {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
+                    # Add a warning
+                    self.add_user_warning(user_id, prompt, f"ai_filter:{violation_type}")
+
+                    # Check if max warnings reached
+                    if warning_count >= self.max_warnings - 1:  # Max warnings reached (0-indexed)
+                        if self.enable_permanent_ban:
+                            # Permanently ban the user
+                            self.ban_user(user_id, f"AI detected {violation_type} content after {self.max_warnings-1} warnings")
+                            return False, "ai_content_filter", f"🚫 You have been permanently banned for submitting potentially {violation_type} content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Please contact an administrator if you believe this is an error.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
+                        else:
+                            # Temporarily restrict the user
+                            self.temp_restrict_user(user_id, f"AI detected {violation_type} content after {self.max_warnings-1} warnings")
+                            return False, "ai_content_filter", f"🚫 You have been temporarily restricted for 24 hours for submitting potentially {violation_type} content.\nThis was your {warning_count+1}th violation out of {self.max_warnings} allowed. Your warnings will be reset after 24 hours.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
+                    elif warning_count == self.max_warnings - 2:  # One warning away from max
+                        return False, "ai_content_filter", f"⚠️ FINAL WARNING: Your prompt may generate {violation_type} content.\nThis is warning {warning_count+1} of {self.max_warnings}. One more violation will result in {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
+                    else:  # Earlier warnings
+                        warnings_remaining = self.max_warnings - warning_count - 1
+                        return False, "ai_content_filter", f"⚠️ WARNING: Your prompt may generate {violation_type} content.\nThis is warning {warning_count+1} of {self.max_warnings}. You have {warnings_remaining} {'warning' if warnings_remaining == 1 else 'warnings'} remaining before {'a permanent ban' if self.enable_permanent_ban else 'a 24-hour restriction'}.\nThreshold that was exceeded: {threshold_name}={violation_score:.2f}"
         except Exception as e:
             logger.error(f"Error using transformer content filter: {e}")
             # Continue with rule-based checks if transformer filter fails
@@ -996,6 +1196,8 @@ class ContentFilterService:
                 }
             )
 
+            self.moderation_state.add_warning(user_id)
+
             logger.info(f"Added warning for user {user_id}: {violation_details}")
             return True
         except Exception as e:
@@ -1043,16 +1245,7 @@ class ContentFilterService:
         Returns:
             Number of warnings
         """
-        try:
-            result = self.database_service.fetch_one(
-                "SELECT COUNT(*) FROM user_warnings WHERE user_id = ?",
-                (user_id,)
-            )
-
-            return result[0] if result else 0
-        except Exception as e:
-            logger.error(f"Error getting warning count: {e}")
-            return 0
+        return self.moderation_state.get_warning_count(user_id)
 
     def remove_user_warning(self, warning_id: int) -> bool:
         """
@@ -1065,12 +1258,20 @@ class ContentFilterService:
             True if successful, False otherwise
         """
         try:
+            row = self.database_service.fetch_one(
+                "SELECT user_id FROM user_warnings WHERE id = ?",
+                (warning_id,)
+            )
+
             self.database_service.delete(
                 "user_warnings",
                 "id = ?",
                 (warning_id,)
             )
 
+            if row:
+                self.moderation_state.remove_warning(row[0])
+
             logger.info(f"Removed warning {warning_id}")
             return True
         except Exception as e:
@@ -1093,6 +1294,7 @@ class ContentFilterService:
                 "user_id = ?",
                 (user_id,)
             )
+            self.moderation_state.clear_warnings(user_id)
 
             logger.info(f"Removed all warnings for user {user_id}")
             return True
@@ -1124,6 +1326,8 @@ class ContentFilterService:
                 }
             )
 
+            self.moderation_state.set_ban(user_id)
+
             logger.info(f"Permanently banned user {user_id}: {reason}")
             return True
         except Exception as e:
@@ -1157,6 +1361,8 @@ class ContentFilterService:
                 }
             )
 
+            self.moderation_state.set_ban(user_id, expires_at)
+
             logger.info(f"Temporarily restricted user {user_id} for 24 hours: {reason}")
             return True
         except Exception as e:
@@ -1180,6 +1386,7 @@ class ContentFilterService:
                 "user_id = ?",
                 (user_id,)
             )
+            self.moderation_state.remove_ban(user_id)
 
             logger.info(f"Unbanned user {user_id}")
             return True
@@ -1190,7 +1397,8 @@ class ContentFilterService:
     def is_user_banned(self, user_id: str) -> bool:
         """
         Check if a user is banned or temporarily restricted.
-        Automatically removes expired temporary restrictions and resets warnings.
+        Served from the in-memory moderation state; expired temporary restrictions
+        are lifted and warnings reset by the moderation state timer.
 
         Args:
             user_id: ID of the user
@@ -1198,36 +1406,18 @@ class ContentFilterService:
         Returns:
             True if the user is banned or restricted, False otherwise
         """
-        try:
-            # Get ban info including expiration details
-            result = self.database_service.fetch_one(
-                "SELECT is_permanent, expires_at FROM banned_users WHERE user_id = ?",
-                (user_id,)
-            )
+        return self.moderation_state.is_banned(user_id)
 
-            if result is None:
-                return False
-
-            is_permanent, expires_at = result
-
-            # If it's a permanent ban, user is banned
-            if is_permanent:
-                return True
+    def _lift_expired_restriction(self, user_id: str):
+        """
+        Remove an expired temporary restriction and reset the user's warnings.
 
-            # If it's a temporary restriction, check if it's expired
-            current_time = time.time()
-            if expires_at and current_time > expires_at:
-                # Restriction has expired, remove it and reset warnings
-                self.unban_user(user_id)
-                self.remove_all_warnings(user_id)
-                logger.info(f"Temporary restriction for user {user_id} has expired. Warnings reset.")
-                return False
-            else:
-                # Restriction is still active
-                return True
-        except Exception as e:
-            logger.error(f"Error checking if user is banned: {e}")
-            return False
+        Args:
+            user_id: ID of the user
+        """
+        self.unban_user(user_id)
+        self.remove_all_warnings(user_id)
+        logger.info(f"Temporary restriction for user {user_id} has expired. Warnings reset.")
 
     def get_ban_info(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -1335,6 +1525,7 @@ class ContentFilterService:
                 "DELETE FROM user_warnings WHERE user_id = ?",
                 (user_id,)
             )
+            self.moderation_state.clear_warnings(user_id)
 
             logger.info(f"Removed all warnings for user {user_id}")
             return True
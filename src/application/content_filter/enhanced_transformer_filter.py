@@ -6,14 +6,37 @@ import os
 import logging
 import time
 from typing import Tuple, Dict, Any, Optional, List, Union
-import torch
 import re
 from src.infrastructure.config.config_manager import ConfigManager
+from src.application.content_filter.inference_backend import create_classifier, model_revision
+from src.application.content_filter.score_cache import ScoreCache, normalize_prompt
+from src.application.content_filter.term_index import TermIndex
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Labels a screening model may use for its safe class; every other class counts as unsafe
+SAFE_LABELS = {"non-toxic", "non_toxic", "not_toxic", "neutral", "safe", "normal", "label_0"}
+
+# Terms that are harmful in combination with child-related terms. A trailing "*" matches
+# any word the stem starts; only stems too long to start unrelated words get one
+HARMFUL_TERMS = [
+    "violent*", "violence", "harm", "harmful", "hurt", "abuse", "abusing", "abusive", "cry", "crying",
+    "cries", "cried", "exploit*", "hit", "slap", "beat", "beaten", "kill", "killer", "tortur*", "punish*"
+]
+# Sexual terms, always harmful with child-related terms even when adult content is allowed
+CHILD_HARMFUL_TERMS = ["sexual*", "naked", "nude", "inappropriate*", "explicit*"]
+# Terms that are concerning when a prompt mentions both adults and children
+CONCERNING_ADULT_CHILD_TERMS = [
+    "naked", "nude", "bed", "touching", "inappropriate*",
+    "explicit*", "pornographic", "obscene"
+]
+# Terms that unambiguously refer to children
+EXPLICIT_CHILD_TERMS = ["child", "children", "kid", "kids", "kiddie", "kiddies", "minor", "minors", "young"]
+ADULT_TERMS = ["adult", "adults"]
+
 class EnhancedTransformerFilter:
     """
     Enhanced content filter service using multiple transformer models for context-aware content moderation.
@@ -29,7 +52,8 @@ class EnhancedTransformerFilter:
             cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, primary_model_path: str = None, child_content_model_path: str = None, use_specialized_child_model: bool = None):
+    def __init__(self, primary_model_path: str = None, child_content_model_path: str = None, use_specialized_child_model: bool = None,
+                 defer_loading: bool = False):
         """
         Initialize the enhanced transformer content filter service.
 
@@ -40,6 +64,7 @@ class EnhancedTransformerFilter:
                                      If None, will use microsoft/mdeberta-v3-base or a fine-tuned model if available.
             use_specialized_child_model: Whether to use the specialized child content model.
                                         If None, will use the value from the environment variable CONTENT_FILTER_USE_CHILD_MODEL.
+            defer_loading: Don't load the models until load_models() is called
         """
         # Only initialize once (singleton pattern)
         if self._initialized:
@@ -70,15 +95,30 @@ class EnhancedTransformerFilter:
                    f"hate={self.hate_threshold}, violence={self.violence_threshold}")
         logger.info(f"Allow adult content: {self.allow_adult_content}")
 
+        # Inference backend for CPU: torch (fp32), quantized (int8) or onnx (ONNX Runtime)
+        self.backend = os.getenv('CONTENT_FILTER_BACKEND', 'torch').lower()
+        self.num_threads = int(os.getenv('CONTENT_FILTER_THREADS', '0'))
+        self.onnx_cache_dir = os.getenv('CONTENT_FILTER_ONNX_CACHE', os.path.join('models', 'onnx'))
+
+        # Model scores of recently checked prompts, so resubmitted prompts skip inference
+        self.score_cache = ScoreCache(
+            max_entries=int(os.getenv('CONTENT_FILTER_CACHE_SIZE', '2048')),
+            ttl=float(os.getenv('CONTENT_FILTER_CACHE_TTL', '3600'))
+        )
+
         # Initialize model variables
         self.primary_model = None
         self.primary_tokenizer = None
+        self.primary_classifier = None
+        self.primary_revision = None
         self.primary_model_path = primary_model_path or "s-nlp/roberta_toxicity_classifier"
         self.primary_categories = []
 
         # Child content model - specialized for child-related content detection
         self.child_model = None
         self.child_tokenizer = None
+        self.child_classifier = None
+        self.child_revision = None
 
         # Check for a fine-tuned model first, then fall back to a specialized pre-trained model
         fine_tuned_model_path = os.path.join('models', 'child_content_detector')
@@ -102,19 +142,58 @@ class EnhancedTransformerFilter:
 
         logger.info(f"Specialized child content model enabled: {self.use_specialized_child_model}")
 
-        # Device configuration
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Cascade: a small screening model clears prompts it is confident about,
+        # only uncertain prompts and prompts with child-related terms reach the large models
+        self.cascade_enabled = os.getenv('CONTENT_FILTER_CASCADE', 'false').lower() == 'true'
+        self.screen_model_path = os.getenv('CONTENT_FILTER_SCREEN_MODEL', 'martin-ha/toxic-comment-model')
+        self.screen_safe_below = float(os.getenv('CONTENT_FILTER_SCREEN_SAFE_BELOW', '0.02'))
+        self.screen_classifier = None
+        self.screen_revision = None
+        self.screen_unsafe_indices: List[int] = []
+        self._cascade_total = MetricsRegistry().counter(
+            "moderation_cascade_total", "Prompts by the cascade tier that decided them", ("outcome",)
+        )
+
+        # Device configuration, set when the models are loaded
+        self.device = "cpu"
         self.initialized_time = None
 
         # Context-aware filtering
         self.context_patterns = self._initialize_context_patterns()
+        # Every term list compiled into one index, so a prompt is scanned once per check
+        self.term_index = TermIndex({
+            **{name: context["terms"] for name, context in self.context_patterns.items()},
+            "exclusion": self.context_patterns["child_related"].get("exclusion_terms", []),
+            "adult": ADULT_TERMS,
+            "explicit_child": EXPLICIT_CHILD_TERMS,
+            "harmful": HARMFUL_TERMS,
+            "child_harmful": CHILD_HARMFUL_TERMS,
+            "concerning_adult_child": CONCERNING_ADULT_CHILD_TERMS,
+            "sexual": ["sexual*"],
+            "between_adults": ["between adults"]
+        })
 
         # Initialize the models
-        self._initialize_primary_model()
-        self._initialize_child_model()
+        if not defer_loading:
+            self.load_models()
 
         self._initialized = True
 
+    def load_models(self) -> bool:
+        """
+        Import torch and load the models. Slow, so callers on the event loop should run it in an executor.
+
+        Returns:
+            True if the primary model was loaded, False otherwise
+        """
+        import torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        loaded = self._initialize_primary_model()
+        self._initialize_child_model()
+        if self.cascade_enabled:
+            self._initialize_screen_model()
+        return loaded
+
     def _initialize_context_patterns(self) -> Dict[str, Dict[str, Any]]:
         """Initialize patterns for context-aware filtering"""
         return {
@@ -127,7 +206,10 @@ class EnhancedTransformerFilter:
                     "adolescent", "youth", "juvenile", "preteen", "tween", "teenager",
                     "kindergarten", "elementary", "preschool", "daycare", "nursery",
                     # Family-related terms
-                    "children", "kids", "minors", "youngster", "little one", "little girl", "little boy"
+                    "children", "kids", "minors", "youngster", "little one", "little girl", "little boy",
+                    # Compounds and inflections the simple suffixes don't cover
+                    "schoolgirl", "schoolboy", "schoolchild", "schoolchildren", "teenage", "teenaged",
+                    "kiddie", "kiddies", "kiddo", "babies", "childhood"
                 ],
                 "threshold_modifier": 0.3,  # Significantly lower the threshold when these terms are present
                 "exclusion_terms": ["adult", "adults", "woman", "man", "women", "men"]  # Terms that should not trigger child-related detection
@@ -256,6 +338,12 @@ class EnhancedTransformerFilter:
             else:
                 self.primary_categories = ["toxic", "non_toxic"]
 
+            self.primary_classifier = self._create_classifier(self.primary_model, self.primary_tokenizer, self.primary_model_path)
+            self.primary_revision = f"{model_revision(self.primary_model, self.primary_model_path)}:{self.primary_classifier.backend}"
+            self.score_cache.clear()
+            # An optimized backend has its own copy of the weights, so release the fp32 model
+            self.primary_model = getattr(self.primary_classifier, "model", None)
+
             self.initialized_time = time.time()
             logger.info(f"Primary content filter model initialized in {self.initialized_time - start_time:.2f} seconds")
             logger.info(f"Primary model categories: {self.primary_categories}")
@@ -311,6 +399,12 @@ class EnhancedTransformerFilter:
             else:
                 self.child_categories = ["inappropriate", "appropriate"]
 
+            self.child_classifier = self._create_classifier(self.child_model, self.child_tokenizer, self.child_model_path)
+            self.child_revision = f"{model_revision(self.child_model, self.child_model_path)}:{self.child_classifier.backend}"
+            self.score_cache.clear()
+            # An optimized backend has its own copy of the weights, so release the fp32 model
+            self.child_model = getattr(self.child_classifier, "model", None)
+
             logger.info(f"Child content filter model initialized in {time.time() - start_time:.2f} seconds")
             logger.info(f"Child model categories: {self.child_categories}")
 
@@ -319,6 +413,123 @@ class EnhancedTransformerFilter:
             logger.error(f"Error initializing child content transformer model: {e}")
             return False
 
+    def _initialize_screen_model(self):
+        """Initialize the small screening model of the cascade"""
+        try:
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            start_time = time.time()
+            logger.info(f"Initializing screening model ({self.screen_model_path}) on {self.device}...")
+            model = AutoModelForSequenceClassification.from_pretrained(self.screen_model_path)
+            tokenizer = AutoTokenizer.from_pretrained(self.screen_model_path)
+            model.to(self.device)
+            model.eval()
+
+            labels = [label.lower() for label in model.config.id2label.values()]
+            unsafe_indices = [i for i, label in enumerate(labels) if label not in SAFE_LABELS]
+            if len(unsafe_indices) == len(labels):
+                logger.warning(f"Screening model has no safe label among {labels}, the cascade is disabled")
+                return False
+
+            self.screen_classifier = self._create_classifier(model, tokenizer, self.screen_model_path)
+            self.screen_revision = f"{model_revision(model, self.screen_model_path)}:{self.screen_classifier.backend}"
+            self.screen_unsafe_indices = unsafe_indices
+            self.score_cache.clear()
+
+            logger.info(f"Screening model initialized in {time.time() - start_time:.2f} seconds, "
+                        f"prompts below {self.screen_safe_below} skip the full models")
+            return True
+        except Exception as e:
+            logger.error(f"Error initializing screening model: {e}")
+            return False
+
+    def screen(self, text: str, record: bool = True) -> Tuple[bool, Optional[float]]:
+        """
+        First tier of the cascade: decide whether a prompt is clearly safe
+        without running the large models.
+
+        Args:
+            text: The prompt to screen
+            record: Count the outcome in the cascade metrics
+
+        Returns:
+            Tuple of (clearly_safe, unsafe_score); unsafe_score is None when the
+            screening model didn't run
+        """
+        if not self.screen_classifier:
+            return False, None
+
+        # Child-related prompts always get the full checks, whatever the screening model says
+        if self.term_index.scan(text).has("child_related"):
+            if record:
+                self._cascade_total.inc(("escalated_child_terms",))
+            return False, None
+
+        probs = self._predict("screen", text)
+        unsafe_score = float(sum(probs[i] for i in self.screen_unsafe_indices))
+        if unsafe_score < self.screen_safe_below:
+            if record:
+                self._cascade_total.inc(("screened_safe",))
+            return True, unsafe_score
+
+        if record:
+            self._cascade_total.inc(("escalated_uncertain",))
+        return False, unsafe_score
+
+    def _create_classifier(self, model, tokenizer, model_path: str):
+        """
+        Wrap a loaded model in the configured inference backend.
+
+        Args:
+            model: Loaded fp32 model
+            tokenizer: The model's tokenizer
+            model_path: Hub ID or local path the model was loaded from
+
+        Returns:
+            Classifier whose predict() returns the probability of each category
+        """
+        return create_classifier(
+            model, tokenizer, model_path,
+            backend=self.backend,
+            device=self.device,
+            cache_dir=self.onnx_cache_dir,
+            num_threads=self.num_threads
+        )
+
+    def _predict(self, kind: str, text: str):
+        """
+        Get a model's scores for a text, from the cache if it was scored recently.
+
+        Args:
+            kind: "primary", "child" or "screen"
+            text: The text to score
+
+        Returns:
+            Probability of each category of the model
+        """
+        text = normalize_prompt(text)
+        key = self.score_cache.make_key(kind, getattr(self, f"{kind}_revision"), text)
+        probs = self.score_cache.get(key)
+        if probs is None:
+            probs = getattr(self, f"{kind}_classifier").predict(text)
+            self.score_cache.put(key, probs)
+        return probs
+
+    def update_thresholds(self, **thresholds: float):
+        """
+        Change detection thresholds at runtime, e.g. update_thresholds(toxic=0.9).
+
+        Args:
+            **thresholds: New values by category (toxic, harmful, sexual, child_content, hate, violence)
+        """
+        for category, value in thresholds.items():
+            attribute = f"{category}_threshold"
+            if not hasattr(self, attribute):
+                raise ValueError(f"Unknown threshold: {category}")
+            setattr(self, attribute, float(value))
+        self.score_cache.clear()
+        logger.info(f"Content filter thresholds updated: {thresholds}")
+
     def _get_context_adjusted_threshold(self, text: str, base_threshold: float, category: str) -> float:
         """
         Adjust the threshold based on the context of the text.
@@ -331,8 +542,8 @@ class EnhancedTransformerFilter:
         Returns:
             Adjusted threshold value
         """
-        # Convert text to lowercase for matching
-        text_lower = text.lower()
+        # The scan is cached, so every adjustment in a check shares one pass over the text
+        matches = self.term_index.scan(text)
 
         # Start with the base threshold
         adjusted_threshold = base_threshold
@@ -343,7 +554,7 @@ class EnhancedTransformerFilter:
         # Apply context-based adjustments
         for context_name, context_data in self.context_patterns.items():
             # Check if any terms from this context are in the text
-            if any(term in text_lower for term in context_data["terms"]):
+            if matches.has(context_name):
                 # Apply the modifier to the threshold
                 adjusted_threshold *= context_data["threshold_modifier"]
                 matched_contexts.append(context_name)
@@ -357,105 +568,86 @@ class EnhancedTransformerFilter:
 
         return adjusted_threshold
 
-    def check_content(self, text: str) -> Tuple[bool, Dict[str, float], Optional[str], Optional[float], Optional[str]]:
+    def match_term_rules(self, text: str) -> Optional[Tuple[bool, Optional[str], Optional[float]]]:
         """
-        Check if content is safe using the primary transformer model.
+        Apply the term rules for child-related content, which need no model: adult
+        and child terms with a concerning term, or child terms with a harmful term.
 
         Args:
             text: The text to check
 
         Returns:
-            Tuple of (is_safe, scores, violation_type, violation_score, threshold_name)
-            - is_safe: Whether the content is safe
-            - scores: Dictionary of category scores
-            - violation_type: The type of violation (toxic, sexual, etc.) or None if safe
-            - violation_score: The score for the violation or None if safe
-            - threshold_name: The name of the threshold that was exceeded or None if safe
+            Tuple of (is_safe, violation_type, violation_score) if a rule decides the text, None otherwise
         """
-        # First, do a quick check for harmful terms related to children
-        # This is a direct pattern matching approach that doesn't rely on the model
-        child_related_terms = self.context_patterns["child_related"]["terms"]
-
-        # Define harmful terms based on whether adult content is allowed
-        if self.allow_adult_content:
-            # If adult content is allowed, exclude sexual terms from the harmful list
-            harmful_terms = [
-                "violent", "violence", "harm", "hurt", "abuse", "cry", "crying",
-                "exploit", "hit", "slap", "beat", "kill", "torture", "punish", "punishment"
-            ]
-
-            # These terms are always harmful when combined with child-related terms
-            child_harmful_terms = [
-                "sexual", "naked", "nude", "inappropriate", "explicit"
-            ]
-        else:
-            # If adult content is not allowed, include all harmful terms
-            harmful_terms = [
-                "violent", "violence", "harm", "hurt", "abuse", "cry", "crying",
-                "inappropriate", "explicit", "sexual", "naked", "nude", "exploit",
-                "hit", "slap", "beat", "kill", "torture", "punish", "punishment"
-            ]
-            child_harmful_terms = []
-
-        # Check if the text contains both child-related terms and harmful terms
-        text_lower = text.lower()
-
-        # No need to check exclusion terms here since we handle adult+child combinations separately
+        matches = self.term_index.scan(text)
 
         # Check if the text explicitly contains 'adult' or 'adults'
-        has_adult_term = 'adult' in text_lower or 'adults' in text_lower
+        has_adult_term = matches.has("adult")
 
         # Check if the text contains child-related terms
-        has_child_term = any(term in text_lower for term in child_related_terms)
+        has_child_term = matches.has("child_related")
 
         # Special case: If the text contains BOTH adult terms AND child terms, it might be concerning
         # This catches cases like "Adult naked man with child"
         if has_adult_term and has_child_term:
-            # Check for potentially concerning combinations
-            concerning_adult_child_terms = [
-                "naked", "nude", "bed", "touching", "inappropriate",
-                "explicit", "pornographic", "obscene"
-            ]
-
             # Special case for "sexual content between adults" which should be allowed
-            if "sexual" in text_lower and "between adults" in text_lower and not any(child_term in text_lower for child_term in ["child", "children", "kid", "kids", "minor", "minors", "young"]):
+            if matches.has("sexual") and matches.has("between_adults") and not matches.has("explicit_child"):
                 logger.info(f"Allowing explicit adult content: {text}")
-                # Skip further checks and allow this content
-                return True, {}, None, None, None
+                return True, None, None
             # If any concerning terms are present with both adult and child terms, block it
-            elif any(term in text_lower for term in concerning_adult_child_terms):
-                logger.warning(f"General check: Detected concerning combination of adult and child terms with '{text_lower}'")
-                return False, {}, "adult_child_inappropriate", 0.95, "CONTENT_FILTER_CHILD_THRESHOLD"
+            elif matches.has("concerning_adult_child"):
+                logger.warning(f"General check: Detected concerning combination of adult and child terms with '{text}'")
+                return False, "adult_child_inappropriate", 0.95
 
         if has_child_term:
-            # Check for general harmful terms
-            for harmful_term in harmful_terms:
-                if harmful_term in text_lower:
-                    logger.warning(f"Direct pattern match: Detected harmful term '{harmful_term}' with child-related content: {text}")
-                    return False, {}, "harmful_child_content", 0.9, "CONTENT_FILTER_CHILD_THRESHOLD"
+            # Check for general harmful terms; sexual terms count as harmful too unless adult content is allowed
+            harmful_term = matches.first("harmful") if self.allow_adult_content else matches.first("harmful", "child_harmful")
+            if harmful_term:
+                logger.warning(f"Direct pattern match: Detected harmful term '{harmful_term}' with child-related content: {text}")
+                return False, "harmful_child_content", 0.9
 
             # If adult content is allowed, also check for child-specific harmful terms
-            if self.allow_adult_content:
-                for harmful_term in child_harmful_terms:
-                    if harmful_term in text_lower:
-                        logger.warning(f"Direct pattern match: Detected child-inappropriate term '{harmful_term}' with child-related content: {text}")
-                        return False, {}, "inappropriate_child_content", 0.95, "CONTENT_FILTER_CHILD_THRESHOLD"
-        if not self.primary_model or not self.primary_tokenizer:
+            if self.allow_adult_content and matches.has("child_harmful"):
+                harmful_term = matches.first("child_harmful")
+                logger.warning(f"Direct pattern match: Detected child-inappropriate term '{harmful_term}' with child-related content: {text}")
+                return False, "inappropriate_child_content", 0.95
+        return None
+
+    def check_content(self, text: str) -> Tuple[bool, Dict[str, float], Optional[str], Optional[float], Optional[str]]:
+        """
+        Check if content is safe using the primary transformer model.
+
+        Args:
+            text: The text to check
+
+        Returns:
+            Tuple of (is_safe, scores, violation_type, violation_score, threshold_name)
+            - is_safe: Whether the content is safe
+            - scores: Dictionary of category scores
+            - violation_type: The type of violation (toxic, sexual, etc.) or None if safe
+            - violation_score: The score for the violation or None if safe
+            - threshold_name: The name of the threshold that was exceeded or None if safe
+        """
+        # First, do a quick check for harmful terms related to children
+        # This is a direct pattern matching approach that doesn't rely on the model
+        decided = self.match_term_rules(text)
+        if decided is not None:
+            is_safe, violation_type, violation_score = decided
+            if is_safe:
+                return True, {}, None, None, None
+            return False, {}, violation_type, violation_score, "CONTENT_FILTER_CHILD_THRESHOLD"
+
+        # Already counted by check_prompt_for_child_content, which runs first
+        if self.screen(text, record=False)[0]:
+            return True, {}, None, None, None
+
+        if not self.primary_classifier:
             logger.warning("Primary transformer model not initialized, skipping check")
             return True, {}, None, None, None
 
         try:
-            # Tokenize the input text
-            inputs = self.primary_tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            # Get model predictions
-            with torch.no_grad():
-                outputs = self.primary_model(**inputs)
-
-            # Convert logits to probabilities
-            probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            probs = probs.cpu().numpy()[0]
+            # Get the probability of each category
+            probs = self._predict("primary", text)
 
             # Create a dictionary of category scores
             scores = {self.primary_categories[i]: float(probs[i]) for i in range(len(self.primary_categories))}
@@ -473,12 +665,8 @@ class EnhancedTransformerFilter:
 
                 # If adult content is allowed, check if the content contains adult-related terms
                 if self.allow_adult_content:
-                    # Get adult-related terms from the exclusion list
-                    adult_terms = self.context_patterns["child_related"].get("exclusion_terms", [])
-                    text_lower = text.lower()
-
-                    # If the content contains adult terms, be more permissive with toxic content
-                    if any(term in text_lower for term in adult_terms):
+                    # If the content contains adult terms (the child exclusion list), be more permissive with toxic content
+                    if self.term_index.scan(text).has("exclusion"):
                         # Increase the threshold for adult content
                         adjusted_threshold = max(adjusted_threshold, 0.99)
                         logger.info(f"Increased toxic threshold to {adjusted_threshold} for adult content")
@@ -540,20 +728,15 @@ class EnhancedTransformerFilter:
             - confidence_score: The confidence score for the violation or 0.0 if safe
             - threshold_name: The name of the threshold that was exceeded or None if safe
         """
+        # Prompts the screening model is confident about skip both large models
+        if self.screen(text)[0]:
+            return True, None, 0.0, None
+
         # First check if we have a specialized child content model and it's enabled
-        if self.child_model and self.child_tokenizer and self.use_specialized_child_model:
+        if self.child_classifier and self.use_specialized_child_model:
             try:
-                # Tokenize the input text
-                inputs = self.child_tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-                # Get model predictions
-                with torch.no_grad():
-                    outputs = self.child_model(**inputs)
-
-                # Convert logits to probabilities
-                probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
-                probs = probs.cpu().numpy()[0]
+                # Get the probability of each category
+                probs = self._predict("child", text)
 
                 # Create a dictionary of category scores
                 scores = {self.child_categories[i]: float(probs[i]) for i in range(len(self.child_categories))}
@@ -570,38 +753,27 @@ class EnhancedTransformerFilter:
                         return False, f"Potentially inappropriate content involving minors", toxic_score, "CONTENT_FILTER_CHILD_THRESHOLD"
 
                 # Check for child-related terms combined with the content
-                child_related_terms = self.context_patterns["child_related"]["terms"]
+                matches = self.term_index.scan(text)
 
-                # Get exclusion terms that should not trigger child-related detection
-                exclusion_terms = self.context_patterns["child_related"].get("exclusion_terms", [])
-
-                # Check if any exclusion terms are present
-                text_lower = text.lower()
-                has_exclusion_term = any(term in text_lower for term in exclusion_terms)
+                # Check if any exclusion terms (that should not trigger child-related detection) are present
+                has_exclusion_term = matches.has("exclusion")
 
                 # Check if the text explicitly contains 'adult' or 'adults'
-                text_lower = text.lower()
-                has_adult_term = 'adult' in text_lower or 'adults' in text_lower
+                has_adult_term = matches.has("adult")
 
                 # Check if the text contains child-related terms
-                has_child_term = any(term in text_lower for term in child_related_terms)
+                has_child_term = matches.has("child_related")
 
                 # Special case: If the text contains BOTH adult terms AND child terms, it might be concerning
                 # This catches cases like "Adult naked man with child"
                 if has_adult_term and has_child_term:
-                    # Check for potentially concerning combinations
-                    concerning_adult_child_terms = [
-                        "naked", "nude", "bed", "touching", "inappropriate",
-                        "explicit", "pornographic", "obscene"
-                    ]
-
                     # Special case for "sexual content between adults" which should be allowed
-                    if "sexual" in text_lower and "between adults" in text_lower and not any(child_term in text_lower for child_term in ["child", "children", "kid", "kids", "minor", "minors", "young"]):
+                    if matches.has("sexual") and matches.has("between_adults") and not matches.has("explicit_child"):
                         logger.info(f"Child check: Allowing explicit adult content: {text}")
                         return True, None, 0.0, None
                     # If any concerning terms are present with both adult and child terms, block it
-                    elif any(term in text_lower for term in concerning_adult_child_terms):
-                        logger.warning(f"Child check: Detected concerning combination of adult and child terms with '{text_lower}'")
+                    elif matches.has("concerning_adult_child"):
+                        logger.warning(f"Child check: Detected concerning combination of adult and child terms with '{text}'")
                         return False, "Potentially inappropriate content involving adults and minors", 0.95, "CONTENT_FILTER_CHILD_THRESHOLD"
                     else:
                         # If it contains both adult and child terms but no concerning terms, allow it
@@ -613,49 +785,20 @@ class EnhancedTransformerFilter:
                 if has_child_term and not has_exclusion_term and not has_adult_term:
                     # For child-related content, we need to be more careful
 
-                    # Define harmful terms based on whether adult content is allowed
-                    if self.allow_adult_content:
-                        # If adult content is allowed, exclude sexual terms from the harmful list
-                        harmful_terms = [
-                            "violent", "violence", "harm", "hurt", "abuse", "cry", "crying",
-                            "exploit", "hit", "slap", "beat", "kill", "torture", "punish", "punishment"
-                        ]
-
-                        # These terms are always harmful when combined with child-related terms
-                        child_harmful_terms = [
-                            "sexual", "naked", "nude", "inappropriate", "explicit"
-                        ]
-                    else:
-                        # If adult content is not allowed, include all harmful terms
-                        harmful_terms = [
-                            "violent", "violence", "harm", "hurt", "abuse", "cry", "crying",
-                            "inappropriate", "explicit", "sexual", "naked", "nude", "exploit",
-                            "hit", "slap", "beat", "kill", "torture", "punish", "punishment"
-                        ]
-                        child_harmful_terms = []
-
-                    # Check for harmful terms combined with child-related terms
-                    text_lower = text.lower()
-
-                    # Check for general harmful terms
-                    for harmful_term in harmful_terms:
-                        if harmful_term in text_lower:
-                            logger.warning(f"Detected harmful term '{harmful_term}' combined with child-related content: {text}")
-                            return False, "Potentially harmful content involving minors", 0.9, "CONTENT_FILTER_CHILD_THRESHOLD"
+                    # Check for general harmful terms; sexual terms count as harmful too unless adult content is allowed
+                    harmful_term = matches.first("harmful") if self.allow_adult_content else matches.first("harmful", "child_harmful")
+                    if harmful_term:
+                        logger.warning(f"Detected harmful term '{harmful_term}' combined with child-related content: {text}")
+                        return False, "Potentially harmful content involving minors", 0.9, "CONTENT_FILTER_CHILD_THRESHOLD"
 
                     # If adult content is allowed, also check for child-specific harmful terms
-                    if self.allow_adult_content:
-                        for harmful_term in child_harmful_terms:
-                            if harmful_term in text_lower:
-                                logger.warning(f"Detected child-inappropriate term '{harmful_term}' with child-related content: {text}")
-                                return False, "Potentially inappropriate content involving minors", 0.95, "CONTENT_FILTER_CHILD_THRESHOLD"
-
-                    # Then check for educational or innocent content that should be allowed
-                    educational_terms = self.context_patterns["educational"]["terms"]
-                    animal_terms = self.context_patterns["animal"]["terms"]
+                    if self.allow_adult_content and matches.has("child_harmful"):
+                        harmful_term = matches.first("child_harmful")
+                        logger.warning(f"Detected child-inappropriate term '{harmful_term}' with child-related content: {text}")
+                        return False, "Potentially inappropriate content involving minors", 0.95, "CONTENT_FILTER_CHILD_THRESHOLD"
 
                     # If it contains educational or animal terms, it's likely safe
-                    if any(term in text.lower() for term in educational_terms) or any(term in text.lower() for term in animal_terms):
+                    if matches.has("educational", "animal"):
                         logger.info("Child-related content appears to be educational or about animals, allowing it")
                         return True, None, 0.0, None
 
@@ -666,22 +809,13 @@ class EnhancedTransformerFilter:
                 # Fall back to primary model if specialized model fails
 
         # Fall back to primary model if specialized model is not available or failed
-        if not self.primary_model or not self.primary_tokenizer:
+        if not self.primary_classifier:
             logger.warning("Primary transformer model not initialized, skipping check")
             return True, None, 0.0, None
 
         try:
-            # Tokenize the input text
-            inputs = self.primary_tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            # Get model predictions
-            with torch.no_grad():
-                outputs = self.primary_model(**inputs)
-
-            # Convert logits to probabilities
-            probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            probs = probs.cpu().numpy()[0]
+            # Get the probability of each category
+            probs = self._predict("primary", text)
 
             # Create a dictionary of category scores
             scores = {self.primary_categories[i]: float(probs[i]) for i in range(len(self.primary_categories))}
@@ -710,34 +844,21 @@ class EnhancedTransformerFilter:
                     logger.info(f"Detected adult content but allowing it: {sexual_score:.2f} (threshold: {adjusted_threshold})")
 
             # Check for child-related terms combined with concerning content
-            child_related_terms = self.context_patterns["child_related"]["terms"]
+            matches = self.term_index.scan(text)
 
             # Enhanced detection for child-related terms
             # If child-related terms are present, apply much stricter thresholds
-            if any(term in text.lower() for term in child_related_terms):
-                # First check for harmful terms that should always be blocked when combined with child-related terms
-                harmful_terms = [
-                    "violent", "violence", "harm", "hurt", "abuse", "cry", "crying",
-                    "inappropriate", "explicit", "sexual", "naked", "nude", "exploit",
-                    "hit", "slap", "beat", "kill", "torture", "punish", "punishment"
-                ]
-
-                # Check for harmful terms combined with child-related terms
-                text_lower = text.lower()
-
-                # Check if the text explicitly contains 'adult' or 'adults' to avoid false positives
-                has_adult_term = 'adult' in text_lower or 'adults' in text_lower
-
+            if matches.has("child_related"):
                 # If the content is specifically about adults, don't block it
-                if has_adult_term:
+                if matches.has("adult"):
                     logger.info(f"Content contains adult terms, allowing it: {text}")
                     return True, None, 0.0, None
 
-                # Otherwise, check for harmful terms
-                for harmful_term in harmful_terms:
-                    if harmful_term in text_lower:
-                        logger.warning(f"Detected harmful term '{harmful_term}' combined with child-related content in general check: {text}")
-                        return False, "Potentially harmful content involving minors", 0.9, "CONTENT_FILTER_CHILD_THRESHOLD"
+                # Otherwise, check for harmful terms that should always be blocked when combined with child-related terms
+                harmful_term = matches.first("harmful", "child_harmful")
+                if harmful_term:
+                    logger.warning(f"Detected harmful term '{harmful_term}' combined with child-related content in general check: {text}")
+                    return False, "Potentially harmful content involving minors", 0.9, "CONTENT_FILTER_CHILD_THRESHOLD"
 
                 # Check for toxic content with child-related terms - use very low threshold
                 if "toxic" in scores and scores["toxic"] > self.child_content_threshold * 0.3:
@@ -770,9 +891,7 @@ class EnhancedTransformerFilter:
                         return False, "Potential inappropriate content involving minors (combined categories)", combined_score, "CONTENT_FILTER_CHILD_THRESHOLD"
 
                 # Check if the content is educational or about animals - these are likely safe
-                educational_terms = self.context_patterns["educational"]["terms"]
-                animal_terms = self.context_patterns["animal"]["terms"]
-                if any(term in text.lower() for term in educational_terms) or any(term in text.lower() for term in animal_terms):
+                if matches.has("educational", "animal"):
                     logger.info("Child-related content appears to be educational or about animals, allowing it")
                     # Continue with the check, but with higher thresholds
 
@@ -791,11 +910,15 @@ class EnhancedTransformerFilter:
         """
         return {
             "primary_model_path": self.primary_model_path,
-            "primary_model_initialized": self.primary_model is not None,
+            "primary_model_initialized": self.primary_classifier is not None,
+            "primary_backend": self.primary_classifier.backend if self.primary_classifier else None,
             "primary_categories": self.primary_categories,
             "child_model_path": self.child_model_path,
-            "child_model_initialized": self.child_model is not None,
+            "child_model_initialized": self.child_classifier is not None,
+            "child_backend": self.child_classifier.backend if self.child_classifier else None,
             "child_categories": self.child_categories,
+            "screen_model_path": self.screen_model_path if self.cascade_enabled else None,
+            "screen_model_initialized": self.screen_classifier is not None,
             "device": self.device,
             "initialized_time": self.initialized_time
         }
@@ -0,0 +1,269 @@
+"""
+Inference backends for the moderation models.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Backends
+BACKEND_TORCH = "torch"          # fp32 eager PyTorch, the reference
+BACKEND_QUANTIZED = "quantized"  # PyTorch with int8 dynamic quantization of the linear layers
+BACKEND_ONNX = "onnx"            # Exported ONNX graph run with ONNX Runtime
+
+# Prompts used to check an optimized backend against the fp32 model
+PARITY_PROMPTS = [
+    "a watercolor painting of a lighthouse at sunset",
+    "portrait of an old fisherman, dramatic lighting, 85mm",
+    "a cute cartoon cat wearing a wizard hat",
+    "cyberpunk city street at night with neon signs and rain",
+    "a knight fighting a dragon in a burning castle",
+    "two adults kissing on a beach, romantic",
+    "a child playing with a dog in a park",
+    "gore, a mutilated body covered in blood",
+    "you are a worthless idiot and everyone hates you",
+    "a classroom full of students learning biology",
+    "nude woman lying on a bed, artistic photography",
+    "a teenage girl in a school uniform posing",
+]
+
+class SequenceClassifier:
+    """A tokenizer and model that turn a text into class probabilities"""
+
+    backend = BACKEND_TORCH
+
+    def __init__(self, model, tokenizer, device: str = "cpu", max_length: int = 512):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_length = max_length
+
+    def predict(self, text: str) -> np.ndarray:
+        """
+        Classify a text.
+
+        Args:
+            text: Text to classify
+
+        Returns:
+            Probability of each class
+        """
+        import torch
+        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=self.max_length)
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+        return torch.nn.functional.softmax(logits, dim=-1).cpu().numpy()[0]
+
+class QuantizedClassifier(SequenceClassifier):
+    """Classifier with int8 dynamically quantized linear layers, for CPU inference"""
+
+    backend = BACKEND_QUANTIZED
+
+    def __init__(self, model, tokenizer, max_length: int = 512):
+        import torch
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized, tokenizer, "cpu", max_length)
+
+class OnnxClassifier:
+    """Classifier running an exported ONNX graph with ONNX Runtime"""
+
+    backend = BACKEND_ONNX
+
+    def __init__(self, model, tokenizer, model_path: str, cache_dir: str, num_threads: int = 0,
+                 max_length: int = 512):
+        import onnxruntime
+
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.onnx_path = export_onnx(model, tokenizer, model_path, cache_dir)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = num_threads or default_num_threads()
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def predict(self, text: str) -> np.ndarray:
+        inputs = self.tokenizer(text, return_tensors="np", truncation=True, max_length=self.max_length)
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        logits = self.session.run(None, feed)[0][0]
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+def default_num_threads() -> int:
+    """
+    Inference threads for this host: the CPUs available to the process,
+    leaving one for the event loop and the generation subprocesses.
+    """
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    return max(available - 1, 1)
+
+def model_revision(model, model_path: str) -> str:
+    """
+    Identify the exact weights of a model, so cached artifacts are rebuilt when the model changes.
+
+    Args:
+        model: Loaded model
+        model_path: Hub ID or local path the model was loaded from
+
+    Returns:
+        Hub commit hash, or a hash of the local weight files' sizes and modification times
+    """
+    commit = getattr(model.config, "_commit_hash", None)
+    if commit:
+        return commit
+
+    digest = hashlib.sha1(model_path.encode("utf-8"))
+    if os.path.isdir(model_path):
+        for name in sorted(os.listdir(model_path)):
+            stat = os.stat(os.path.join(model_path, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def export_onnx(model, tokenizer, model_path: str, cache_dir: str) -> str:
+    """
+    Export a model to ONNX, reusing a cached export of the same revision.
+
+    Args:
+        model: Loaded fp32 model
+        tokenizer: The model's tokenizer
+        model_path: Hub ID or local path the model was loaded from
+        cache_dir: Directory for exported models
+
+    Returns:
+        Path of the ONNX file
+    """
+    import torch
+
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_path.strip("/"))
+    export_dir = os.path.join(cache_dir, name, model_revision(model, model_path))
+    onnx_path = os.path.join(export_dir, "model.onnx")
+    if os.path.exists(onnx_path):
+        logger.info(f"Using cached ONNX export {onnx_path}")
+        return onnx_path
+
+    os.makedirs(export_dir, exist_ok=True)
+    start_time = time.time()
+    sample = tokenizer("example prompt", return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {input_name: {0: "batch", 1: "sequence"} for input_name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    model = model.to("cpu").eval()
+    # Write to a temporary file first so an interrupted export is never used
+    temp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dict(sample),),
+            temp_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    os.replace(temp_path, onnx_path)
+    logger.info(f"Exported {model_path} to ONNX in {time.time() - start_time:.2f} seconds")
+    return onnx_path
+
+def create_classifier(model, tokenizer, model_path: str, backend: str = BACKEND_TORCH, device: str = "cpu",
+                      cache_dir: str = os.path.join("models", "onnx"), num_threads: int = 0,
+                      parity_tolerance: float = 0.05):
+    """
+    Create a classifier for a loaded model using the requested backend.
+    An optimized backend is only used on CPU, and only if it agrees with the
+    fp32 model on the parity prompts; otherwise the fp32 model is used.
+
+    Args:
+        model: Loaded fp32 model
+        tokenizer: The model's tokenizer
+        model_path: Hub ID or local path the model was loaded from
+        backend: torch, quantized or onnx
+        device: Device the model is on
+        cache_dir: Directory for exported ONNX models
+        num_threads: Inference threads, 0 to choose from the host's CPUs
+        parity_tolerance: Largest allowed difference in any class probability
+
+    Returns:
+        The classifier
+    """
+    reference = SequenceClassifier(model, tokenizer, device)
+    if backend == BACKEND_TORCH or device != "cpu":
+        return reference
+
+    import torch
+    torch.set_num_threads(num_threads or default_num_threads())
+
+    try:
+        if backend == BACKEND_QUANTIZED:
+            candidate = QuantizedClassifier(model, tokenizer)
+        elif backend == BACKEND_ONNX:
+            candidate = OnnxClassifier(model, tokenizer, model_path, cache_dir, num_threads)
+        else:
+            logger.warning(f"Unknown content filter backend '{backend}', using {BACKEND_TORCH}")
+            return reference
+    except Exception as e:
+        logger.warning(f"Could not create the {backend} backend for {model_path}, using {BACKEND_TORCH}: {e}")
+        return reference
+
+    report = check_parity(reference, candidate)
+    logger.info(
+        f"{backend} backend for {model_path}: label agreement {report['agreement']:.0%}, "
+        f"max probability difference {report['max_difference']:.4f}, "
+        f"latency {report['reference_latency'] * 1000:.1f} ms -> {report['candidate_latency'] * 1000:.1f} ms"
+    )
+    if report['agreement'] < 1.0 or report['max_difference'] > parity_tolerance:
+        logger.warning(f"The {backend} backend for {model_path} failed the parity check, using {BACKEND_TORCH}")
+        return reference
+    return candidate
+
+def check_parity(reference, candidate, prompts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compare a classifier against the fp32 reference.
+
+    Args:
+        reference: fp32 classifier
+        candidate: Optimized classifier
+        prompts: Prompts to compare on, defaults to PARITY_PROMPTS
+
+    Returns:
+        Dictionary with the label agreement rate, the largest difference in any
+        class probability and the median latency of each classifier in seconds
+    """
+    prompts = prompts or PARITY_PROMPTS
+    agreements = 0
+    max_difference = 0.0
+    reference_times, candidate_times = [], []
+
+    for prompt in prompts:
+        start = time.perf_counter()
+        expected = reference.predict(prompt)
+        reference_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        actual = candidate.predict(prompt)
+        candidate_times.append(time.perf_counter() - start)
+
+        agreements += int(np.argmax(expected) == np.argmax(actual))
+        max_difference = max(max_difference, float(np.max(np.abs(expected - actual))))
+
+    return {
+        'prompts': len(prompts),
+        'agreement': agreements / len(prompts),
+        'max_difference': max_difference,
+        'reference_latency': float(np.median(reference_times)),
+        'candidate_latency': float(np.median(candidate_times))
+    }
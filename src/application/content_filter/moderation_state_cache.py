@@ -0,0 +1,197 @@
+"""
+In-memory cache of user moderation state.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Callable
+
+from src.infrastructure.database.database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+class ModerationStateCache:
+    """
+    In-memory cache of bans, temporary restriction expiries and warning counts.
+    Loaded once from the database and kept up to date write-through by the
+    content filter service, so checking a user who is neither banned nor warned
+    does no I/O. Temporary restrictions are kept in a heap and lifted by a
+    single event loop timer when the earliest one expires.
+    """
+
+    def __init__(self, on_restriction_expired: Callable[[str], None]):
+        """
+        Initialize the cache.
+
+        Args:
+            on_restriction_expired: Called with the user ID when a temporary restriction expires
+        """
+        self.on_restriction_expired = on_restriction_expired
+        self._bans: Dict[str, Optional[float]] = {}  # user_id -> expires_at, None for permanent bans
+        self._warning_counts: Dict[str, int] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_due: Optional[float] = None
+
+    def load(self, database_service: DatabaseService):
+        """
+        Load the moderation state from the database.
+
+        Args:
+            database_service: Service for database access
+        """
+        self._bans = {}
+        self._expiry_heap = []
+        for user_id, is_permanent, expires_at in database_service.fetch_all(
+            "SELECT user_id, is_permanent, expires_at FROM banned_users"
+        ):
+            if is_permanent:
+                self._bans[user_id] = None
+            else:
+                self._bans[user_id] = expires_at or 0
+                heapq.heappush(self._expiry_heap, (expires_at or 0, user_id))
+
+        self._warning_counts = {
+            row[0]: row[1]
+            for row in database_service.fetch_all("SELECT user_id, COUNT(*) FROM user_warnings GROUP BY user_id")
+        }
+
+        logger.info(f"Loaded moderation state: {len(self._bans)} banned users, {len(self._warning_counts)} warned users")
+        self._schedule()
+
+    def is_banned(self, user_id: str) -> bool:
+        """
+        Check if a user is banned or restricted.
+
+        Args:
+            user_id: ID of the user
+
+        Returns:
+            True if the user is banned or has an active restriction
+        """
+        if user_id not in self._bans:
+            return False
+
+        expires_at = self._bans[user_id]
+        if expires_at is None:
+            return True
+
+        if time.time() > expires_at:
+            # The timer hasn't fired yet (or no event loop is running), lift it now
+            self._expire(user_id)
+            return False
+
+        return True
+
+    def get_warning_count(self, user_id: str) -> int:
+        """
+        Get the number of warnings for a user.
+
+        Args:
+            user_id: ID of the user
+
+        Returns:
+            Number of warnings
+        """
+        return self._warning_counts.get(user_id, 0)
+
+    def set_ban(self, user_id: str, expires_at: Optional[float] = None):
+        """
+        Record a ban or temporary restriction.
+
+        Args:
+            user_id: ID of the user
+            expires_at: Expiry time of a temporary restriction, None for a permanent ban
+        """
+        self._bans[user_id] = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, user_id))
+            self._schedule()
+
+    def remove_ban(self, user_id: str):
+        """
+        Remove a ban or restriction. Its heap entry is skipped when it comes up.
+
+        Args:
+            user_id: ID of the user
+        """
+        self._bans.pop(user_id, None)
+
+    def add_warning(self, user_id: str):
+        """
+        Count a new warning for a user.
+
+        Args:
+            user_id: ID of the user
+        """
+        self._warning_counts[user_id] = self._warning_counts.get(user_id, 0) + 1
+
+    def remove_warning(self, user_id: str):
+        """
+        Uncount a removed warning for a user.
+
+        Args:
+            user_id: ID of the user
+        """
+        count = self._warning_counts.get(user_id, 0) - 1
+        if count > 0:
+            self._warning_counts[user_id] = count
+        else:
+            self._warning_counts.pop(user_id, None)
+
+    def clear_warnings(self, user_id: str):
+        """
+        Reset the warning count for a user.
+
+        Args:
+            user_id: ID of the user
+        """
+        self._warning_counts.pop(user_id, None)
+
+    def _expire(self, user_id: str):
+        """Lift an expired restriction"""
+        self._bans.pop(user_id, None)
+        try:
+            self.on_restriction_expired(user_id)
+        except Exception as e:
+            logger.error(f"Error lifting expired restriction for user {user_id}: {e}")
+
+    def _on_timer(self):
+        """Lift all restrictions that have expired and schedule the next one"""
+        self._timer = None
+        self._timer_due = None
+        now = time.time()
+
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self._expiry_heap)
+            # Skip entries for users that were unbanned or re-restricted since
+            if self._bans.get(user_id, -1) == expires_at:
+                self._expire(user_id)
+
+        self._schedule()
+
+    def _schedule(self):
+        """Arm the timer for the earliest restriction expiry"""
+        # Drop stale heap entries so the timer doesn't fire for nothing
+        while self._expiry_heap and self._bans.get(self._expiry_heap[0][1], -1) != self._expiry_heap[0][0]:
+            heapq.heappop(self._expiry_heap)
+
+        if not self._expiry_heap:
+            return
+
+        due = self._expiry_heap[0][0]
+        if self._timer is not None and self._timer_due is not None and self._timer_due <= due:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop yet; is_banned lifts expired restrictions lazily
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_later(max(due - time.time(), 0), self._on_timer)
+        self._timer_due = due
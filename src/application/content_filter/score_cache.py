@@ -0,0 +1,112 @@
+"""
+Cache of moderation model scores.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalize a prompt for scoring, so resubmissions that only differ in
+    surrounding or repeated whitespace share a cache entry.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        The prompt with whitespace runs collapsed to single spaces
+    """
+    return " ".join(text.split())
+
+class ScoreCache:
+    """
+    LRU cache of raw class probabilities with a time to live.
+    Only scores are cached, never verdicts, so thresholds, context rules and
+    the per-user warning logic are applied to every submission.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 3600.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached scores, 0 to disable the cache
+            ttl: Seconds a score stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (stored_at, probabilities)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._lookups = MetricsRegistry().counter(
+            "moderation_score_cache_total", "Moderation score cache lookups by result", ("result",)
+        )
+
+    @staticmethod
+    def make_key(model: str, revision: str, text: str) -> str:
+        """
+        Build the cache key of a prompt.
+
+        Args:
+            model: Which model scored the prompt
+            revision: Revision and backend of the model
+            text: Normalized prompt
+
+        Returns:
+            Hash of the model, revision and prompt
+        """
+        return hashlib.sha256(f"{model}\0{revision}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get cached scores.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The probabilities, or None if they aren't cached or have expired
+        """
+        if not self.max_entries:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        self._lookups.inc(("hit" if entry is not None else "miss",))
+        return entry[1] if entry is not None else None
+
+    def put(self, key: str, probs: Any):
+        """
+        Cache scores, evicting the least recently used entries when full.
+
+        Args:
+            key: Cache key
+            probs: Probability of each class
+        """
+        if not self.max_entries:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), probs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached scores"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
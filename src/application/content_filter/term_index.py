@@ -0,0 +1,133 @@
+"""
+Word-boundary index of the content filter's term lists.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Words of a prompt; apostrophes stay inside words so "don't" is one token
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Inflection suffixes removed when a word isn't a term itself, so "kids", "killed"
+# and "hurting" still match "kid", "kill" and "hurt"
+_SUFFIXES = ("s", "es", "ed", "d", "ing")
+
+def _word_forms(word: str) -> Tuple[str, ...]:
+    """The word and its candidate stems"""
+    forms = [word]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            stem = word[:-len(suffix)]
+            forms.append(stem)
+            # "hitting" -> "hitt" -> "hit"
+            if len(stem) >= 4 and stem[-1] == stem[-2]:
+                forms.append(stem[:-1])
+    return tuple(forms)
+
+class TermMatches:
+    """The terms of each group found in one text"""
+
+    def __init__(self, matches: Dict[str, List[str]]):
+        self._matches = matches
+
+    def has(self, *groups: str) -> bool:
+        """Whether any term of the groups was found"""
+        return any(group in self._matches for group in groups)
+
+    def terms(self, group: str) -> List[str]:
+        """The terms of a group that were found, in the group's order"""
+        return self._matches.get(group, [])
+
+    def first(self, *groups: str):
+        """The first term found of the groups, in order, or None"""
+        for group in groups:
+            if group in self._matches:
+                return self._matches[group][0]
+        return None
+
+    @property
+    def groups(self) -> List[str]:
+        """The groups with at least one term found"""
+        return list(self._matches)
+
+# Words of a term; a trailing "*" makes the word a stem matching any word it starts
+_TERM_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?\*?")
+
+def _matches(word: str, expected: str) -> bool:
+    """Whether a word matches a term word: a stem it starts, the word itself or a simple inflection"""
+    if expected.endswith("*"):
+        return word.startswith(expected[:-1])
+    return expected in _word_forms(word)
+
+class TermIndex:
+    """
+    Term lists compiled into one index of words and phrases, matched on word
+    boundaries, so a prompt is scanned once for every list. Terms match whole
+    words (with simple inflections), so "son" no longer fires on "person" or
+    "song", nor "cat" on "education". A term ending in "*" is a stem matching
+    any word it starts, e.g. "violent*" catches "violently"; stems are kept to
+    terms long enough not to start unrelated words.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], cache_size: int = 256):
+        """
+        Compile term groups.
+
+        Args:
+            groups: Mapping of group name to terms; a term may be several words,
+                    and a word ending in "*" matches any word it starts
+            cache_size: Number of recent texts whose matches are kept
+        """
+        # first word -> list of (remaining words, group, term, position in group)
+        self._index: Dict[str, List[Tuple[Tuple[str, ...], str, str, int]]] = {}
+        # stem of the first word -> same entries, for terms starting with a stem
+        self._stem_index: Dict[str, List[Tuple[Tuple[str, ...], str, str, int]]] = {}
+        self._group_order = list(groups)
+        for group, terms in groups.items():
+            for position, term in enumerate(terms):
+                words = tuple(_TERM_WORD_PATTERN.findall(term.lower()))
+                if not words:
+                    continue
+                entry = (words[1:], group, term.replace("*", ""), position)
+                if words[0].endswith("*"):
+                    self._stem_index.setdefault(words[0][:-1], []).append(entry)
+                else:
+                    self._index.setdefault(words[0], []).append(entry)
+        self._shortest_stem = min(map(len, self._stem_index), default=0)
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _candidates(self, word: str):
+        """The entries whose first word matches a word"""
+        for form in _word_forms(word):
+            yield from self._index.get(form, ())
+        if self._stem_index:
+            for end in range(max(self._shortest_stem, 1), len(word) + 1):
+                yield from self._stem_index.get(word[:end], ())
+
+    def _scan(self, text: str) -> TermMatches:
+        """
+        Find the terms of every group in a text in a single pass over its words.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            The matched terms of each group
+        """
+        words = _TOKEN_PATTERN.findall(text.lower())
+        found: Dict[str, Dict[str, int]] = {}
+        for i, word in enumerate(words):
+            for rest, group, term, position in self._candidates(word):
+                following = words[i + 1:i + 1 + len(rest)]
+                if len(following) < len(rest) or not all(
+                    _matches(actual, expected) for expected, actual in zip(rest, following)
+                ):
+                    continue
+                found.setdefault(group, {})[term] = position
+
+        matches = {
+            group: sorted(found[group], key=found[group].get)
+            for group in self._group_order if group in found
+        }
+        return TermMatches(matches)
@@ -6,7 +6,6 @@ import os
 import logging
 import time
 from typing import Tuple, Dict, Any, Optional, List
-import torch
 from src.infrastructure.config.config_manager import ConfigManager
 
 # Configure logging
@@ -28,12 +27,13 @@ class TransformerContentFilter:
             cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, defer_loading: bool = False):
         """
         Initialize the transformer content filter service.
 
         Args:
             model_path: Optional path to a pre-trained model. If None, will use a default model.
+            defer_loading: Don't load the model until load_models() is called
         """
         # Only initialize once (singleton pattern)
         if self._initialized:
@@ -53,16 +53,28 @@ class TransformerContentFilter:
 
         self.model = None
         self.tokenizer = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = "cpu"
         self.model_path = model_path
         self.initialized_time = None
         self.categories = []
 
         # Initialize the model
-        self._initialize_model()
+        if not defer_loading:
+            self.load_models()
 
         self._initialized = True
 
+    def load_models(self) -> bool:
+        """
+        Import torch and load the model. Slow, so callers on the event loop should run it in an executor.
+
+        Returns:
+            True if the model was loaded, False otherwise
+        """
+        import torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._initialize_model()
+
     def _initialize_model(self):
         """Initialize the transformer model for content filtering"""
         try:
@@ -206,6 +218,7 @@ class TransformerContentFilter:
             inputs = {k: v.to(self.device) for k, v in inputs.items()}
 
             # Get model predictions
+            import torch
             with torch.no_grad():
                 outputs = self.model(**inputs)
 
@@ -282,6 +295,7 @@ class TransformerContentFilter:
             inputs = {k: v.to(self.device) for k, v in inputs.items()}
 
             # Get model predictions
+            import torch
             with torch.no_grad():
                 outputs = self.model(**inputs)
 
@@ -0,0 +1,227 @@
+"""
+Preflight validation of workflows against what ComfyUI has installed.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from src.domain.models.queue_item import RequestItem, ReduxRequestItem, ReduxPromptRequestItem
+from src.domain.lora_management import LoraManager
+from src.infrastructure.comfyui.comfyui_service import ComfyUIService
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# File extensions of the models ComfyUI lists in /object_info
+MODEL_EXTENSIONS = ('.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.gguf', '.sft')
+
+def _normalize_path(path: str) -> str:
+    """ComfyUI on Windows lists models with backslashes"""
+    return path.replace('\\', '/')
+
+def _is_model_file(value: Any) -> bool:
+    """Whether an input value names a model file"""
+    return isinstance(value, str) and value.lower().endswith(MODEL_EXTENSIONS)
+
+class ObjectInfo:
+    """
+    The parts of ComfyUI's /object_info a workflow is checked against: the
+    installed node classes and the model files each of their inputs accepts.
+    """
+
+    def __init__(self, object_info: Dict[str, Any]):
+        """
+        Initialize from an /object_info response.
+
+        Args:
+            object_info: Node class definitions by class name
+        """
+        self.fetched_at = time.monotonic()
+        self.node_classes: Set[str] = set(object_info)
+        # (class name, input name) -> model files the input can choose from
+        self.model_choices: Dict[Tuple[str, str], Set[str]] = {}
+        self.loras: Set[str] = set()
+
+        for class_name, definition in object_info.items():
+            inputs = (definition or {}).get('input') or {}
+            for section in ('required', 'optional'):
+                for input_name, spec in (inputs.get(section) or {}).items():
+                    # Enumerated inputs are [[choice, ...], {options}]
+                    if not isinstance(spec, list) or not spec or not isinstance(spec[0], list):
+                        continue
+                    models = {_normalize_path(c) for c in spec[0] if _is_model_file(c)}
+                    if not models:
+                        continue
+                    self.model_choices[(class_name, input_name)] = models
+                    if input_name == 'lora_name':
+                        self.loras |= models
+
+    def check_workflow(self, workflow: Dict[str, Any]) -> List[str]:
+        """
+        Find the nodes and models of a workflow that ComfyUI doesn't have.
+
+        Args:
+            workflow: ComfyUI workflow in API format
+
+        Returns:
+            Descriptions of the problems found
+        """
+        problems = []
+        for node_id, node in workflow.items():
+            class_name = node.get('class_type') if isinstance(node, dict) else None
+            if not class_name:
+                continue
+            if class_name not in self.node_classes:
+                problems.append(f"node type {class_name} is not installed")
+                continue
+            for input_name, value in (node.get('inputs') or {}).items():
+                choices = self.model_choices.get((class_name, input_name))
+                if choices and _is_model_file(value) and _normalize_path(value) not in choices:
+                    problems.append(f"model {value} is missing")
+        return problems
+
+    def check_loras(self, loras: Iterable[str]) -> List[str]:
+        """
+        Find the LoRAs that ComfyUI doesn't have.
+
+        Args:
+            loras: LoRA filenames
+
+        Returns:
+            Descriptions of the problems found
+        """
+        if not self.loras:
+            # No LoraLoader to list them; nothing to check against
+            return []
+        return [f"LoRA {lora} is missing" for lora in loras if _normalize_path(lora) not in self.loras]
+
+class WorkflowPreflight:
+    """
+    Rejects requests ComfyUI would fail on, such as a missing LoRA file, a
+    renamed UNET or a custom node that isn't installed, before they take a
+    queue slot. ComfyUI's /object_info is fetched at startup and refreshed
+    periodically, and once more before rejecting a request in case a model
+    was added since. Requests pass while ComfyUI's inventory is unknown.
+    """
+
+    def __init__(self,
+                 comfyui_service: ComfyUIService,
+                 render_workflow: Callable[[Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem]], Optional[Dict[str, Any]]],
+                 refresh_interval: float = 300.0,
+                 min_refresh_interval: float = 30.0):
+        """
+        Initialize the preflight.
+
+        Args:
+            comfyui_service: Service for interacting with ComfyUI
+            render_workflow: Function building the workflow of a request
+            refresh_interval: Seconds between /object_info refreshes
+            min_refresh_interval: Minimum seconds between refreshes triggered by a failed check
+        """
+        self.comfyui_service = comfyui_service
+        self.render_workflow = render_workflow
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.object_info: Optional[ObjectInfo] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._rejections = MetricsRegistry().counter(
+            "preflight_rejections_total", "Requests rejected before queueing by reason", ("reason",)
+        )
+
+    async def start(self):
+        """Fetch ComfyUI's inventory and refresh it periodically in the background"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_periodically(self):
+        """Background task that refreshes the inventory every refresh interval"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self) -> bool:
+        """
+        Fetch ComfyUI's /object_info, sharing a fetch that is already running.
+
+        Returns:
+            True if the inventory was updated
+        """
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._fetch())
+        return await asyncio.shield(self._refreshing)
+
+    async def _fetch(self) -> bool:
+        """Fetch /object_info off the event loop; the last inventory is kept on failure"""
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(None, self.comfyui_service.get_object_info)
+            self.object_info = ObjectInfo(response)
+        except Exception as e:
+            logger.warning(f"Could not refresh ComfyUI object info, keeping the last one: {e}")
+            return False
+
+        logger.info(f"Loaded ComfyUI object info: {len(self.object_info.node_classes)} node types, "
+                    f"{len(self.object_info.loras)} LoRAs")
+        known = self.object_info.loras
+        missing = [lora['file'] for lora in LoraManager().get_all_loras()
+                   if known and _normalize_path(lora['file']) not in known]
+        if missing:
+            logger.warning(f"LoRAs in lora.json that ComfyUI doesn't have: {', '.join(missing)}")
+        return True
+
+    async def check(self, request_item: Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem]) -> Optional[str]:
+        """
+        Check that ComfyUI can run a request.
+
+        Args:
+            request_item: The request to check
+
+        Returns:
+            A message for the user if the request can't run, None if it can
+        """
+        if self.object_info is None:
+            return None
+
+        try:
+            workflow = await asyncio.get_running_loop().run_in_executor(None, self.render_workflow, request_item)
+        except Exception as e:
+            logger.error(f"Error rendering workflow for preflight: {e}")
+            return None
+        if not workflow:
+            self._rejections.inc(("workflow",))
+            return "The workflow for this request could not be loaded."
+
+        loras = [lora.get('lora') or lora.get('name') if isinstance(lora, dict) else lora
+                 for lora in getattr(request_item, 'loras', None) or []]
+        loras = [lora for lora in loras if lora]
+
+        problems = self._problems(workflow, loras)
+        if problems and time.monotonic() - self.object_info.fetched_at > self.min_refresh_interval:
+            # The model may have been added since the last refresh
+            await self.refresh()
+            problems = self._problems(workflow, loras)
+        if not problems:
+            return None
+
+        logger.warning(f"Rejected request before queueing: {'; '.join(problems)}")
+        self._rejections.inc(("lora" if all(p.startswith("LoRA") for p in problems) else "workflow",))
+        return f"ComfyUI can't run this request: {'; '.join(problems)}."
+
+    def _problems(self, workflow: Dict[str, Any], loras: List[str]) -> List[str]:
+        """Check a workflow and LoRA selection against the current inventory"""
+        problems = self.object_info.check_workflow(workflow)
+        problems += [p for p in self.object_info.check_loras(loras) if p not in problems]
+        return problems
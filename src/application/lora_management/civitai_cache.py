@@ -0,0 +1,253 @@
+"""
+Cache of Civitai model metadata and preview images.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before asking Civitai again after an error or rate limit
+ERROR_RETRY_SECONDS = 300.0
+
+def extract_model_id(url: str) -> Optional[str]:
+    """
+    Extract the model ID from a Civitai model URL.
+
+    Args:
+        url: URL such as https://civitai.com/models/1437171/name?modelVersionId=1
+
+    Returns:
+        The model ID, or None if the URL isn't a Civitai model URL
+    """
+    if not url or 'civitai.com' not in url:
+        return None
+    match = re.search(r'models/([0-9]+)', url)
+    return match.group(1) if match else None
+
+class CivitaiModelInfo:
+    """Cached metadata of a Civitai model, or the record that it doesn't exist"""
+
+    __slots__ = ('model_id', 'found', 'name', 'preview_url', 'etag', 'last_modified', 'expires_at')
+
+    def __init__(self, model_id: str, found: bool, name: Optional[str] = None, preview_url: Optional[str] = None,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None, expires_at: float = 0.0):
+        """
+        Initialize the info.
+
+        Args:
+            model_id: Civitai model ID
+            found: Whether the model exists
+            name: Model name
+            preview_url: URL of the model's first preview image
+            etag: ETag to revalidate the metadata with
+            last_modified: Last-Modified date to revalidate the metadata with
+            expires_at: Time after which the metadata must be revalidated
+        """
+        self.model_id = model_id
+        self.found = found
+        self.name = name
+        self.preview_url = preview_url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_metadata(cls, model_id: str, data: Dict[str, Any], **kwargs) -> 'CivitaiModelInfo':
+        """Build the info from the API's model metadata, keeping only what is shown"""
+        preview_url = None
+        versions = data.get('modelVersions') or []
+        if versions and versions[0].get('images'):
+            preview_url = versions[0]['images'][0].get('url')
+        return cls(model_id, True, data.get('name'), preview_url, **kwargs)
+
+class CivitaiCache:
+    """
+    Civitai model metadata cached in memory and SQLite with a time to live.
+    Expired entries are revalidated with ETag / If-Modified-Since, models that
+    don't exist are remembered for a shorter time, and an entry that can't be
+    refreshed keeps being served while Civitai is unreachable. Concurrent
+    lookups of the same model share one request, and requests to Civitai are
+    capped so prefetching a page can't get the bot rate-limited.
+    """
+
+    def __init__(self, client, ttl: float = 86400.0, negative_ttl: float = 3600.0,
+                 max_concurrency: int = 4, database_service: Optional[DatabaseService] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            client: CivitaiClient, or LocalCivitaiClient as a stand-in
+            ttl: Seconds model metadata stays fresh
+            negative_ttl: Seconds a missing model is remembered
+            max_concurrency: Maximum concurrent requests to Civitai
+            database_service: Database to persist the metadata to, None to keep it in memory only
+        """
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.database_service = database_service
+        self._entries: Dict[str, CivitaiModelInfo] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._prefetches: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._lookups = MetricsRegistry().counter(
+            "civitai_cache_total", "Civitai metadata lookups by result", ("result",)
+        )
+
+        if self.database_service:
+            try:
+                self.database_service.create_table(
+                    "civitai_model_cache",
+                    {
+                        "model_id": "TEXT PRIMARY KEY",
+                        "found": "INTEGER NOT NULL",
+                        "name": "TEXT",
+                        "preview_url": "TEXT",
+                        "etag": "TEXT",
+                        "last_modified": "TEXT",
+                        "expires_at": "REAL NOT NULL"
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error creating Civitai cache table, not persisting: {e}")
+                self.database_service = None
+
+    async def get(self, model_id: str) -> Optional[CivitaiModelInfo]:
+        """
+        Get a model's metadata, fetching it from Civitai if it isn't cached or has expired.
+
+        Args:
+            model_id: Civitai model ID
+
+        Returns:
+            The model's info, or None if the model doesn't exist or Civitai couldn't be reached
+        """
+        model_id = str(model_id)
+        entry = self._entries.get(model_id)
+        if entry is not None and entry.expires_at > time.time():
+            self._lookups.inc(("hit",))
+            return entry if entry.found else None
+
+        task = self._pending.get(model_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(model_id, entry))
+            self._pending[model_id] = task
+            task.add_done_callback(lambda _: self._pending.pop(model_id, None))
+        # A caller giving up mustn't cancel the lookup shared with others
+        entry = await asyncio.shield(task)
+        return entry if entry is not None and entry.found else None
+
+    async def get_preview_url(self, model_id: str) -> Optional[str]:
+        """
+        Get the URL of a model's first preview image.
+
+        Args:
+            model_id: Civitai model ID
+
+        Returns:
+            The image URL, or None if there is none
+        """
+        entry = await self.get(model_id)
+        return entry.preview_url if entry else None
+
+    def prefetch(self, model_ids: Iterable[str]):
+        """
+        Start fetching models in the background, e.g. those on the next page.
+
+        Args:
+            model_ids: Civitai model IDs
+        """
+        now = time.time()
+        for model_id in {str(m) for m in model_ids if m}:
+            entry = self._entries.get(model_id)
+            if model_id in self._pending or (entry is not None and entry.expires_at > now):
+                continue
+            task = asyncio.create_task(self.get(model_id))
+            self._prefetches.add(task)
+            task.add_done_callback(self._prefetches.discard)
+
+    async def _refresh(self, model_id: str, entry: Optional[CivitaiModelInfo]) -> Optional[CivitaiModelInfo]:
+        """Load a model from the database or fetch it from Civitai, revalidating what is cached"""
+        if entry is None and self.database_service:
+            entry = await asyncio.get_running_loop().run_in_executor(None, self._load, model_id)
+            if entry is not None:
+                self._entries[model_id] = entry
+                if entry.expires_at > time.time():
+                    self._lookups.inc(("hit",))
+                    return entry
+
+        async with self._semaphore:
+            try:
+                validators = (entry.etag, entry.last_modified) if entry is not None and entry.found else (None, None)
+                response = await self.client.get_model(model_id, *validators)
+            except Exception as e:
+                logger.warning(f"Error fetching Civitai model {model_id}: {e}")
+                response = None
+
+        now = time.time()
+        if response is not None and response.status == 304 and entry is not None:
+            entry.expires_at = now + self.ttl
+            if response.etag:
+                entry.etag = response.etag
+            result = "revalidated"
+        elif response is not None and response.status == 200 and response.data is not None:
+            entry = CivitaiModelInfo.from_metadata(
+                model_id, response.data, etag=response.etag,
+                last_modified=response.last_modified, expires_at=now + self.ttl
+            )
+            result = "miss"
+        elif response is not None and response.status == 404:
+            entry = CivitaiModelInfo(model_id, False, expires_at=now + self.negative_ttl)
+            result = "negative"
+        else:
+            if response is not None:
+                logger.warning(f"Failed to get Civitai model {model_id}: {response.status}")
+            # Serve what we have, or nothing, and leave Civitai alone for a while
+            if entry is None:
+                entry = CivitaiModelInfo(model_id, False)
+                self._lookups.inc(("error",))
+            else:
+                self._lookups.inc(("stale",))
+            entry.expires_at = now + ERROR_RETRY_SECONDS
+            self._entries[model_id] = entry
+            return entry
+
+        self._lookups.inc((result,))
+        self._entries[model_id] = entry
+        if self.database_service:
+            await asyncio.get_running_loop().run_in_executor(None, self._save, entry)
+        return entry
+
+    def _load(self, model_id: str) -> Optional[CivitaiModelInfo]:
+        """Read a model's entry from the database, expired or not"""
+        try:
+            row = self.database_service.fetch_one(
+                "SELECT found, name, preview_url, etag, last_modified, expires_at "
+                "FROM civitai_model_cache WHERE model_id = ?",
+                (model_id,)
+            )
+        except Exception as e:
+            logger.error(f"Error reading Civitai cache: {e}")
+            return None
+        if not row:
+            return None
+        return CivitaiModelInfo(model_id, bool(row[0]), row[1], row[2], row[3], row[4], row[5])
+
+    def _save(self, entry: CivitaiModelInfo):
+        """Write a model's entry to the database"""
+        try:
+            self.database_service.execute(
+                "INSERT OR REPLACE INTO civitai_model_cache "
+                "(model_id, found, name, preview_url, etag, last_modified, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry.model_id, int(entry.found), entry.name, entry.preview_url,
+                 entry.etag, entry.last_modified, entry.expires_at)
+            )
+        except Exception as e:
+            logger.error(f"Error writing Civitai cache: {e}")
@@ -12,6 +12,10 @@ from src.domain.models.queue_item import QueueItem, QueueStatus, QueuePriority,
 from src.domain.interfaces.queue_repository import QueueRepository
 from src.domain.events.event_bus import EventBus
 from src.domain.events.common_events import ImageGenerationRequestedEvent, ImageGenerationCompletedEvent, ImageGenerationFailedEvent
+from src.application.queue.rate_limiter import RateLimiter
+from src.application.analytics.trace_service import TraceService
+from src.domain.models.job_trace import PHASE_DEQUEUED, PHASE_FAILED
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +29,11 @@ class QueueService:
                  queue_repository: QueueRepository,
                  max_concurrent: int = 3,
                  rate_limit: int = 50,
-                 rate_window: float = 3600):
+                 rate_window: float = 3600,
+                 role_limits: Optional[Dict[str, int]] = None,
+                 job_costs: Optional[Dict[str, float]] = None,
+                 reservation_ttl: float = 900,
+                 preflight: Optional[Callable[[Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem]], Awaitable[Optional[str]]]] = None):
         """
         Initialize the queue service.
 
@@ -34,6 +42,10 @@ class QueueService:
             max_concurrent: Maximum number of concurrent requests to process
             rate_limit: Maximum number of requests per user in the rate window
             rate_window: Time window for rate limiting in seconds (default: 1 hour)
+            role_limits: Maximum number of requests in the rate window for specific roles
+            job_costs: Number of requests each job type counts as
+            reservation_ttl: Seconds a reservation holds its place before it is released
+            preflight: Check run before a request is queued, returning why it can't run or None
         """
         self.repository = queue_repository
         self.queue = asyncio.PriorityQueue()
@@ -43,11 +55,65 @@ class QueueService:
         self.rate_window = rate_window
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self.event_bus = EventBus()
+        self.rate_limiter = RateLimiter(rate_limit, rate_window, role_limits=role_limits, job_costs=job_costs)
+        self.trace_service = TraceService()
+        # Reserved items by request ID, with the rate limit role they were reserved with
+        self.reservations: Dict[str, Tuple[QueueItem, Optional[str]]] = {}
+        self.reservation_ttl = reservation_ttl
+        self.preflight = preflight
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """Register queue gauges, computed from the queue only when scraped"""
+        registry = MetricsRegistry()
+        registry.gauge("queue_depth", "Queued jobs by priority and job type",
+                       ("priority", "job_type"), function=self._queue_depth)
+        registry.gauge("jobs_in_flight", "Jobs being processed by backend and job type",
+                       ("backend", "job_type"), function=self._jobs_in_flight)
+
+    def _queue_depth(self) -> Dict[Tuple[str, str], float]:
+        """Count queued items by priority and job type"""
+        depth: Dict[Tuple[str, str], float] = {}
+        # PriorityQueue keeps its items in a heap list
+        for item in list(getattr(self.queue, '_queue', [])):
+            key = (QueuePriority(item.priority).name.lower(), self._get_job_type(item.request_item))
+            depth[key] = depth.get(key, 0) + 1
+        return depth
+
+    def _jobs_in_flight(self) -> Dict[Tuple[str, str], float]:
+        """Count processing items by backend and job type"""
+        in_flight: Dict[Tuple[str, str], float] = {}
+        for item in list(self.processing.values()):
+            key = ("comfyui", self._get_job_type(item.request_item))
+            in_flight[key] = in_flight.get(key, 0) + 1
+        return in_flight
 
     async def initialize(self):
         """Initialize the queue service and load pending items"""
+        self.rate_limiter.hydrate(await self.repository.get_user_rate_limit_states())
         await self._load_pending_items()
 
+    @staticmethod
+    def _get_job_type(request_item: Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem]) -> str:
+        """
+        Get the job type of a request for rate limiting and tracing.
+
+        Args:
+            request_item: The request item
+
+        Returns:
+            Job type (standard, pulid, redux, reduxprompt or video)
+        """
+        if getattr(request_item, 'is_video', False):
+            return "video"
+        if isinstance(request_item, ReduxRequestItem):
+            return "redux"
+        if isinstance(request_item, ReduxPromptRequestItem):
+            return "reduxprompt"
+        if getattr(request_item, 'is_pulid', False):
+            return "pulid"
+        return "standard"
+
     async def _load_pending_items(self):
         """Load pending items from the repository"""
         items = await self.repository.get_pending_items()
@@ -70,23 +136,53 @@ class QueueService:
 
     async def add_request(self,
                          request_item: Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem],
-                         priority: int = QueuePriority.NORMAL) -> Tuple[bool, str, str]:
+                         priority: int = QueuePriority.NORMAL,
+                         role: Optional[str] = None) -> Tuple[bool, str, str]:
         """
         Add a request to the queue.
 
         Args:
             request_item: The request item to add
             priority: Priority level for the request
+            role: Rate limit role to use instead of the user's recorded role
 
         Returns:
             Tuple of (success, request_id, message)
         """
+        success, request_id, message = self.reserve(request_item, priority, role)
+        if not success:
+            return False, "", message
+        return await self.commit_reservation(request_id)
+
+    def reserve(self,
+                request_item: Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem],
+                priority: int = QueuePriority.NORMAL,
+                role: Optional[str] = None) -> Tuple[bool, str, str]:
+        """
+        Reserve a place in the queue for a request that is still being checked.
+        The rate limit is charged now and the place is held from now: once the
+        reservation is committed, the request is ordered as if it had been
+        queued when it was reserved. Releasing it gives the rate limit back.
+
+        Args:
+            request_item: The request item to reserve a place for
+            priority: Priority level for the request
+            role: Rate limit role to use instead of the user's recorded role
+
+        Returns:
+            Tuple of (success, request_id, message)
+        """
+        self._expire_reservations()
         user_id = request_item.user_id
 
         # Check rate limit
-        request_count = await self.repository.get_user_request_count(user_id, self.rate_window)
-        if request_count >= self.rate_limit:
-            return False, "", f"Rate limit exceeded. You can make {self.rate_limit} requests per {self.rate_window/3600:.1f} hours."
+        allowed, retry_after, tat = self.rate_limiter.try_acquire(user_id, self._get_job_type(request_item), role)
+        if not allowed:
+            limit = self.rate_limiter.get_limit(user_id, role)
+            return False, "", (
+                f"Rate limit exceeded. You can make {limit} requests per {self.rate_window/3600:.1f} hours. "
+                f"Try again in {retry_after / 60:.0f} minutes."
+            )
 
         # Create queue item
         request_id = str(uuid.uuid4())
@@ -96,10 +192,49 @@ class QueueService:
             priority=priority,
             user_id=user_id
         )
+        self.reservations[request_id] = (item, role)
+        return True, request_id, "Place reserved in the queue"
+
+    async def commit_reservation(self,
+                                 request_id: str,
+                                 request_item: Optional[Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem]] = None
+                                 ) -> Tuple[bool, str, str]:
+        """
+        Add a reserved request to the queue.
+
+        Args:
+            request_id: ID returned by reserve()
+            request_item: Final version of the request item, if it changed since it was reserved
+
+        Returns:
+            Tuple of (success, request_id, message)
+        """
+        reservation = self.reservations.get(request_id)
+        if reservation is None:
+            return False, "", "Your place in the queue expired. Please submit the request again."
+
+        item = reservation[0]
+        if request_item is not None:
+            item.request_item = request_item
+        request_item = item.request_item
+        user_id = item.user_id
+
+        # Turn away requests ComfyUI can't run before they take a queue slot
+        if self.preflight:
+            problem = await self.preflight(request_item)
+            if problem:
+                self.release_reservation(request_id)
+                return False, "", problem
+
+        if self.reservations.pop(request_id, None) is None:
+            return False, "", "Your place in the queue expired. Please submit the request again."
 
         # Save to repository
         await self.repository.save_item(item)
-        await self.repository.update_user_rate_limit(user_id)
+        await self.repository.update_user_rate_limit(user_id, self.rate_limiter.get_tat(user_id))
+
+        # Trace the job, continuing any trace started before it was enqueued
+        self.trace_service.start(request_id, self._get_job_type(request_item), getattr(request_item, 'trace', None))
 
         # Add to queue
         await self._add_to_queue(item)
@@ -130,6 +265,32 @@ class QueueService:
         position = self.queue.qsize()
         return True, request_id, f"Request added to queue. Position: {position}"
 
+    def release_reservation(self, request_id: str) -> bool:
+        """
+        Give up a reserved place, e.g. when the request is rejected by moderation.
+
+        Args:
+            request_id: ID returned by reserve()
+
+        Returns:
+            True if the reservation was released, False if it was already committed or released
+        """
+        reservation = self.reservations.pop(request_id, None)
+        if reservation is None:
+            return False
+
+        item, role = reservation
+        self.rate_limiter.release(item.user_id, self._get_job_type(item.request_item), role)
+        return True
+
+    def _expire_reservations(self):
+        """Release reservations abandoned for longer than the reservation TTL"""
+        cutoff = time.time() - self.reservation_ttl
+        for request_id, (item, _) in list(self.reservations.items()):
+            if item.added_at < cutoff:
+                logger.warning(f"Releasing reservation {request_id} that was never committed")
+                self.release_reservation(request_id)
+
     async def get_next_request(self) -> Optional[QueueItem]:
         """
         Get the next request from the queue.
@@ -147,6 +308,7 @@ class QueueService:
         item.status = QueueStatus.PROCESSING
         item.started_at = time.time()
         self.processing[item.request_id] = item
+        self.trace_service.mark(item.request_id, PHASE_DEQUEUED)
         await self.repository.update_item_status(
             item.request_id,
             QueueStatus.PROCESSING.value,
@@ -194,6 +356,10 @@ class QueueService:
         # Mark queue task as done
         self.queue.task_done()
 
+        # Successful jobs are finished by the generation process; failed ones end here
+        if not success:
+            await self.trace_service.finish(request_id, PHASE_FAILED)
+
         # Publish event
         if success and image_path and generation_time:
             is_video = False
@@ -260,6 +426,7 @@ class QueueService:
             # Mark queue task as done
             self.queue.task_done()
 
+            self.trace_service.discard(request_id)
             return True
 
         # If not in processing, we need to find it in the queue
@@ -269,6 +436,7 @@ class QueueService:
             request_id,
             QueueStatus.CANCELLED.value
         )
+        self.trace_service.discard(request_id)
 
         return True
 
@@ -0,0 +1,174 @@
+"""
+In-memory rate limiter for queue submissions.
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Default cost of each job type, in requests
+DEFAULT_JOB_COSTS = {
+    "standard": 1.0,
+    "pulid": 2.0,
+    "redux": 2.0,
+    "reduxprompt": 2.0,
+    "video": 5.0
+}
+
+DEFAULT_ROLE = "default"
+
+class RateLimiter:
+    """
+    Per-user rate limiter using the generic cell rate algorithm (GCRA).
+    Each user is tracked by a single theoretical arrival time (TAT), so a check
+    is O(1) and does no I/O. A user with limit L per window W may submit up to
+    L cost units in a burst, refilling at one unit every W / L seconds.
+    """
+
+    def __init__(self,
+                 rate_limit: int = 50,
+                 rate_window: float = 3600,
+                 role_limits: Optional[Dict[str, int]] = None,
+                 job_costs: Optional[Dict[str, float]] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate_limit: Default number of cost units per user in the rate window
+            rate_window: Time window for rate limiting in seconds
+            role_limits: Number of cost units per window for specific roles
+            job_costs: Cost of each job type in units (unknown types cost 1)
+        """
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.role_limits = dict(role_limits or {})
+        self.job_costs = dict(DEFAULT_JOB_COSTS)
+        self.job_costs.update(job_costs or {})
+
+        self._tats: Dict[str, float] = {}
+        self._user_roles: Dict[str, str] = {}
+
+    def hydrate(self, tats: Dict[str, float]):
+        """
+        Load persisted state.
+
+        Args:
+            tats: Mapping of user ID to theoretical arrival time
+        """
+        now = time.time()
+        # Users whose TAT has passed have a full allowance and need no state
+        self._tats = {user_id: tat for user_id, tat in tats.items() if tat and tat > now}
+        logger.info(f"Hydrated rate limiter state for {len(self._tats)} users")
+
+    def set_user_roles(self, user_id: str, roles: Iterable[str]):
+        """
+        Record which roles a user has. The role with the highest limit is used.
+
+        Args:
+            user_id: User ID
+            roles: Role names or IDs the user has
+        """
+        best_role = DEFAULT_ROLE
+        best_limit = self.rate_limit
+        for role in roles:
+            limit = self.role_limits.get(role)
+            if limit is not None and limit > best_limit:
+                best_role, best_limit = role, limit
+
+        if best_role == DEFAULT_ROLE:
+            self._user_roles.pop(user_id, None)
+        else:
+            self._user_roles[user_id] = best_role
+
+    def get_limit(self, user_id: str, role: Optional[str] = None) -> int:
+        """
+        Get the number of cost units a user may spend per window.
+
+        Args:
+            user_id: User ID
+            role: Role to use instead of the user's recorded role
+
+        Returns:
+            Limit for the user
+        """
+        role = role or self._user_roles.get(user_id, DEFAULT_ROLE)
+        return self.role_limits.get(role, self.rate_limit)
+
+    def get_cost(self, job_type: str) -> float:
+        """
+        Get the cost of a job type.
+
+        Args:
+            job_type: Type of job (standard, pulid, redux, reduxprompt, video)
+
+        Returns:
+            Cost in units
+        """
+        return self.job_costs.get(job_type, 1.0)
+
+    def try_acquire(self, user_id: str, job_type: str = "standard",
+                    role: Optional[str] = None) -> Tuple[bool, float, Optional[float]]:
+        """
+        Check the rate limit for a job and consume its cost if allowed.
+
+        Args:
+            user_id: User ID
+            job_type: Type of job being submitted
+            role: Role to use instead of the user's recorded role
+
+        Returns:
+            Tuple of (allowed, retry_after, tat); retry_after is the number of
+            seconds until the job would be allowed, and tat is the new state to
+            persist, or None if the job was rejected
+        """
+        limit = self.get_limit(user_id, role)
+        if limit <= 0:
+            return False, self.rate_window, None
+
+        now = time.time()
+        emission_interval = self.rate_window / limit
+        tat = max(self._tats.get(user_id, now), now)
+        new_tat = tat + self.get_cost(job_type) * emission_interval
+
+        # A job costing more than the whole allowance is allowed only with a full allowance
+        if new_tat - now > self.rate_window and tat > now:
+            return False, new_tat - self.rate_window - now, None
+
+        self._tats[user_id] = new_tat
+        return True, 0.0, new_tat
+
+    def get_tat(self, user_id: str) -> Optional[float]:
+        """
+        Get a user's current state.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            The user's theoretical arrival time, or None if the user has no state
+        """
+        return self._tats.get(user_id)
+
+    def release(self, user_id: str, job_type: str = "standard", role: Optional[str] = None) -> Optional[float]:
+        """
+        Give back the cost of a job that was acquired but never submitted.
+
+        Args:
+            user_id: User ID
+            job_type: Type of job that was acquired
+            role: Role used when it was acquired
+
+        Returns:
+            The new state to persist, or None if the user has no state
+        """
+        tat = self._tats.get(user_id)
+        if tat is None:
+            return None
+
+        limit = self.get_limit(user_id, role)
+        if limit > 0:
+            tat = max(tat - self.get_cost(job_type) * self.rate_window / limit, time.time())
+            self._tats[user_id] = tat
+        return tat
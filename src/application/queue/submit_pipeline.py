@@ -0,0 +1,172 @@
+"""
+Pipeline taking a submitted prompt through moderation and enhancement into the queue.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Tuple, Union
+
+from src.application.content_filter.content_filter_service import ContentFilterService
+from src.application.queue.queue_service import QueueService
+from src.domain.models.job_trace import JobTrace, PHASE_MODERATION_START, PHASE_MODERATION_END
+from src.domain.models.queue_item import QueuePriority, RequestItem, ReduxRequestItem, ReduxPromptRequestItem
+
+logger = logging.getLogger(__name__)
+
+class Submission:
+    """
+    A request on its way into the queue. Its place in the queue is reserved when
+    the submission starts and its prompt is moderated in the background, so the
+    user can be asked for options meanwhile, and the prompt enhanced by a
+    provider trusted with unmoderated prompts.
+    If the request doesn't make it into the queue its reservation is released.
+    """
+
+    def __init__(self,
+                 pipeline: 'SubmitPipeline',
+                 request_item: Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem],
+                 request_id: str,
+                 moderation: asyncio.Task):
+        """
+        Initialize the submission.
+
+        Args:
+            pipeline: Pipeline the submission belongs to
+            request_item: The request item; its prompt is the prompt being moderated
+            request_id: ID of the reserved place in the queue
+            moderation: Task moderating the prompt
+        """
+        self.pipeline = pipeline
+        self.request_item = request_item
+        self.request_id = request_id
+        self.moderation = moderation
+        self.committed = False
+
+    async def moderate(self, enhance: Optional[Callable[[], Awaitable[str]]] = None,
+                       before_moderation: bool = False) -> Tuple[bool, Optional[str]]:
+        """
+        Wait for the prompt's moderation, then enhance the prompt. The enhanced prompt
+        is moderated again, and the request's prompt is replaced by it once it passes.
+        A rejected request's reservation is released.
+
+        Args:
+            enhance: Function starting the enhancement and returning the enhanced prompt,
+                     None to keep the prompt
+            before_moderation: Start the enhancement while the prompt is still being
+                               moderated; only for providers trusted with unmoderated
+                               prompts, and the enhancement must not be shown to the
+                               user before the moderation passes
+
+        Returns:
+            Tuple of (is_allowed, violation_details)
+        """
+        original_prompt = self.request_item.prompt
+        enhancement_task = asyncio.ensure_future(enhance()) if enhance is not None and before_moderation else None
+        try:
+            is_allowed, _, violation_details = await self.moderation
+            if not is_allowed:
+                self.release()
+                return False, violation_details
+            if enhance is None:
+                return True, None
+
+            enhanced_prompt = await (enhancement_task or enhance())
+            if enhanced_prompt and enhanced_prompt != original_prompt:
+                is_allowed, _, violation_details = await self.pipeline.content_filter_service.check_enhanced_prompt(
+                    self.request_item.user_id, original_prompt, enhanced_prompt
+                )
+                if not is_allowed:
+                    self.release()
+                    return False, violation_details
+                self.request_item.prompt = enhanced_prompt
+            return True, None
+        finally:
+            if enhancement_task is not None and not enhancement_task.done():
+                enhancement_task.cancel()
+
+    async def commit(self) -> Tuple[bool, str, str]:
+        """
+        Add the request to the queue in its reserved place.
+
+        Returns:
+            Tuple of (success, request_id, message)
+        """
+        success, request_id, message = await self.pipeline.queue_service.commit_reservation(
+            self.request_id, self.request_item
+        )
+        self.committed = success
+        return success, request_id, message
+
+    def release(self):
+        """Give up the reserved place unless the request was queued; safe to call more than once"""
+        if not self.committed:
+            self.pipeline.queue_service.release_reservation(self.request_id)
+
+class SubmitPipeline:
+    """
+    Runs the stages of a submission concurrently where it is safe: the queue
+    place is reserved first and moderation runs in the background while the
+    user picks options. The prompt is enhanced during moderation only by
+    providers trusted with unmoderated prompts, and the enhanced prompt is
+    moderated again afterwards.
+    """
+
+    def __init__(self, queue_service: QueueService, content_filter_service: ContentFilterService):
+        """
+        Initialize the pipeline.
+
+        Args:
+            queue_service: Queue to submit to
+            content_filter_service: Content filter to moderate with
+        """
+        self.queue_service = queue_service
+        self.content_filter_service = content_filter_service
+
+    def start_moderation(self, user_id: str, prompt: str, trace: Optional[JobTrace] = None) -> asyncio.Task:
+        """
+        Start moderating a prompt in the background.
+
+        Args:
+            user_id: ID of the user who submitted the prompt
+            prompt: Prompt to moderate
+            trace: Trace to mark the moderation phases on
+
+        Returns:
+            Task resolving to (is_allowed, violation_type, violation_details)
+        """
+        async def moderate():
+            if trace:
+                trace.mark(PHASE_MODERATION_START)
+            try:
+                return await self.content_filter_service.check_prompt_async(user_id, prompt)
+            finally:
+                if trace:
+                    trace.mark(PHASE_MODERATION_END)
+
+        return asyncio.create_task(moderate())
+
+    def begin(self,
+              request_item: Union[RequestItem, ReduxRequestItem, ReduxPromptRequestItem],
+              priority: int = QueuePriority.NORMAL,
+              role: Optional[str] = None,
+              moderation: Optional[asyncio.Task] = None) -> Tuple[Optional[Submission], str]:
+        """
+        Reserve a place in the queue for a request and moderate its prompt.
+
+        Args:
+            request_item: The request item; its prompt is moderated
+            priority: Priority level for the request
+            role: Rate limit role to use instead of the user's recorded role
+            moderation: Moderation already started with start_moderation, e.g. before
+                        asking the user for the enhancement level
+
+        Returns:
+            Tuple of (submission, message); the submission is None if no place could be reserved
+        """
+        success, request_id, message = self.queue_service.reserve(request_item, priority, role)
+        if not success:
+            return None, message
+
+        if moderation is None:
+            moderation = self.start_moderation(request_item.user_id, request_item.prompt, request_item.trace)
+        return Submission(self, request_item, request_id, moderation), message
@@ -125,7 +125,7 @@ def send_progress_update(bot_server, request_id, progress_data):
                     timeout=120
                 )
                 if response.status_code == 200:
-                    logger.debug(f"Progress update sent: {progress_data}")
+                    logger.debug("Progress update sent for %s: %s", request_id, progress_data.get('status'))
                     return
                 else:
                     logger.warning(f"Progress update failed with status {response.status_code}: {response.text}")
@@ -193,7 +193,7 @@ def get_images(server_address, bot_server, request_id, ws, workflow):
 
                     # Log important messages
                     if message.get('type') not in ['status']:
-                        logger.info(f"Received important websocket message: {message}")
+                        logger.debug("Received websocket message of type %s for %s", message.get('type'), request_id)
 
                     if message['type'] == 'execution_start':
                         send_progress_update(bot_server, request_id, {
@@ -6,21 +6,129 @@ Provides a simple way to publish and subscribe to events.
 import logging
 import asyncio
 import inspect
-from typing import Dict, List, Type, Callable, Any, TypeVar, Union, Awaitable
+import time
+from collections import deque
+from typing import Dict, List, Type, Callable, Any, TypeVar, Optional, Hashable, Set
 
 logger = logging.getLogger(__name__)
 
 # Type variable for event types
 T = TypeVar('T')
 
+# Overflow policies for a full dispatch queue
+OVERFLOW_BLOCK = "block"        # Publishers wait for room; sync publishes beyond a second queue's worth are dropped
+OVERFLOW_DROP = "drop"          # Drop the new event
+OVERFLOW_COALESCE = "coalesce"  # Replace a queued event with the same coalesce key, otherwise drop
+
 class Event:
     """Base class for all domain events"""
     pass
 
+class DispatchPolicy:
+    """How events of one type are queued and dispatched"""
+
+    def __init__(self,
+                 max_queue: int = 1000,
+                 concurrency: int = 1,
+                 overflow: str = OVERFLOW_BLOCK,
+                 coalesce_key: Optional[Callable[[Event], Hashable]] = None):
+        """
+        Initialize the dispatch policy.
+
+        Args:
+            max_queue: Maximum number of queued events
+            concurrency: Number of dispatcher tasks; 1 keeps events in publish order
+            overflow: What to do when the queue is full (block, drop or coalesce)
+            coalesce_key: Key identifying queued events that a newer event replaces (coalesce only)
+        """
+        self.max_queue = max_queue
+        self.concurrency = max(concurrency, 1)
+        self.overflow = overflow
+        self.coalesce_key = coalesce_key if overflow == OVERFLOW_COALESCE else None
+
+class HandlerStats:
+    """Timing metrics for an event handler"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed: float, failed: bool):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if failed:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_time': self.total_time,
+            'avg_time': self.total_time / self.calls if self.calls else 0.0,
+            'max_time': self.max_time
+        }
+
+class _Channel:
+    """Bounded queue and dispatcher tasks for one event type"""
+
+    def __init__(self, event_type: Type[Event], policy: DispatchPolicy):
+        self.event_type = event_type
+        self.policy = policy
+        self.queue: deque = deque()
+        self.pending: Dict[Hashable, Event] = {}  # coalesce key -> latest event
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+        # Events of a blocking channel waiting for room, in publish order, with the
+        # future of the publish_async call waiting on each (None for publish)
+        self.overflow: deque = deque()
+        self.mover: Optional[asyncio.Task] = None
+        self.workers: List[asyncio.Task] = []
+        self.active = 0
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+        # Time events spent queued before delivery
+        self.delivered = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    @property
+    def full(self) -> bool:
+        return len(self.queue) >= self.policy.max_queue
+
+    def put(self, event: Event):
+        """Queue an event; the caller has checked there is room"""
+        self.queue.append((event, time.monotonic()))
+        self.not_empty.set()
+        if self.full:
+            self.not_full.clear()
+
+    def get(self) -> Event:
+        """Take the next queued event"""
+        event, enqueued_at = self.queue.popleft()
+        lag = time.monotonic() - enqueued_at
+        self.delivered += 1
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+        if not self.queue:
+            self.not_empty.clear()
+        self.not_full.set()
+        if self.policy.coalesce_key is not None:
+            # Deliver the latest event published with this key
+            event = self.pending.pop(self.policy.coalesce_key(event), event)
+        return event
+
 class EventBus:
     """
-    Simple event bus for domain events.
-    Allows publishing events and subscribing to them.
+    Asynchronous event bus for domain events.
+    Publishing is an O(1) enqueue onto a bounded per-event-type queue that is
+    drained by dedicated dispatcher tasks, so handlers never run on the
+    publisher's stack. Before start() is called (or without a running event
+    loop) events are dispatched inline.
     """
 
     _instance = None
@@ -39,8 +147,25 @@ class EventBus:
             return
 
         self._handlers: Dict[Type[Event], List[Callable[[Event], None]]] = {}
+        self._policies: Dict[Type[Event], DispatchPolicy] = {}
+        self._default_policy = DispatchPolicy()
+        self._channels: Dict[Type[Event], _Channel] = {}
+        self._handler_stats: Dict[str, HandlerStats] = {}
+        # Strong references to tasks created outside the dispatchers
+        self._tasks: Set[asyncio.Task] = set()
+        self._running = False
         self._initialized = True
 
+    def configure(self, event_type: Type[Event], policy: DispatchPolicy):
+        """
+        Set the dispatch policy for an event type.
+
+        Args:
+            event_type: Type of event
+            policy: Dispatch policy; takes effect for channels created afterwards
+        """
+        self._policies[event_type] = policy
+
     def subscribe(self, event_type: Type[T], handler: Callable[[T], None]):
         """
         Subscribe to an event.
@@ -52,13 +177,7 @@ class EventBus:
         if event_type not in self._handlers:
             self._handlers[event_type] = []
         self._handlers[event_type].append(handler)
-        logger.info(f"ANALYTICS: Subscribed to event: {event_type.__name__} with handler {handler.__name__} from {handler.__module__}")
-
-        # Log all current subscriptions
-        for event, handlers in self._handlers.items():
-            logger.info(f"ANALYTICS: Current subscriptions for {event.__name__}: {len(handlers)} handlers")
-            for h in handlers:
-                logger.info(f"ANALYTICS: - Handler: {h.__name__} from {h.__module__}")
+        logger.debug(f"Subscribed {handler.__module__}.{handler.__name__} to {event_type.__name__}")
 
     def publish(self, event: Event):
         """
@@ -68,31 +187,230 @@ class EventBus:
             event: Event to publish
         """
         event_type = type(event)
-        logger.info(f"ANALYTICS: Publishing event: {event_type.__name__}")
+        if not self._handlers.get(event_type):
+            return
 
-        if event_type in self._handlers:
-            logger.info(f"ANALYTICS: Found {len(self._handlers[event_type])} handlers for event {event_type.__name__}")
-            for handler in self._handlers[event_type]:
+        if not self._running:
+            self._dispatch_inline(event)
+            return
+
+        channel = self._get_channel(event_type)
+        channel.published += 1
+        policy = channel.policy
+
+        if policy.coalesce_key is not None:
+            key = policy.coalesce_key(event)
+            if key in channel.pending:
+                # An event with this key is still queued; deliver this one in its place
+                channel.pending[key] = event
+                channel.coalesced += 1
+                return
+
+        # Events already waiting for room go first, to keep publish order
+        if channel.full or channel.overflow:
+            if policy.overflow == OVERFLOW_BLOCK:
+                # publish() can't wait, so hand the event to the channel's mover
+                self._put_later(channel, event)
+                return
+            channel.dropped += 1
+            logger.debug(f"Dropped {event_type.__name__}, dispatch queue is full")
+            return
+
+        self._enqueue(channel, event)
+
+    async def publish_async(self, event: Event):
+        """
+        Publish an event, waiting for room in the queue when its policy is to block.
+
+        Args:
+            event: Event to publish
+        """
+        event_type = type(event)
+        if self._running and self._handlers.get(event_type):
+            channel = self._get_channel(event_type)
+            if channel.policy.overflow == OVERFLOW_BLOCK and (channel.full or channel.overflow):
+                channel.published += 1
+                queued = asyncio.get_running_loop().create_future()
+                self._put_later(channel, event, queued)
+                await queued
+                return
+        self.publish(event)
+
+    async def start(self):
+        """Start dispatching events from per-event-type queues"""
+        self._running = True
+        logger.info("Event bus started")
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        Stop dispatching, after giving queued events a chance to be handled.
+
+        Args:
+            timeout: Maximum time in seconds to wait for the queues to drain
+        """
+        if not self._running:
+            return
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and (
+            self._tasks or any(channel.queue or channel.active for channel in self._channels.values())
+        ):
+            await asyncio.sleep(0.05)
+
+        self._running = False
+        for channel in self._channels.values():
+            for worker in channel.workers:
+                worker.cancel()
+            if channel.mover is not None:
+                channel.mover.cancel()
+            undelivered = len(channel.queue) + len(channel.overflow)
+            if undelivered:
+                logger.warning(f"Discarding {undelivered} undelivered {channel.event_type.__name__} events")
+            for _, queued in channel.overflow:
+                if queued is not None and not queued.done():
+                    queued.set_result(None)
+        await asyncio.gather(*(worker for channel in self._channels.values() for worker in channel.workers),
+                             return_exceptions=True)
+        self._channels = {}
+        logger.info("Event bus stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get dispatch and handler timing metrics.
+
+        Returns:
+            Dictionary with per-event-type queue counters and lag (time from publish
+            to delivery, in seconds) and per-handler timings
+        """
+        return {
+            'events': {
+                event_type.__name__: {
+                    'published': channel.published,
+                    'dropped': channel.dropped,
+                    'coalesced': channel.coalesced,
+                    'queued': len(channel.queue),
+                    'waiting': len(channel.overflow),
+                    'active': channel.active,
+                    'delivered': channel.delivered,
+                    'lag_total': channel.lag_total,
+                    'lag_max': channel.lag_max
+                }
+                for event_type, channel in self._channels.items()
+            },
+            'handlers': {name: stats.to_dict() for name, stats in self._handler_stats.items()}
+        }
+
+    def _get_channel(self, event_type: Type[Event]) -> _Channel:
+        """Get the channel for an event type, starting its dispatchers on first use"""
+        channel = self._channels.get(event_type)
+        if channel is None:
+            channel = _Channel(event_type, self._policies.get(event_type, self._default_policy))
+            for i in range(channel.policy.concurrency):
+                channel.workers.append(asyncio.create_task(
+                    self._dispatcher(channel), name=f"event-dispatcher-{event_type.__name__}-{i}"
+                ))
+            self._channels[event_type] = channel
+        return channel
+
+    def _enqueue(self, channel: _Channel, event: Event):
+        """Queue an event, registering its coalesce key"""
+        if channel.policy.coalesce_key is not None:
+            channel.pending[channel.policy.coalesce_key(event)] = event
+        channel.put(event)
+
+    def _put_later(self, channel: _Channel, event: Event, queued: Optional[asyncio.Future] = None):
+        """
+        Queue an event once its channel has room, behind the events already waiting.
+        The waiting events of publish() are capped at the queue size, beyond which
+        they are dropped; publish_async() callers wait instead.
+
+        Args:
+            channel: Channel of the event
+            event: Event to queue
+            queued: Future to resolve once the event is queued, for publish_async()
+        """
+        if queued is None and len(channel.overflow) >= channel.policy.max_queue:
+            channel.dropped += 1
+            logger.debug(f"Dropped {channel.event_type.__name__}, dispatch queue and overflow are full")
+            return
+        channel.overflow.append((event, queued))
+        if channel.mover is None or channel.mover.done():
+            channel.mover = self._track(self._move_overflow(channel))
+
+    async def _move_overflow(self, channel: _Channel):
+        """Move the events waiting for room into a channel's queue, in publish order"""
+        while channel.overflow:
+            while channel.full:
+                await channel.not_full.wait()
+            event, queued = channel.overflow.popleft()
+            if queued is not None and queued.cancelled():
+                # The publisher gave up waiting
+                continue
+            self._enqueue(channel, event)
+            if queued is not None:
+                queued.set_result(None)
+
+    def _track(self, coro) -> asyncio.Task:
+        """Create a task and keep a reference to it until it finishes"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _dispatcher(self, channel: _Channel):
+        """Deliver events from a channel to their handlers"""
+        while True:
+            await channel.not_empty.wait()
+            if not channel.queue:
+                continue
+            event = channel.get()
+            channel.active += 1
+            try:
+                for handler in list(self._handlers.get(channel.event_type, [])):
+                    await self._call_handler(handler, event)
+            finally:
+                channel.active -= 1
+
+    async def _call_handler(self, handler: Callable[[Event], Any], event: Event):
+        """Call a handler, recording its timing"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            result = handler(event)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            failed = True
+            logger.error(f"Error in event handler {handler.__name__} for {type(event).__name__}: {e}", exc_info=True)
+        finally:
+            self._record(handler, time.perf_counter() - start, failed)
+
+    def _dispatch_inline(self, event: Event):
+        """Dispatch an event on the caller's stack, used before the bus is started"""
+        for handler in list(self._handlers.get(type(event), [])):
+            if inspect.iscoroutinefunction(handler):
                 try:
-                    logger.info(f"ANALYTICS: Calling handler {handler.__name__} from {handler.__module__} for event {event_type.__name__}")
-
-                    # Check if the handler is a coroutine function
-                    if inspect.iscoroutinefunction(handler):
-                        # Create a task to run the coroutine
-                        # This prevents the "coroutine was never awaited" warning
-                        # but doesn't block the current thread
-                        task = asyncio.create_task(handler(event))
-                        logger.info(f"ANALYTICS: Created task {task.get_name()} for async handler {handler.__name__}")
-                    else:
-                        # Regular function, just call it
-                        handler(event)
-                        logger.info(f"ANALYTICS: Called sync handler {handler.__name__} successfully")
-                except Exception as e:
-                    logger.error(f"ANALYTICS: Error in event handler {handler.__name__} for {event_type.__name__}: {e}", exc_info=True)
-        else:
-            logger.warning(f"ANALYTICS: No handlers found for event {event_type.__name__}")
+                    self._track(self._call_handler(handler, event))
+                except RuntimeError:
+                    logger.error(f"Cannot run async handler {handler.__name__} without an event loop")
+                continue
+
+            start = time.perf_counter()
+            failed = False
+            try:
+                handler(event)
+            except Exception as e:
+                failed = True
+                logger.error(f"Error in event handler {handler.__name__} for {type(event).__name__}: {e}", exc_info=True)
+            self._record(handler, time.perf_counter() - start, failed)
 
-        logger.info(f"ANALYTICS: Finished publishing event: {event_type.__name__}")
+    def _record(self, handler: Callable, elapsed: float, failed: bool):
+        """Record a handler call"""
+        name = f"{getattr(handler, '__module__', '')}.{getattr(handler, '__qualname__', repr(handler))}"
+        stats = self._handler_stats.get(name)
+        if stats is None:
+            stats = self._handler_stats[name] = HandlerStats()
+        stats.record(elapsed, failed)
 
     def unsubscribe(self, event_type: Type[Event], handler: Callable[[Event], None]):
         """
@@ -3,7 +3,7 @@ Interface for AI providers.
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 class AIProvider(ABC):
     """Interface for AI providers"""
@@ -32,6 +32,20 @@ class AIProvider(ABC):
         """
         pass
 
+    async def stream_response(self, prompt: str, temperature: float = 0.7) -> AsyncIterator[str]:
+        """
+        Generate an enhanced prompt, yielding its text as it is generated.
+        Providers without a streaming API yield the whole response at once.
+        
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+            
+        Yields:
+            Pieces of the enhanced prompt
+        """
+        yield await self.generate_response(prompt, temperature)
+
     @property
     @abstractmethod
     def base_url(self) -> str:
@@ -67,18 +67,29 @@ class QueueRepository(ABC):
         pass
         
     @abstractmethod
-    async def update_user_rate_limit(self, user_id: str) -> bool:
+    async def update_user_rate_limit(self, user_id: str, tat: Optional[float] = None) -> bool:
         """
         Update a user's rate limit.
         
         Args:
             user_id: User ID
+            tat: Theoretical arrival time of the user's rate limiter state
             
         Returns:
             True if successful, False otherwise
         """
         pass
         
+    @abstractmethod
+    async def get_user_rate_limit_states(self) -> Dict[str, float]:
+        """
+        Get the persisted rate limiter state of all users with an active limit.
+        
+        Returns:
+            Mapping of user ID to theoretical arrival time
+        """
+        pass
+        
     @abstractmethod
     async def get_queue_stats(self, days: int = 7) -> List[Dict[str, Any]]:
         """
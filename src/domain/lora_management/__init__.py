@@ -1,3 +1,4 @@
-from .lora_manager import LoraManager
+from .lora_manager import LoraCatalog, LoraManager
+from .lora_search import LoraSearchIndex
 
-__all__ = ['LoraManager']
+__all__ = ['LoraCatalog', 'LoraManager', 'LoraSearchIndex']
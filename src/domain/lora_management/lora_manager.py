@@ -1,16 +1,85 @@
 import os
 import json
+import hashlib
 import logging
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 
+from .lora_search import LoraSearchIndex
+
 logger = logging.getLogger(__name__)
 
+# Strength each LoRA is capped at when several are applied together
+MULTI_LORA_MAX_STRENGTH = 0.5
+
+class LoraCatalog:
+    """
+    Immutable snapshot of the LoRA configuration, with the lookups that every
+    request needs computed once when the configuration is loaded.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, path: Optional[str] = None,
+                 mtime: float = 0.0, digest: str = ''):
+        """
+        Initialize the snapshot.
+
+        Args:
+            config: Parsed lora.json, None if no configuration was found
+            path: File the configuration was loaded from
+            mtime: Modification time of the file when it was loaded
+            digest: SHA-256 of the file contents
+        """
+        self.config = config or {}
+        self.path = path
+        self.mtime = mtime
+        self.digest = digest
+        self.loras: Tuple[Dict[str, Any], ...] = tuple(self.config.get('available_loras', []))
+        self.lora_info = {lora['file']: lora for lora in self.loras if 'file' in lora}
+        self.trigger_words = {file: lora.get('add_prompt') or '' for file, lora in self.lora_info.items()}
+        self.weights = {}
+        for file, lora in self.lora_info.items():
+            try:
+                self.weights[file] = float(lora.get('weight', 1.0))
+            except (TypeError, ValueError):
+                logger.warning(f"Invalid weight for LoRA {file}, using 1.0")
+                self.weights[file] = 1.0
+        self.multi_weights = {file: min(weight, MULTI_LORA_MAX_STRENGTH) for file, weight in self.weights.items()}
+
+    def __len__(self) -> int:
+        return len(self.loras)
+
+    def strength(self, lora_file: str, lora_count: int = 1) -> float:
+        """
+        Get the strength a LoRA is applied with.
+
+        Args:
+            lora_file: The filename of the LoRA
+            lora_count: Number of LoRAs applied together
+
+        Returns:
+            float: The configured weight, capped when several LoRAs are applied
+        """
+        weights = self.multi_weights if lora_count > 1 else self.weights
+        return weights.get(lora_file, 1.0)
+
 class LoraManager:
     """
     Manages LoRA operations including loading configurations, applying LoRAs to workflows,
     and handling trigger words.
+
+    A single manager is shared by the whole process. It holds the current catalog
+    snapshot and replaces it only when lora.json changes on disk or reload() is called.
     """
 
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern so every consumer reads the same catalog"""
+        if cls._instance is None:
+            cls._instance = super(LoraManager, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
     def __init__(self, config_paths=None):
         """
         Initialize the LoRA manager.
@@ -18,35 +87,125 @@ class LoraManager:
         Args:
             config_paths: List of possible paths to look for lora.json
         """
+        # Only initialize once (singleton pattern)
+        if self._initialized:
+            return
+
         self.config_paths = config_paths or [
             os.path.join('config', 'lora.json')
         ]
-        self.lora_config = None
-        self.lora_info = {}
+        self._catalog = LoraCatalog()
+        # File and modification time last looked at, good or not
+        self._seen: Tuple[Optional[str], float] = (None, 0.0)
+        self._lock = threading.Lock()
+        self._search_index: Optional[LoraSearchIndex] = None
         self.load_config()
 
-    def load_config(self) -> bool:
+        self._initialized = True
+
+    @property
+    def catalog(self) -> LoraCatalog:
+        """The current catalog snapshot, reloaded first if lora.json changed on disk"""
+        path = self._find_config()
+        if (path, self._mtime(path) if path else 0.0) != self._seen:
+            self.load_config()
+        return self._catalog
+
+    @property
+    def search_index(self) -> LoraSearchIndex:
+        """Search index over the current snapshot, rebuilt when the snapshot changes"""
+        catalog = self.catalog
+        index = self._search_index
+        if index is None or index.loras is not catalog.loras:
+            index = LoraSearchIndex(catalog.loras)
+            self._search_index = index
+        return index
+
+    def search(self, query: str, limit: Optional[int] = 25) -> List[Dict[str, Any]]:
         """
-        Load the LoRA configuration from one of the possible paths.
+        Find LoRAs by file, name or trigger words, tolerating typos.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of results, None for all
 
         Returns:
-            bool: True if configuration was loaded successfully, False otherwise.
+            List: Matching LoRA configurations, best matches first
         """
+        return self.search_index.search(query, limit)
+
+    @property
+    def lora_config(self) -> Optional[Dict[str, Any]]:
+        """The parsed lora.json of the current snapshot"""
+        return self.catalog.config or None
+
+    @property
+    def lora_info(self) -> Dict[str, Dict[str, Any]]:
+        """LoRA configurations of the current snapshot by filename"""
+        return self.catalog.lora_info
+
+    def _find_config(self) -> Optional[str]:
+        """Get the first of the configured paths that exists"""
         for path in self.config_paths:
             if os.path.exists(path):
-                try:
-                    with open(path, 'r') as f:
-                        self.lora_config = json.load(f)
+                return path
+        return None
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        """Get a file's modification time, 0 if it can't be read"""
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0.0
+
+    def reload(self) -> LoraCatalog:
+        """
+        Reload the LoRA configuration even if the file looks unchanged.
 
-                    # Create a lookup dictionary for quick access
-                    self.lora_info = {lora['file']: lora for lora in self.lora_config.get('available_loras', [])}
-                    logger.info(f"Loaded LoRA configuration from {path} with {len(self.lora_info)} LoRAs")
-                    return True
-                except Exception as e:
-                    logger.error(f"Error loading LoRA configuration from {path}: {str(e)}")
+        Returns:
+            LoraCatalog: The new snapshot
+        """
+        self.load_config(force=True)
+        return self._catalog
+
+    def load_config(self, force: bool = False) -> bool:
+        """
+        Load the LoRA configuration from one of the possible paths. The snapshot
+        is only replaced when the file's contents changed, unless forced.
+
+        Args:
+            force: Rebuild the snapshot even if the contents are unchanged
 
-        logger.warning("No valid LoRA configuration found")
-        return False
+        Returns:
+            bool: True if configuration was loaded successfully, False otherwise.
+        """
+        with self._lock:
+            for path in self.config_paths:
+                if os.path.exists(path):
+                    # Don't retry a broken file until it changes again
+                    mtime = self._mtime(path)
+                    self._seen = (path, mtime)
+                    try:
+                        with open(path, 'rb') as f:
+                            data = f.read()
+                        digest = hashlib.sha256(data).hexdigest()
+
+                        if not force and path == self._catalog.path and digest == self._catalog.digest:
+                            # Touched but not changed; keep the snapshot
+                            return True
+
+                        self._catalog = LoraCatalog(json.loads(data.decode('utf-8')), path, mtime, digest)
+                        logger.info(f"Loaded LoRA configuration from {path} with {len(self._catalog)} LoRAs")
+                        return True
+                    except Exception as e:
+                        # Keep serving the last good snapshot
+                        logger.error(f"Error loading LoRA configuration from {path}: {str(e)}")
+                        return False
+
+            self._seen = (None, 0.0)
+            logger.warning("No valid LoRA configuration found")
+            return False
 
     def get_lora_info(self, lora_file: str) -> Optional[Dict[str, Any]]:
         """
@@ -58,7 +217,7 @@ class LoraManager:
         Returns:
             Dict or None: LoRA information if found, None otherwise
         """
-        return self.lora_info.get(lora_file)
+        return self.catalog.lora_info.get(lora_file)
 
     def get_all_loras(self) -> List[Dict[str, Any]]:
         """
@@ -67,7 +226,7 @@ class LoraManager:
         Returns:
             List: List of all LoRA configurations
         """
-        return self.lora_config.get('available_loras', []) if self.lora_config else []
+        return list(self.catalog.loras)
 
     def apply_loras_to_workflow(self, workflow: Dict[str, Any], loras: List[str],
                                lora_node_id: str = '271', prompt_node_id: str = '69') -> Dict[str, Any]:
@@ -86,6 +245,7 @@ class LoraManager:
         if not loras or lora_node_id not in workflow:
             return workflow
 
+        catalog = self.catalog
         try:
             # Clear existing LoRAs
             lora_loader = workflow[lora_node_id]['inputs']
@@ -95,16 +255,10 @@ class LoraManager:
 
             # Add new LoRA entries to the workflow
             for i, lora_file in enumerate(loras, start=1):
-                if lora_file in self.lora_info:
+                if lora_file in catalog.lora_info:
                     lora_key = f'lora_{i}'
-                    # Get base strength from config
-                    base_strength = float(self.lora_info[lora_file].get('weight', 1.0))
-
                     # If multiple LoRAs are selected, scale down to 0.5 unless already lower
-                    if len(loras) > 1:
-                        lora_strength = min(base_strength, 0.5)
-                    else:
-                        lora_strength = base_strength
+                    lora_strength = catalog.strength(lora_file, len(loras))
 
                     lora_loader[lora_key] = {
                         'on': True,
@@ -114,8 +268,8 @@ class LoraManager:
                     logger.info(f"Added LoRA {lora_file} with strength {lora_strength}")
 
                     # Add trigger words to prompt if available
-                    if prompt_node_id in workflow and self.lora_info[lora_file].get('add_prompt'):
-                        trigger_words = self.lora_info[lora_file]['add_prompt']
+                    if prompt_node_id in workflow and catalog.trigger_words[lora_file]:
+                        trigger_words = catalog.trigger_words[lora_file]
 
                         # Check if this is a PuLID workflow (node 6 uses 'text' instead of 'prompt')
                         if prompt_node_id == '6' and 'text' in workflow[prompt_node_id]['inputs']:
@@ -150,8 +304,7 @@ class LoraManager:
         Returns:
             str: The trigger words for the LoRA, or empty string if not found
         """
-        lora_info = self.get_lora_info(lora_file)
-        return lora_info.get('add_prompt', '') if lora_info else ''
+        return self.catalog.trigger_words.get(lora_file, '')
 
     def add_trigger_words_to_prompt(self, prompt: str, loras: List[str]) -> str:
         """
@@ -165,9 +318,10 @@ class LoraManager:
             str: The prompt with trigger words added
         """
         modified_prompt = prompt
+        trigger_words_by_file = self.catalog.trigger_words
 
         for lora_file in loras:
-            trigger_words = self.get_lora_trigger_words(lora_file)
+            trigger_words = trigger_words_by_file.get(lora_file, '')
             if trigger_words and trigger_words not in modified_prompt:
                 modified_prompt = f"{modified_prompt}, {trigger_words}"
                 logger.debug(f"Added trigger words '{trigger_words}' for LoRA {lora_file}")
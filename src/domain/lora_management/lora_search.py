@@ -0,0 +1,151 @@
+"""
+Search index over the LoRA catalog for autocomplete and filtering.
+"""
+
+import re
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'[a-z0-9]+')
+_RUN = re.compile(r'[A-Za-z0-9]+')
+# Parts of camelCase and letter/digit runs, e.g. "aidmaNijiAnimeStyle2" -> aidma, Niji, Anime, Style, 2
+_PART = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+_MODEL_EXTENSION = re.compile(r'\.(safetensors|ckpt|pt|bin)$', re.IGNORECASE)
+
+# Share of the query's trigrams a LoRA must contain for a typo-tolerant match
+MIN_TRIGRAM_COVERAGE = 0.6
+
+def normalize(text: str) -> str:
+    """Lower-case text and reduce it to its words separated by single spaces"""
+    return ' '.join(_WORD.findall(text.lower()))
+
+def words(text: str) -> Set[str]:
+    """Get the lower-cased words of text, including the parts of camelCase words"""
+    found = set()
+    for run in _RUN.findall(text):
+        found.add(run.lower())
+        found.update(part.lower() for part in _PART.findall(run))
+    return found
+
+def trigrams(text: str) -> Set[str]:
+    """Get the trigrams of normalized text, padded so word starts and ends count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _TrieNode:
+    """Node of the prefix trie; holds the LoRAs having a word that starts with its prefix"""
+
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.ids: Set[int] = set()
+
+class LoraSearchIndex:
+    """
+    Index over the file, name and trigger words of every LoRA in a catalog
+    snapshot. Prefix lookups go through a trie of the words, and misspelled
+    queries fall back to trigram similarity. The index is built once per
+    snapshot, so lookups don't scan the catalog.
+    """
+
+    def __init__(self, loras: Tuple[Dict[str, Any], ...]):
+        """
+        Build the index.
+
+        Args:
+            loras: LoRA configurations of a catalog snapshot
+        """
+        self.loras = loras
+        self._root = _TrieNode()
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._terms: List[List[str]] = []
+
+        for i, lora in enumerate(loras):
+            fields = (lora.get('name', ''), _MODEL_EXTENSION.sub('', lora.get('file', '')), lora.get('add_prompt') or '')
+            self._terms.append([term for term in map(normalize, fields) if term])
+
+            lora_words = set()
+            for field in fields:
+                lora_words |= words(field)
+            grams = set()
+            for word in lora_words:
+                self._insert(word, i)
+                grams |= trigrams(word)
+            for gram in grams:
+                self._trigrams.setdefault(gram, set()).add(i)
+
+    def _insert(self, word: str, lora_id: int):
+        """Add a word of a LoRA to the trie"""
+        node = self._root
+        for char in word:
+            node = node.children.setdefault(char, _TrieNode())
+            node.ids.add(lora_id)
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        """Get the LoRAs having a word that starts with the prefix"""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+    def search(self, query: str, limit: Optional[int] = 25) -> List[Dict[str, Any]]:
+        """
+        Find the LoRAs matching a query, best matches first.
+
+        Exact names come first, then LoRAs whose name or file starts with the
+        query, then LoRAs having a word starting with every word of the query,
+        and finally LoRAs whose text is similar enough to the query.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of results, None for all
+
+        Returns:
+            List of matching LoRA configurations
+        """
+        text = normalize(query)
+        if not text:
+            return list(self.loras[:limit])
+
+        scores: Dict[int, float] = {}
+
+        # Every word of the query must start a word of the LoRA
+        query_words = text.split()
+        matches = self._prefix_ids(query_words[0])
+        for word in query_words[1:]:
+            if not matches:
+                break
+            matches = matches & self._prefix_ids(word)
+        for i in matches:
+            terms = self._terms[i]
+            if text in terms:
+                scores[i] = 4.0
+            elif any(term.startswith(text) for term in terms):
+                scores[i] = 3.0
+            else:
+                scores[i] = 2.0
+
+        # Typo tolerance: LoRAs whose words contain most of the query's trigrams
+        query_grams = set()
+        for word in query_words:
+            query_grams |= trigrams(word)
+        hits = Counter()
+        for gram in query_grams:
+            for i in self._trigrams.get(gram, ()):
+                hits[i] += 1
+        for i, shared in hits.items():
+            coverage = shared / len(query_grams)
+            if i not in scores and coverage >= MIN_TRIGRAM_COVERAGE:
+                scores[i] = coverage
+
+        # Ties keep catalog order
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.loras[i] for i in ranked]
@@ -0,0 +1,132 @@
+"""
+Job trace model.
+"""
+
+import time
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+# Phase marks, in the order they normally occur
+PHASE_MODERATION_START = "moderation_start"
+PHASE_MODERATION_END = "moderation_end"
+PHASE_ENHANCEMENT_START = "enhancement_start"
+PHASE_ENHANCEMENT_END = "enhancement_end"
+PHASE_ENQUEUED = "enqueued"
+PHASE_DEQUEUED = "dequeued"
+PHASE_WORKFLOW_RENDERED = "workflow_rendered"
+PHASE_SUBMITTED = "submitted"
+PHASE_EXECUTION_START = "execution_start"
+PHASE_FIRST_PROGRESS = "first_progress"
+PHASE_NODE_EXECUTED = "node_executed"  # Recorded as node_executed:<node id>
+PHASE_EXECUTION_END = "execution_end"
+PHASE_OUTPUT_FETCHED = "output_fetched"
+PHASE_ENCODED = "encoded"
+PHASE_UPLOAD_START = "upload_start"
+PHASE_UPLOAD_END = "upload_end"
+PHASE_FAILED = "failed"
+
+class JobTrace:
+    """
+    Timeline of a job as a list of (phase, timestamp) marks.
+    Timestamps come from time.monotonic(), which is a system-wide clock, so
+    marks recorded by the generation subprocess can be merged into the trace.
+    """
+
+    def __init__(self, workflow_type: str = "standard"):
+        self.workflow_type = workflow_type
+        self.started_at = time.time()
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str, at: Optional[float] = None):
+        """
+        Record that a phase was reached.
+
+        Args:
+            phase: Name of the phase
+            at: Monotonic timestamp, defaults to now
+        """
+        self.marks.append((phase, time.monotonic() if at is None else at))
+        if len(self.marks) > 1 and self.marks[-1][1] < self.marks[-2][1]:
+            self.marks.sort(key=lambda mark: mark[1])
+
+    def extend(self, marks: List[Tuple[str, float]]):
+        """
+        Merge marks recorded elsewhere, keeping the timeline ordered.
+
+        Args:
+            marks: List of (phase, monotonic timestamp) pairs
+        """
+        self.marks.extend((str(phase), float(at)) for phase, at in marks)
+        self.marks.sort(key=lambda mark: mark[1])
+
+    def get(self, phase: str) -> Optional[float]:
+        """
+        Get the timestamp of the first mark of a phase.
+
+        Args:
+            phase: Name of the phase
+
+        Returns:
+            Monotonic timestamp or None if the phase wasn't reached
+        """
+        for name, at in self.marks:
+            if name == phase:
+                return at
+        return None
+
+    def elapsed(self, start_phase: str, end_phase: str) -> Optional[float]:
+        """
+        Get the time between two phases.
+
+        Args:
+            start_phase: Phase to measure from
+            end_phase: Phase to measure to
+
+        Returns:
+            Time in seconds or None if either phase wasn't reached
+        """
+        start, end = self.get(start_phase), self.get(end_phase)
+        if start is None or end is None:
+            return None
+        return end - start
+
+    def segments(self) -> List[Tuple[str, float]]:
+        """
+        Get the time spent reaching each mark since the previous one.
+
+        Returns:
+            List of (phase, seconds) pairs
+        """
+        return [(self.marks[i][0], self.marks[i][1] - self.marks[i - 1][1]) for i in range(1, len(self.marks))]
+
+    @property
+    def total_time(self) -> float:
+        """Time from the first to the last mark in seconds"""
+        if len(self.marks) < 2:
+            return 0.0
+        return self.marks[-1][1] - self.marks[0][1]
+
+    def to_compact(self) -> str:
+        """Serialize the marks as [[phase, milliseconds since the first mark], ...]"""
+        if not self.marks:
+            return "[]"
+        origin = self.marks[0][1]
+        return json.dumps([[phase, round((at - origin) * 1000)] for phase, at in self.marks], separators=(',', ':'))
+
+    @classmethod
+    def from_compact(cls, data: str, workflow_type: str = "standard", started_at: Optional[float] = None) -> 'JobTrace':
+        """Create from the compact serialization"""
+        trace = cls(workflow_type)
+        if started_at is not None:
+            trace.started_at = started_at
+        trace.marks = [(phase, offset / 1000) for phase, offset in json.loads(data or "[]")]
+        return trace
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            "workflow_type": self.workflow_type,
+            "started_at": self.started_at,
+            "total_time": self.total_time,
+            "marks": json.loads(self.to_compact())
+        }
@@ -7,6 +7,8 @@ import json
 from typing import Dict, Any, Optional, Union, List
 from enum import IntEnum, Enum
 
+from src.domain.models.job_trace import JobTrace
+
 class QueuePriority(IntEnum):
     """Priority levels for queue items"""
     HIGH = 1
@@ -51,6 +53,8 @@ class RequestItem:
         self.seed = seed
         self.is_pulid = is_pulid
         self.is_video = is_video
+        # Phases traced before the request was enqueued (not persisted)
+        self.trace: Optional[JobTrace] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
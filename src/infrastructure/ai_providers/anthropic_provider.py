@@ -4,11 +4,12 @@ Anthropic provider for AI services.
 
 import logging
 import json
-import aiohttp
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 
 from src.domain.interfaces.ai_provider import AIProvider
 from src.infrastructure.config.config_manager import ConfigManager
+from src.infrastructure.ai_providers.http_client import HttpClientPool
+from src.infrastructure.ai_providers.sse import iter_sse_events
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,7 @@ class AnthropicProvider(AIProvider):
         self.api_key = self.config.anthropic_api_key
         self.model = self.config.anthropic_model
         self._base_url = "https://api.anthropic.com/v1"
+        self.http = HttpClientPool()
         
     @property
     def base_url(self) -> str:
@@ -57,21 +59,21 @@ class AnthropicProvider(AIProvider):
                 ]
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers={
-                        "x-api-key": self.api_key,
-                        "anthropic-version": "2023-06-01",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        logger.error(f"Anthropic connection test failed: {response.status}")
-                        return False
+            session = self.http.get_session(url)
+            async with session.post(
+                url,
+                headers={
+                    "x-api-key": self.api_key,
+                    "anthropic-version": "2023-06-01",
+                    "Content-Type": "application/json"
+                },
+                json=payload
+            ) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    logger.error(f"Anthropic connection test failed: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"Error testing Anthropic connection: {e}")
             return False
@@ -89,41 +91,92 @@ class AnthropicProvider(AIProvider):
         """
         try:
             url = f"{self.base_url}/messages"
+            payload = self._build_payload(prompt, temperature)
             
-            # Create the request payload
-            payload = {
-                "model": self.model,
-                "max_tokens": 1000,
-                "temperature": temperature,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": f"{self.get_system_prompt(temperature)}\n\nUser prompt: {prompt}"
-                    }
-                ]
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers={
-                        "x-api-key": self.api_key,
-                        "anthropic-version": "2023-06-01",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data["content"][0]["text"].strip()
-                    else:
-                        error_data = await response.text()
-                        logger.error(f"Anthropic API error: {response.status} - {error_data}")
-                        return f"Error: {response.status}"
+            session = self.http.get_session(url)
+            async with session.post(
+                url,
+                headers={
+                    "x-api-key": self.api_key,
+                    "anthropic-version": "2023-06-01",
+                    "Content-Type": "application/json"
+                },
+                json=payload
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data["content"][0]["text"].strip()
+                else:
+                    error_data = await response.text()
+                    logger.error(f"Anthropic API error: {response.status} - {error_data}")
+                    return f"Error: {response.status}"
         except Exception as e:
             logger.error(f"Error generating response from Anthropic: {e}")
             return f"Error: {str(e)}"
             
+    async def stream_response(self, prompt: str, temperature: float = 0.7) -> AsyncIterator[str]:
+        """
+        Generate an enhanced prompt using the Anthropic API, yielding it as it is generated.
+        
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+            
+        Yields:
+            Pieces of the enhanced prompt
+        """
+        url = f"{self.base_url}/messages"
+        payload = self._build_payload(prompt, temperature)
+        payload["stream"] = True
+        
+        session = self.http.get_session(url)
+        async with session.post(
+            url,
+            headers={
+                "x-api-key": self.api_key,
+                "anthropic-version": "2023-06-01",
+                "Content-Type": "application/json"
+            },
+            json=payload
+        ) as response:
+            if response.status != 200:
+                error_data = await response.text()
+                logger.error(f"Anthropic API error: {response.status} - {error_data}")
+                return
+            async for event, data in iter_sse_events(response):
+                if event == "message_stop":
+                    return
+                if event == "error":
+                    logger.error(f"Anthropic stream error: {data}")
+                    return
+                if event == "content_block_delta":
+                    delta = json.loads(data).get("delta", {})
+                    if delta.get("type") == "text_delta" and delta.get("text"):
+                        yield delta["text"]
+                        
+    def _build_payload(self, prompt: str, temperature: float) -> Dict[str, Any]:
+        """
+        Build the messages request for a prompt.
+        
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+            
+        Returns:
+            The request payload
+        """
+        return {
+            "model": self.model,
+            "max_tokens": 1000,
+            "temperature": temperature,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": f"{self.get_system_prompt(temperature)}\n\nUser prompt: {prompt}"
+                }
+            ]
+        }
+        
     def get_system_prompt(self, temperature: float) -> str:
         """
         Get the system prompt for the provider.
@@ -0,0 +1,79 @@
+"""
+Shared HTTP sessions for the AI providers.
+"""
+
+import logging
+from typing import Dict
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.infrastructure.config.config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+class HttpClientPool:
+    """
+    One long-lived aiohttp session per provider host, so requests reuse
+    keep-alive connections instead of paying a TCP and TLS handshake each time.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern to ensure only one pool of sessions exists"""
+        if cls._instance is None:
+            cls._instance = super(HttpClientPool, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the pool"""
+        # Only initialize once (singleton pattern)
+        if self._initialized:
+            return
+
+        config = ConfigManager()
+        self.pool_size = config.ai_http_pool_size
+        self.keepalive = config.ai_http_keepalive
+        self.timeout = aiohttp.ClientTimeout(
+            total=config.ai_http_timeout,
+            connect=config.ai_http_connect_timeout
+        )
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._initialized = True
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """
+        Get the session for a URL's host, creating it on first use.
+        Must be called from the event loop the session is used on.
+
+        Args:
+            url: Any URL on the host
+
+        Returns:
+            The host's session
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        session = self._sessions.get(origin)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._sessions[origin] = session
+            logger.debug(f"Created HTTP session for {origin}")
+        return session
+
+    async def close(self):
+        """Close every session and its connections"""
+        sessions, self._sessions = self._sessions, {}
+        for origin, session in sessions.items():
+            try:
+                await session.close()
+            except Exception as e:
+                logger.error(f"Error closing HTTP session for {origin}: {e}")
@@ -4,11 +4,12 @@ OpenAI provider for AI services.
 
 import logging
 import json
-import aiohttp
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 
 from src.domain.interfaces.ai_provider import AIProvider
 from src.infrastructure.config.config_manager import ConfigManager
+from src.infrastructure.ai_providers.http_client import HttpClientPool
+from src.infrastructure.ai_providers.sse import iter_chat_completion_deltas
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,7 @@ class OpenAIProvider(AIProvider):
         self.api_key = self.config.openai_api_key
         self.model = self.config.openai_model
         self._base_url = "https://api.openai.com/v1"
+        self.http = HttpClientPool()
         
     @property
     def base_url(self) -> str:
@@ -46,19 +48,19 @@ class OpenAIProvider(AIProvider):
             # Use a simple models list request to test the connection
             url = f"{self.base_url}/models"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    }
-                ) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        logger.error(f"OpenAI connection test failed: {response.status}")
-                        return False
+            session = self.http.get_session(url)
+            async with session.get(
+                url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            ) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    logger.error(f"OpenAI connection test failed: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"Error testing OpenAI connection: {e}")
             return False
@@ -76,44 +78,86 @@ class OpenAIProvider(AIProvider):
         """
         try:
             url = f"{self.base_url}/chat/completions"
+            payload = self._build_payload(prompt, temperature)
             
-            # Create the request payload
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": self.get_system_prompt(temperature)
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": temperature,
-                "max_tokens": 1000
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data["choices"][0]["message"]["content"].strip()
-                    else:
-                        error_data = await response.text()
-                        logger.error(f"OpenAI API error: {response.status} - {error_data}")
-                        return f"Error: {response.status}"
+            session = self.http.get_session(url)
+            async with session.post(
+                url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=payload
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data["choices"][0]["message"]["content"].strip()
+                else:
+                    error_data = await response.text()
+                    logger.error(f"OpenAI API error: {response.status} - {error_data}")
+                    return f"Error: {response.status}"
         except Exception as e:
             logger.error(f"Error generating response from OpenAI: {e}")
             return f"Error: {str(e)}"
             
+    async def stream_response(self, prompt: str, temperature: float = 0.7) -> AsyncIterator[str]:
+        """
+        Generate an enhanced prompt using the OpenAI API, yielding it as it is generated.
+        
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+            
+        Yields:
+            Pieces of the enhanced prompt
+        """
+        url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(prompt, temperature)
+        payload["stream"] = True
+        
+        session = self.http.get_session(url)
+        async with session.post(
+            url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json=payload
+        ) as response:
+            if response.status != 200:
+                error_data = await response.text()
+                logger.error(f"OpenAI API error: {response.status} - {error_data}")
+                return
+            async for content in iter_chat_completion_deltas(response):
+                yield content
+                
+    def _build_payload(self, prompt: str, temperature: float) -> Dict[str, Any]:
+        """
+        Build the chat completion request for a prompt.
+        
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+            
+        Returns:
+            The request payload
+        """
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": self.get_system_prompt(temperature)
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": temperature,
+            "max_tokens": 1000
+        }
+        
     def get_system_prompt(self, temperature: float) -> str:
         """
         Get the system prompt for the provider.
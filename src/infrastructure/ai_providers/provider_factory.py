@@ -12,7 +12,8 @@ logger = logging.getLogger(__name__)
 class AIProviderFactory:
     """
     Factory for creating AI provider instances.
-    Manages the creation and caching of AI provider instances.
+    Manages the creation and caching of AI provider instances, which live
+    for the lifetime of the bot and share pooled HTTP sessions.
     """
     
     _providers: Dict[str, Type[AIProvider]] = {}
@@ -71,3 +72,10 @@ class AIProviderFactory:
         """
         config = ConfigManager()
         return cls.get_provider(config.ai_provider)
+
+    @classmethod
+    async def close(cls):
+        """Close the HTTP sessions shared by the provider instances, e.g. on shutdown"""
+        # Imported here to avoid a circular import, as the providers import this module's package
+        from src.infrastructure.ai_providers.http_client import HttpClientPool
+        await HttpClientPool().close()
@@ -0,0 +1,68 @@
+"""
+Server-sent events parsing for streamed AI provider responses.
+"""
+
+import json
+import logging
+from typing import AsyncIterator, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+async def iter_sse_events(response: aiohttp.ClientResponse) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Read the events of a server-sent events response as they arrive.
+
+    Args:
+        response: Streaming HTTP response
+
+    Yields:
+        (event type, data) pairs; the type is "message" unless the event names one
+    """
+    event, data = None, []
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            # A blank line ends the event
+            if data:
+                yield event or 'message', '\n'.join(data)
+            event, data = None, []
+            continue
+        if line.startswith(':'):
+            continue
+
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            event = value
+        elif field == 'data':
+            data.append(value)
+
+    if data:
+        yield event or 'message', '\n'.join(data)
+
+async def iter_chat_completion_deltas(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """
+    Read the text of a streamed OpenAI-compatible chat completion.
+
+    Args:
+        response: Streaming HTTP response of a /chat/completions request with "stream": true
+
+    Yields:
+        Pieces of the completion's text
+    """
+    async for _, data in iter_sse_events(response):
+        if data == '[DONE]':
+            return
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed stream chunk: {data[:100]}")
+            continue
+
+        choices = chunk.get('choices') or []
+        content = choices[0].get('delta', {}).get('content') if choices else None
+        if content:
+            yield content
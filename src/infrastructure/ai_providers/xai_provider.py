@@ -3,12 +3,14 @@ XAI (X.ai/Grok) provider for AI services.
 """
 
 import logging
-import aiohttp
 import os
-from typing import Dict, Any, Optional
+import re
+from typing import AsyncIterator, Dict, Any, Optional
 
 from src.domain.interfaces.ai_provider import AIProvider
 from src.infrastructure.config.config_manager import ConfigManager
+from src.infrastructure.ai_providers.http_client import HttpClientPool
+from src.infrastructure.ai_providers.sse import iter_chat_completion_deltas
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,7 @@ class XAIProvider(AIProvider):
         self.api_key = self.config.xai_api_key
         self.model = self.config.xai_model
         self._base_url = "https://api.x.ai/v1"
+        self.http = HttpClientPool()
 
     @property
     def base_url(self) -> str:
@@ -57,16 +60,16 @@ class XAIProvider(AIProvider):
                 "max_tokens": 5
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload
-                ) as response:
-                    return response.status == 200
+            session = self.http.get_session(url)
+            async with session.post(
+                url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=payload
+            ) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Error testing connection to XAI: {e}")
             return False
@@ -93,58 +96,118 @@ class XAIProvider(AIProvider):
 
             # Get word limit based on temperature
             word_limit = self._get_word_limit(temperature)
-
-            # Add word limit instruction to system prompt
-            system_prompt = self.get_system_prompt(temperature)
-            word_limit_instruction = f"\n\nIMPORTANT: Your response must not exceed {word_limit} words. Be concise and precise."
-            system_prompt = system_prompt + word_limit_instruction
-
-            # Create the request payload
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Original prompt: {prompt}\n\nEnhanced prompt:"
-                    }
-                ],
-                "temperature": temperature,
-                "max_tokens": 1024,
-                "n": 1,
-                "stop": ["\n"]
-            }
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload,
-                    timeout=30
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        enhanced_prompt = data["choices"][0]["message"]["content"].strip()
-
-                        # Enforce word limit
-                        enhanced_prompt = self._enforce_word_limit(enhanced_prompt, word_limit)
-
-                        logger.info(f"Enhanced prompt with XAI: {enhanced_prompt}")
-                        return enhanced_prompt
-                    else:
-                        error_data = await response.text()
-                        logger.error(f"XAI API error: {response.status} - {error_data}")
-                        return f"Error: {response.status}"
+            payload = self._build_payload(prompt, temperature, word_limit)
+
+            session = self.http.get_session(url)
+            async with session.post(
+                url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=payload,
+                timeout=30
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    enhanced_prompt = data["choices"][0]["message"]["content"].strip()
+
+                    # Enforce word limit
+                    enhanced_prompt = self._enforce_word_limit(enhanced_prompt, word_limit)
+
+                    logger.info(f"Enhanced prompt with XAI: {enhanced_prompt}")
+                    return enhanced_prompt
+                else:
+                    error_data = await response.text()
+                    logger.error(f"XAI API error: {response.status} - {error_data}")
+                    return f"Error: {response.status}"
         except Exception as e:
             logger.error(f"Error generating response from XAI: {e}")
             return f"Error: {str(e)}"
 
+    async def stream_response(self, prompt: str, temperature: float = 0.7) -> AsyncIterator[str]:
+        """
+        Generate an enhanced prompt using the XAI API, yielding it as it is generated.
+        The stream stops at the word limit.
+
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+
+        Yields:
+            Pieces of the enhanced prompt
+        """
+        if temperature <= 0.1 or round(1 + (temperature * 9)) == 1:
+            yield prompt
+            return
+
+        url = f"{self.base_url}/chat/completions"
+        word_limit = self._get_word_limit(temperature)
+        payload = self._build_payload(prompt, temperature, word_limit)
+        payload["stream"] = True
+
+        session = self.http.get_session(url)
+        async with session.post(
+            url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json=payload
+        ) as response:
+            if response.status != 200:
+                error_data = await response.text()
+                logger.error(f"XAI API error: {response.status} - {error_data}")
+                return
+
+            text = ""
+            async for content in iter_chat_completion_deltas(response):
+                sent = len(text)
+                text += content
+                words = list(re.finditer(r"\S+", text))
+                if len(words) > word_limit:
+                    # Enforce the word limit, ending the stream at the last allowed word
+                    cut = words[word_limit - 1].end()
+                    if cut > sent:
+                        yield text[sent:cut]
+                    return
+                yield content
+
+    def _build_payload(self, prompt: str, temperature: float, word_limit: int) -> Dict[str, Any]:
+        """
+        Build the chat completion request for a prompt.
+
+        Args:
+            prompt: The prompt to enhance
+            temperature: Temperature for generation (controls creativity)
+            word_limit: Maximum number of words of the response
+
+        Returns:
+            The request payload
+        """
+        # Add word limit instruction to system prompt
+        system_prompt = self.get_system_prompt(temperature)
+        word_limit_instruction = f"\n\nIMPORTANT: Your response must not exceed {word_limit} words. Be concise and precise."
+        system_prompt = system_prompt + word_limit_instruction
+
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": f"Original prompt: {prompt}\n\nEnhanced prompt:"
+                }
+            ],
+            "temperature": temperature,
+            "max_tokens": 1024,
+            "n": 1,
+            "stop": ["\n"]
+        }
+
     def get_system_prompt(self, temperature: float) -> str:
         """
         Get the system prompt for the provider.
@@ -0,0 +1,7 @@
+"""
+Civitai API access.
+"""
+
+from src.infrastructure.civitai.civitai_client import CivitaiClient, CivitaiResponse, LocalCivitaiClient
+
+__all__ = ['CivitaiClient', 'CivitaiResponse', 'LocalCivitaiClient']
@@ -0,0 +1,122 @@
+"""
+Clients for Civitai model metadata.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from src.infrastructure.ai_providers.http_client import HttpClientPool
+
+logger = logging.getLogger(__name__)
+
+class CivitaiResponse:
+    """Result of a model metadata request"""
+
+    def __init__(self, status: int, data: Optional[Dict[str, Any]] = None,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Initialize the response.
+
+        Args:
+            status: HTTP status; 304 when the cached metadata is still current
+            data: Model metadata for a 200 response
+            etag: ETag to revalidate the metadata with
+            last_modified: Last-Modified date to revalidate the metadata with
+        """
+        self.status = status
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+
+class CivitaiClient:
+    """Fetches model metadata from the Civitai API over the shared HTTP sessions"""
+
+    def __init__(self, base_url: str = "https://civitai.com/api/v1"):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Base URL of the Civitai API
+        """
+        self.base_url = base_url.rstrip('/')
+        self.http = HttpClientPool()
+
+    async def get_model(self, model_id: str, etag: Optional[str] = None,
+                        last_modified: Optional[str] = None) -> CivitaiResponse:
+        """
+        Fetch a model's metadata, revalidating a cached copy if its validators are given.
+
+        Args:
+            model_id: Civitai model ID
+            etag: ETag of the cached copy
+            last_modified: Last-Modified date of the cached copy
+
+        Returns:
+            The response; network errors raise aiohttp.ClientError
+        """
+        url = f"{self.base_url}/models/{model_id}"
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        session = self.http.get_session(url)
+        async with session.get(url, headers=headers) as response:
+            data = await response.json() if response.status == 200 else None
+            return CivitaiResponse(
+                response.status,
+                data,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified')
+            )
+
+class LocalCivitaiClient:
+    """
+    Stand-in for the Civitai API serving metadata from memory or a JSON file of
+    {model_id: metadata}, for tests and offline development. It answers
+    conditional requests like the API, with an ETag derived from the metadata.
+    """
+
+    def __init__(self, models: Optional[Dict[str, Dict[str, Any]]] = None, path: Optional[str] = None):
+        """
+        Initialize the stand-in.
+
+        Args:
+            models: Metadata by model ID
+            path: JSON file to load the metadata from instead
+        """
+        self.models = {str(k): v for k, v in (models or {}).items()}
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.models.update({str(k): v for k, v in json.load(f).items()})
+                logger.info(f"Loaded {len(self.models)} Civitai models from {path}")
+            except Exception as e:
+                logger.error(f"Error loading Civitai models from {path}: {e}")
+        self.requests = 0
+
+    async def get_model(self, model_id: str, etag: Optional[str] = None,
+                        last_modified: Optional[str] = None) -> CivitaiResponse:
+        """
+        Look up a model's metadata.
+
+        Args:
+            model_id: Civitai model ID
+            etag: ETag of the cached copy
+            last_modified: Ignored; the ETag is enough to revalidate
+
+        Returns:
+            The response
+        """
+        self.requests += 1
+        data = self.models.get(str(model_id))
+        if data is None:
+            return CivitaiResponse(404)
+
+        current = '"' + hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest() + '"'
+        if etag == current:
+            return CivitaiResponse(304, etag=current)
+        return CivitaiResponse(200, data, etag=current)
@@ -164,14 +164,14 @@ class ComfyUIService:
             Tuple of (images, generation_time)
         """
         try:
-            # Start timing
-            start_time = time.time()
-
             # Queue the prompt using HTTP API
             prompt_response = self.queue_prompt(workflow)
             if 'prompt_id' not in prompt_response:
                 raise ValueError("No prompt_id in response from queue_prompt")
 
+            # Generation time is measured from submission, as in comfygen.get_images
+            start_time = time.monotonic()
+
             prompt_id = prompt_response['prompt_id']
             logger.info(f"Queued prompt with ID: {prompt_id}")
 
@@ -194,7 +194,8 @@ class ComfyUIService:
                             try:
                                 logger.debug("Waiting for websocket message...")
                                 out = ws.recv()
-                                logger.debug(f"Received websocket message: {out[:100] if isinstance(out, str) else 'binary data'}...")
+                                logger.debug("Received websocket message: %s...", out[:100] if isinstance(out, str) else 'binary data',
+                                             extra={'category': 'websocket', 'prompt_id': prompt_id})
                             except websocket.WebSocketTimeoutException:
                                 logger.warning("Websocket receive timed out, retrying...")
                                 continue
@@ -211,7 +212,8 @@ class ComfyUIService:
 
                                 # Log important messages
                                 if message.get('type') not in ['status']:
-                                    logger.info(f"Received important websocket message: {message}")
+                                    logger.debug("Received websocket message of type %s", message.get('type'),
+                                                 extra={'category': 'websocket', 'prompt_id': prompt_id})
                             except json.JSONDecodeError as e:
                                 logger.error(f"Error parsing WebSocket message: {e}")
                                 continue
@@ -314,7 +316,7 @@ class ComfyUIService:
                 # Check if we have a result
                 try:
                     outputs = result_queue.get_nowait()
-                    generation_time = time.time() - start_time
+                    generation_time = time.monotonic() - start_time
                     logger.info(f"Generated images in {generation_time:.2f} seconds")
 
                     if progress_callback:
@@ -357,6 +359,26 @@ class ComfyUIService:
             logger.error(f"Error generating images: {e}")
             raise
 
+    def get_object_info(self) -> Dict[str, Any]:
+        """
+        Get the node classes ComfyUI has installed, with their inputs and the
+        model files it can choose from.
+
+        Returns:
+            ComfyUI's /object_info response
+        """
+        try:
+            import urllib.request
+            url = f"http://{self.server_address}/object_info"
+            with urllib.request.urlopen(url, timeout=30) as response:
+                result = json.loads(response.read().decode('utf-8'))
+            if not isinstance(result, dict):
+                raise ValueError("Expected dictionary response from ComfyUI")
+            return result
+        except Exception as e:
+            logger.error(f"Error getting object info: {e}")
+            raise
+
     def get_image(self, filename: str, subfolder: str = "", folder_type: str = "output") -> bytes:
         """
         Get an image from ComfyUI.
@@ -752,14 +774,13 @@ class ComfyUIService:
                         try:
                             # Try to get LoRA info from LoraManager
                             from src.domain.lora_management import LoraManager
-                            lora_manager = LoraManager()
-                            lora_info = lora_manager.get_lora_info(lora)
+                            catalog = LoraManager().catalog
 
-                            if lora_info:
+                            if lora in catalog.weights:
                                 processed_loras.append({
                                     "name": lora,
-                                    "model_strength": float(lora_info.get('weight', 1.0)),
-                                    "clip_strength": float(lora_info.get('weight', 1.0))
+                                    "model_strength": catalog.weights[lora],
+                                    "clip_strength": catalog.weights[lora]
                                 })
                             else:
                                 # Fallback if LoRA info not found
@@ -43,9 +43,8 @@ class ConfigManager:
         self.config_dir = Path(config_dir)
         self.configs = {}
 
-        # Load configurations
+        # Load configurations; JSON files are parsed on first use by get_config()
         self.load_env()
-        self.load_configs()
 
         # Discord configurations
         self.discord_token = os.getenv('DISCORD_TOKEN')
@@ -66,6 +65,8 @@ class ConfigManager:
         # AI Integration
         self.enable_prompt_enhancement = os.getenv('ENABLE_PROMPT_ENHANCEMENT', 'false').lower() == 'true'
         self.ai_provider = os.getenv('AI_PROVIDER', 'lmstudio')
+        # Several providers, e.g. "lmstudio,openai", to fail over and hedge between them
+        self.ai_providers = [p.strip().lower() for p in os.getenv('AI_PROVIDERS', '').split(',') if p.strip()]
 
         # Provider settings
         self.lmstudio_host = os.getenv('LMSTUDIO_HOST', 'localhost')
@@ -80,8 +81,94 @@ class ConfigManager:
         self.mistral_api_key = os.getenv('MISTRAL_API_KEY', '')
         self.mistral_model = os.getenv('MISTRAL_MODEL', 'mistral-large-latest')
 
+        # Rate limit settings
+        self.rate_limit = int(os.getenv('RATE_LIMIT', '50'))
+        self.rate_window = float(os.getenv('RATE_WINDOW', '3600'))
+        self.rate_limit_roles = self._parse_mapping(os.getenv('RATE_LIMIT_ROLES', ''), int)
+        self.rate_limit_job_costs = self._parse_mapping(os.getenv('RATE_LIMIT_JOB_COSTS', ''), float)
+
+        # Database write settings
+        self.db_write_durability = os.getenv('DB_WRITE_DURABILITY', 'batched').lower()
+        self.db_flush_interval = float(os.getenv('DB_FLUSH_INTERVAL', '1.0'))
+
+        # Retention settings (table:days, e.g. "command_usage:90,queue_items:30")
+        self.retention_days = self._parse_mapping(os.getenv('RETENTION_DAYS', ''), int)
+        self.retention_archive_dir = os.getenv('RETENTION_ARCHIVE_DIR', 'archive')
+        self.retention_interval_hours = float(os.getenv('RETENTION_INTERVAL_HOURS', '24'))
+
+        # Event loop watchdog settings
+        self.loop_stall_threshold = float(os.getenv('LOOP_STALL_THRESHOLD', '0.25'))
+        self.profile_max_seconds = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+
+        # AI provider HTTP settings
+        self.ai_http_timeout = float(os.getenv('AI_HTTP_TIMEOUT', '60'))
+        self.ai_http_connect_timeout = float(os.getenv('AI_HTTP_CONNECT_TIMEOUT', '10'))
+        self.ai_http_pool_size = int(os.getenv('AI_HTTP_POOL_SIZE', '10'))
+        self.ai_http_keepalive = float(os.getenv('AI_HTTP_KEEPALIVE', '60'))
+
+        # Prompt enhancement cache settings
+        self.enhancement_cache_size = int(os.getenv('ENHANCEMENT_CACHE_SIZE', '512'))
+        self.enhancement_cache_ttl = float(os.getenv('ENHANCEMENT_CACHE_TTL', '86400'))
+        self.enhancement_cache_persist = os.getenv('ENHANCEMENT_CACHE_PERSIST', 'false').lower() == 'true'
+
+        # Streamed enhancement: the prompt is shown as it is written, edited at most once per interval
+        self.enhancement_streaming = os.getenv('ENHANCEMENT_STREAMING', 'true').lower() == 'true'
+        self.enhancement_stream_edit_interval = float(os.getenv('ENHANCEMENT_STREAM_EDIT_INTERVAL', '1.0'))
+        # Providers a prompt may be sent to while it is still being moderated, e.g. a local
+        # model; with any other provider the prompt is only enhanced once it passes
+        self.enhance_before_moderation_providers = [
+            p.strip().lower() for p in os.getenv('ENHANCE_BEFORE_MODERATION_PROVIDERS', 'lmstudio').split(',') if p.strip()
+        ]
+
+        # LLM request scheduling: concurrent requests per provider, e.g. "lmstudio:1,openai:8"
+        self.llm_max_concurrency = {'lmstudio': 1}
+        self.llm_max_concurrency.update(self._parse_mapping(os.getenv('LLM_MAX_CONCURRENCY', ''), int))
+        self.llm_default_concurrency = int(os.getenv('LLM_DEFAULT_CONCURRENCY', '8'))
+        self.llm_queue_timeout = float(os.getenv('LLM_QUEUE_TIMEOUT', '20'))
+
+        # Hedging between providers: a second provider is asked once the first takes longer
+        # than its p95 latency, or AI_HEDGE_DELAY until enough latencies are known
+        self.ai_hedge_delay = float(os.getenv('AI_HEDGE_DELAY', '3'))
+        self.ai_hedge_min_delay = float(os.getenv('AI_HEDGE_MIN_DELAY', '0.5'))
+        self.ai_provider_cooldown = float(os.getenv('AI_PROVIDER_COOLDOWN', '30'))
+
+        # Civitai metadata cache; CIVITAI_LOCAL_METADATA names a JSON file served instead of the API
+        self.civitai_api_url = os.getenv('CIVITAI_API_URL', 'https://civitai.com/api/v1')
+        self.civitai_local_metadata = os.getenv('CIVITAI_LOCAL_METADATA', '')
+        self.civitai_cache_ttl = float(os.getenv('CIVITAI_CACHE_TTL', '86400'))
+        self.civitai_negative_ttl = float(os.getenv('CIVITAI_NEGATIVE_TTL', '3600'))
+        self.civitai_max_concurrency = int(os.getenv('CIVITAI_MAX_CONCURRENCY', '4'))
+        self.civitai_cache_persist = os.getenv('CIVITAI_CACHE_PERSIST', 'true').lower() == 'true'
+
+        # Preflight validation of workflows against ComfyUI's installed nodes and models
+        self.comfyui_preflight = os.getenv('COMFYUI_PREFLIGHT', 'true').lower() == 'true'
+        self.comfyui_object_info_refresh = float(os.getenv('COMFYUI_OBJECT_INFO_REFRESH', '300'))
+
         self._initialized = True
 
+    @staticmethod
+    def _parse_mapping(value: str, cast) -> Dict[str, Any]:
+        """
+        Parse a comma-separated list of key:value pairs.
+
+        Args:
+            value: String such as "video:5,pulid:2"
+            cast: Function used to convert each value
+
+        Returns:
+            The parsed mapping
+        """
+        mapping = {}
+        for pair in value.split(','):
+            if ':' not in pair:
+                continue
+            key, _, raw = pair.partition(':')
+            try:
+                mapping[key.strip()] = cast(raw.strip())
+            except ValueError:
+                logger.warning(f"Ignoring invalid setting '{pair}'")
+        return mapping
+
     def load_env(self, env_file: Optional[str] = None):
         """
         Load environment variables from .env file.
@@ -116,7 +203,7 @@ class ConfigManager:
 
     def get_config(self, name: str) -> Dict[str, Any]:
         """
-        Get a configuration by name.
+        Get a configuration by name, loading its file on first use.
 
         Args:
             name: Name of the configuration to get
@@ -124,7 +211,18 @@ class ConfigManager:
         Returns:
             The configuration dictionary
         """
-        return self.configs.get(name, {})
+        if name not in self.configs:
+            config_file = self.config_dir / f"{name}.json"
+            if not config_file.exists():
+                return {}
+            try:
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    self.configs[name] = json.load(f)
+                logger.info(f"Loaded configuration from {config_file}")
+            except Exception as e:
+                logger.error(f"Error loading configuration from {config_file}: {e}")
+                return {}
+        return self.configs[name]
 
     def load_json(self, file_path: str) -> Dict[str, Any]:
         """
@@ -0,0 +1,233 @@
+"""
+Logging configuration for the application.
+Records are handed to a queue and written by a listener thread, so
+formatting and I/O happen off the event loop.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Argument types that can't change between the logging call and formatting on the listener thread
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None), bytes)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Attributes of every LogRecord, so JSON output only adds the ones passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+    The stock handler formats every record on the caller's thread; this one
+    only does so when the arguments are mutable and could change before the
+    listener gets to them.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        # Drop rather than block or raise when the listener can't keep up
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks must be rendered while the frames are still alive
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.args and not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in _iter_args(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+def _iter_args(args):
+    """Iterate the values of positional or mapping logging arguments"""
+    return args.values() if isinstance(args, dict) else args
+
+class RateLimitFilter(logging.Filter):
+    """
+    Rate limits and samples records below WARNING per category.
+    A record's category is its "category" extra if given, otherwise its
+    logger name. Suppressed records are counted and reported on the next
+    record of the category that gets through.
+    """
+
+    def __init__(self,
+                 rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 sample_rates: Optional[Dict[str, int]] = None):
+        """
+        Initialize the filter.
+
+        Args:
+            rate_limits: Mapping of category to (records per second, burst)
+            sample_rates: Mapping of category to N, keeping one in every N records
+        """
+        super().__init__()
+        self.rate_limits = rate_limits or {}
+        self.sample_rates = sample_rates or {}
+        # category -> [tokens, last refill time]
+        self._buckets: Dict[str, list] = {}
+        self._seen: Dict[str, int] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        category = getattr(record, "category", None) or record.name
+        limit = self.rate_limits.get(category)
+        sample = self.sample_rates.get(category)
+        if limit is None and sample is None:
+            return True
+
+        with self._lock:
+            allowed = True
+            if sample:
+                seen = self._seen.get(category, 0)
+                self._seen[category] = seen + 1
+                allowed = seen % sample == 0
+            if allowed and limit is not None:
+                allowed = self._take_token(category, *limit)
+
+            if not allowed:
+                self._suppressed[category] = self._suppressed.get(category, 0) + 1
+                return False
+
+            suppressed = self._suppressed.pop(category, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _take_token(self, category: str, rate: float, burst: float) -> bool:
+        """Take a token from the category's bucket, refilling it for the time passed"""
+        now = time.monotonic()
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = [burst, now]
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including any extra fields such as request_id"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    """The default text format, noting suppressed records and the request ID when given"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            text = f"{text} [request_id={request_id}]"
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text = f"{text} ({suppressed} similar messages suppressed)"
+        return text
+
+def parse_categories(value: str, cast) -> Dict[str, object]:
+    """
+    Parse a comma separated category:value list, e.g. "websocket:2,progress:1".
+
+    Args:
+        value: String to parse
+        cast: Function converting each value
+
+    Returns:
+        Mapping of category to value; malformed entries are ignored
+    """
+    result = {}
+    for entry in value.split(","):
+        name, _, setting = entry.strip().rpartition(":")
+        if name and setting:
+            try:
+                result[name] = cast(setting)
+            except ValueError:
+                pass
+    return result
+
+def setup_logging(level: int = logging.INFO,
+                  log_file: Optional[str] = "logs/bot.log",
+                  json_output: bool = False,
+                  rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                  sample_rates: Optional[Dict[str, int]] = None,
+                  queue_size: int = 10000) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a listener thread.
+
+    Args:
+        level: Root log level
+        log_file: File to write logs to in addition to stdout, None for stdout only
+        json_output: Write JSON lines instead of text
+        rate_limits: Mapping of category to (records per second, burst)
+        sample_rates: Mapping of category to N, keeping one in every N records
+        queue_size: Maximum number of queued records; further records are dropped
+
+    Returns:
+        The started queue listener
+    """
+    if json_output:
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    queue_handler = DeferredQueueHandler(log_queue)
+    # Filtering happens on the caller's thread, before anything is queued
+    queue_handler.addFilter(RateLimitFilter(rate_limits, sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    global _listener
+    stop_logging()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# Write out queued records when the process exits
+atexit.register(stop_logging)
@@ -7,11 +7,18 @@ import sqlite3
 import logging
 import json
 import os
+import time
 from typing import Dict, Any, List, Optional, Tuple, Union
 from pathlib import Path
 
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
 logger = logging.getLogger(__name__)
 
+transaction_seconds = MetricsRegistry().histogram(
+    "db_transaction_seconds", "Time to execute and commit a write transaction", ("source",)
+)
+
 class DatabaseService:
     """
     Database service for the application.
@@ -64,12 +71,14 @@ class DatabaseService:
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        start = time.perf_counter()
         try:
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
             conn.commit()
+            transaction_seconds.observe(time.perf_counter() - start, ("direct",))
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             conn.rollback()
@@ -93,9 +102,11 @@ class DatabaseService:
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        start = time.perf_counter()
         try:
             cursor.executemany(query, params_list)
             conn.commit()
+            transaction_seconds.observe(time.perf_counter() - start, ("direct",))
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             conn.rollback()
@@ -211,6 +222,49 @@ class DatabaseService:
             logger.error(f"Error creating table {table_name}: {e}")
             raise
             
+    def add_column(self, table_name: str, column_name: str, definition: str):
+        """
+        Add a column to an existing table if it doesn't have it yet.
+
+        Args:
+            table_name: Name of the table
+            column_name: Name of the column
+            definition: Column definition
+        """
+        columns = [row[1] for row in self.fetch_all(f"PRAGMA table_info({table_name})")]
+        if column_name in columns:
+            return
+
+        try:
+            self.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}")
+            logger.info(f"Added column {column_name} to table {table_name}")
+        except Exception as e:
+            logger.error(f"Error adding column {column_name} to {table_name}: {e}")
+            raise
+
+    def create_index(self, index_name: str, table_name: str, columns: List[str],
+                     unique: bool = False, if_not_exists: bool = True):
+        """
+        Create an index.
+
+        Args:
+            index_name: Name of the index
+            table_name: Name of the indexed table
+            columns: Columns to index, in order
+            unique: Whether to create a UNIQUE index
+            if_not_exists: Whether to add IF NOT EXISTS to the query
+        """
+        unique_clause = "UNIQUE " if unique else ""
+        exists_clause = "IF NOT EXISTS " if if_not_exists else ""
+        query = f"CREATE {unique_clause}INDEX {exists_clause}{index_name} ON {table_name} ({', '.join(columns)})"
+
+        try:
+            self.execute(query)
+            logger.debug(f"Created index: {index_name}")
+        except Exception as e:
+            logger.error(f"Error creating index {index_name}: {e}")
+            raise
+
     def drop_table(self, table_name: str, if_exists: bool = True):
         """
         Drop a table.
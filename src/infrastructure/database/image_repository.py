@@ -11,23 +11,29 @@ from datetime import datetime
 
 from src.domain.models.queue_item import RequestItem, QueueItem
 from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.database.write_behind_journal import WriteBehindJournal
 
 logger = logging.getLogger(__name__)
 
+# Marker recorded in schema_migrations once generation_loras has been backfilled
+GENERATION_LORAS_BACKFILL = "generation_loras_backfill"
+
 class ImageRepository:
     """
     Repository for image generation data.
     Handles persistence of image generation data in a SQLite database.
     """
 
-    def __init__(self, database_service: DatabaseService):
+    def __init__(self, database_service: DatabaseService, journal: Optional[WriteBehindJournal] = None):
         """
         Initialize the image repository.
 
         Args:
             database_service: Database service for database access
+            journal: Write-behind journal for generation writes (writes through if not provided)
         """
         self.database_service = database_service
+        self.journal = journal or WriteBehindJournal(database_service)
         self._init_db()
 
     def _init_db(self):
@@ -58,11 +64,163 @@ class ImageRepository:
                 }
             )
 
+            # Create normalized LoRA usage table, one row per LoRA per generation
+            self.database_service.create_table(
+                "generation_loras",
+                {
+                    "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+                    "request_id": "TEXT NOT NULL",
+                    "lora_file": "TEXT NOT NULL",
+                    "strength": "REAL",
+                    "ts": "REAL NOT NULL"
+                }
+            )
+            self.database_service.create_index(
+                "idx_generation_loras_request", "generation_loras", ["request_id", "lora_file"], unique=True
+            )
+            self.database_service.create_index(
+                "idx_generation_loras_lora_ts", "generation_loras", ["lora_file", "ts"]
+            )
+            self.database_service.create_index(
+                "idx_generation_loras_ts", "generation_loras", ["ts"]
+            )
+
+            # Data migrations that have completed, so a failed one runs again on the next start
+            self.database_service.create_table(
+                "schema_migrations",
+                {
+                    "name": "TEXT PRIMARY KEY",
+                    "completed_at": "REAL NOT NULL"
+                }
+            )
+
+            # One-off migration of LoRA usage already stored as JSON
+            if not self._migration_done(GENERATION_LORAS_BACKFILL) and self._backfill_generation_loras():
+                self._mark_migration_done(GENERATION_LORAS_BACKFILL)
+
             logger.info("Image generations database initialized")
         except Exception as e:
             logger.error(f"Error initializing image generations database: {e}")
             raise
 
+    @staticmethod
+    def _normalize_loras(loras: Any) -> List[Tuple[str, Optional[float]]]:
+        """
+        Normalize a LoRA selection into (lora_file, strength) pairs.
+
+        LoRAs are stored either as plain filenames (from the selection views)
+        or as dictionaries from the workflow builders, so both shapes are accepted.
+
+        Args:
+            loras: List of LoRA filenames or LoRA dictionaries
+
+        Returns:
+            List of (lora_file, strength) tuples; strength is None when unknown
+        """
+        normalized = []
+        for lora in loras or []:
+            if isinstance(lora, str):
+                lora_file, strength = lora, None
+            elif isinstance(lora, dict):
+                lora_file = lora.get('lora') or lora.get('file') or lora.get('name')
+                strength = lora.get('strength', lora.get('model_strength', lora.get('weight')))
+            else:
+                continue
+
+            if not lora_file:
+                continue
+
+            try:
+                strength = float(strength) if strength is not None else None
+            except (TypeError, ValueError):
+                strength = None
+
+            normalized.append((lora_file, strength))
+
+        return normalized
+
+    async def _save_generation_loras(self, request_id: str, loras: Any, ts: float):
+        """
+        Record LoRA usage for a generation in the normalized table.
+
+        Args:
+            request_id: Request ID
+            loras: List of LoRA filenames or LoRA dictionaries
+            ts: Timestamp of the generation
+        """
+        await self.journal.insert_ignore(
+            "generation_loras",
+            [
+                {"request_id": request_id, "lora_file": lora_file, "strength": strength, "ts": ts}
+                for lora_file, strength in self._normalize_loras(loras)
+            ]
+        )
+
+    def _migration_done(self, name: str) -> bool:
+        """Whether a data migration has completed"""
+        return self.database_service.fetch_one(
+            "SELECT 1 FROM schema_migrations WHERE name = ?", (name,)
+        ) is not None
+
+    def _mark_migration_done(self, name: str):
+        """Record that a data migration has completed"""
+        self.database_service.execute(
+            "INSERT OR REPLACE INTO schema_migrations (name, completed_at) VALUES (?, ?)",
+            (name, time.time())
+        )
+
+    def _backfill_generation_loras(self, batch_size: int = 500) -> bool:
+        """
+        Populate generation_loras from the JSON loras column of existing generations.
+        Rows already migrated are ignored, so an interrupted backfill can run again.
+
+        Args:
+            batch_size: Number of generations to migrate per batch
+
+        Returns:
+            True if every generation was migrated
+        """
+        try:
+            migrated = 0
+            last_rowid = 0
+            while True:
+                results = self.database_service.fetch_all(
+                    """
+                    SELECT rowid, request_id, loras, created_at FROM image_generations
+                    WHERE rowid > ? AND loras IS NOT NULL AND loras != '[]'
+                    ORDER BY rowid
+                    LIMIT ?
+                    """,
+                    (last_rowid, batch_size)
+                )
+                if not results:
+                    break
+
+                rows = []
+                for rowid, request_id, loras_json, created_at in results:
+                    last_rowid = rowid
+                    try:
+                        loras = json.loads(loras_json)
+                    except (TypeError, ValueError):
+                        continue
+                    rows.extend(
+                        (request_id, lora_file, strength, created_at)
+                        for lora_file, strength in self._normalize_loras(loras)
+                    )
+
+                if rows:
+                    self.database_service.execute_many(
+                        "INSERT OR IGNORE INTO generation_loras (request_id, lora_file, strength, ts) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    migrated += len(rows)
+
+            logger.info(f"Backfilled {migrated} LoRA usage rows into generation_loras")
+            return True
+        except Exception as e:
+            logger.error(f"Error backfilling generation_loras, LoRA stats are incomplete until it is retried on the next start: {e}")
+            return False
+
     async def save_image_generation(self,
                                    request_id: str,
                                    request_item: RequestItem,
@@ -101,61 +259,37 @@ class ImageRepository:
             if hasattr(request_item, 'guild_id'):
                 guild_id = request_item.guild_id
 
-            # Check if record already exists
-            existing = self.database_service.fetch_one(
-                "SELECT request_id FROM image_generations WHERE request_id = ?",
-                (request_id,)
-            )
-
             current_time = time.time()
 
-            if existing:
-                # Update existing record
-                query = """
-                UPDATE image_generations
-                SET image_path = ?,
-                    completed_at = ?,
-                    generation_time = ?
-                WHERE request_id = ?
-                """
-                params = (
-                    image_path,
-                    current_time if completed else None,
-                    generation_time,
-                    request_id
-                )
-                self.database_service.execute(query, params)
-            else:
-                # Insert new record
-                query = """
-                INSERT INTO image_generations (
-                    request_id, user_id, channel_id, guild_id, original_message_id,
-                    prompt, resolution, loras, upscale_factor, seed,
-                    is_video, is_pulid, generation_type, image_path,
-                    created_at, completed_at, generation_time, workflow_filename
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                params = (
-                    request_id,
-                    request_item.user_id,
-                    request_item.channel_id,
-                    guild_id,
-                    request_item.original_message_id,
-                    request_item.prompt,
-                    request_item.resolution,
-                    loras_json,
-                    request_item.upscale_factor if hasattr(request_item, 'upscale_factor') else 1,
-                    request_item.seed if hasattr(request_item, 'seed') else None,
-                    is_video,
-                    1 if hasattr(request_item, 'is_pulid') and request_item.is_pulid else 0,
-                    generation_type,
-                    image_path,
-                    current_time,
-                    current_time if completed else None,
-                    generation_time,
-                    request_item.workflow_filename if hasattr(request_item, 'workflow_filename') else None
-                )
-                self.database_service.execute(query, params)
+            # Upsert through the journal; an existing record only gets its completion data updated
+            await self.journal.upsert(
+                "image_generations",
+                "request_id",
+                {
+                    "request_id": request_id,
+                    "user_id": request_item.user_id,
+                    "channel_id": request_item.channel_id,
+                    "guild_id": guild_id,
+                    "original_message_id": request_item.original_message_id,
+                    "prompt": request_item.prompt,
+                    "resolution": request_item.resolution,
+                    "loras": loras_json,
+                    "upscale_factor": request_item.upscale_factor if hasattr(request_item, 'upscale_factor') else 1,
+                    "seed": request_item.seed if hasattr(request_item, 'seed') else None,
+                    "is_video": is_video,
+                    "is_pulid": 1 if hasattr(request_item, 'is_pulid') and request_item.is_pulid else 0,
+                    "generation_type": generation_type,
+                    "image_path": image_path,
+                    "created_at": current_time,
+                    "completed_at": current_time if completed else None,
+                    "generation_time": generation_time,
+                    "workflow_filename": request_item.workflow_filename if hasattr(request_item, 'workflow_filename') else None
+                },
+                update_columns=["image_path", "completed_at", "generation_time"]
+            )
+
+            # Record LoRA usage in the normalized table
+            await self._save_generation_loras(request_id, getattr(request_item, 'loras', []), current_time)
 
             return True
         except Exception as e:
@@ -173,6 +307,9 @@ class ImageRepository:
             Image generation data or None if not found
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             query = "SELECT * FROM image_generations WHERE request_id = ?"
             result = self.database_service.fetch_one(query, (request_id,))
 
@@ -208,6 +345,9 @@ class ImageRepository:
             Image generation data or None if not found
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             query = "SELECT * FROM image_generations WHERE original_message_id = ?"
             result = self.database_service.fetch_one(query, (message_id,))
 
@@ -245,6 +385,9 @@ class ImageRepository:
             List of image generation data
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             query = """
             SELECT * FROM image_generations
             WHERE user_id = ?
@@ -290,6 +433,9 @@ class ImageRepository:
             List of image generation data
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             query = """
             SELECT * FROM image_generations
             ORDER BY created_at DESC
@@ -352,6 +498,82 @@ class ImageRepository:
             logger.error(f"Error creating RequestItem from data: {e}")
             raise
 
+    async def get_popular_loras(self, limit: int = 5, days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most used LoRAs.
+
+        Args:
+            limit: Maximum number of LoRAs to return
+            days: Only count usage from the last N days, or None for all time
+
+        Returns:
+            List of dictionaries with 'name' and 'count' keys
+        """
+        try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
+            if days is not None:
+                query = """
+                SELECT lora_file, COUNT(*) as count
+                FROM generation_loras
+                WHERE ts > ?
+                GROUP BY lora_file
+                ORDER BY count DESC
+                LIMIT ?
+                """
+                params = (time.time() - days * 24 * 60 * 60, limit)
+            else:
+                query = """
+                SELECT lora_file, COUNT(*) as count
+                FROM generation_loras
+                GROUP BY lora_file
+                ORDER BY count DESC
+                LIMIT ?
+                """
+                params = (limit,)
+
+            results = self.database_service.fetch_all(query, params)
+            return [{'name': row[0], 'count': row[1]} for row in results] if results else []
+        except Exception as e:
+            logger.error(f"Error getting popular LoRAs: {e}")
+            return []
+
+    async def get_lora_usage(self, lora_file: str, days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get usage statistics for a single LoRA.
+
+        Args:
+            lora_file: The filename of the LoRA
+            days: Only count usage from the last N days, or None for all time
+
+        Returns:
+            Dictionary with 'count', 'avg_strength' and 'last_used' keys
+        """
+        try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
+            cutoff_time = time.time() - days * 24 * 60 * 60 if days is not None else 0
+            result = self.database_service.fetch_one(
+                """
+                SELECT COUNT(*), AVG(strength), MAX(ts)
+                FROM generation_loras
+                WHERE lora_file = ? AND ts > ?
+                """,
+                (lora_file, cutoff_time)
+            )
+
+            return {
+                'lora_file': lora_file,
+                'count': result[0] if result else 0,
+                'avg_strength': result[1] if result else None,
+                'last_used': result[2] if result else None
+            }
+        except Exception as e:
+            logger.error(f"Error getting LoRA usage: {e}")
+            return {'lora_file': lora_file, 'count': 0, 'avg_strength': None, 'last_used': None}
+
     async def get_stats(self) -> Dict[str, Any]:
         """
         Get image generation statistics.
@@ -360,6 +582,9 @@ class ImageRepository:
             Dictionary of statistics
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             stats = {}
 
             # Total generations
@@ -410,30 +635,7 @@ class ImageRepository:
             stats['popular_resolutions'] = [{'resolution': row[0], 'count': row[1]} for row in results] if results else []
 
             # Popular loras
-            query = """
-            SELECT loras FROM image_generations
-            WHERE loras IS NOT NULL AND loras != '[]'
-            """
-            results = self.database_service.fetch_all(query)
-
-            lora_counts = {}
-            for row in results:
-                if row[0]:
-                    try:
-                        loras = json.loads(row[0])
-                        for lora in loras:
-                            lora_name = lora.get('name', 'Unknown')
-                            if lora_name in lora_counts:
-                                lora_counts[lora_name] += 1
-                            else:
-                                lora_counts[lora_name] = 1
-                    except:
-                        pass
-
-            # Sort loras by count
-            popular_loras = [{'name': name, 'count': count} for name, count in lora_counts.items()]
-            popular_loras.sort(key=lambda x: x['count'], reverse=True)
-            stats['popular_loras'] = popular_loras[:5]
+            stats['popular_loras'] = await self.get_popular_loras(limit=5)
 
             # Generation types
             query = """
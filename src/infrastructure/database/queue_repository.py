@@ -11,6 +11,7 @@ from typing import Dict, Any, List, Optional, Tuple
 from src.domain.interfaces.queue_repository import QueueRepository
 from src.domain.models.queue_item import QueueItem, QueueStatus
 from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.database.write_behind_journal import WriteBehindJournal
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +21,19 @@ class SQLiteQueueRepository(QueueRepository):
     Handles persistence of queue items in a SQLite database.
     """
     
-    def __init__(self, database_service: DatabaseService, db_path: str = "queue.db"):
+    def __init__(self, database_service: DatabaseService, db_path: str = "queue.db",
+                 journal: Optional[WriteBehindJournal] = None):
         """
         Initialize the queue repository.
         
         Args:
             database_service: Database service for database access
             db_path: Path to the database file
+            journal: Write-behind journal for queue writes (writes through if not provided)
         """
         self.database_service = database_service
         self.db_path = db_path
+        self.journal = journal or WriteBehindJournal(database_service)
         self._init_db()
         
     def _init_db(self):
@@ -57,9 +61,11 @@ class SQLiteQueueRepository(QueueRepository):
                 {
                     "user_id": "TEXT PRIMARY KEY",
                     "request_count": "INTEGER NOT NULL",
-                    "last_request_time": "REAL NOT NULL"
+                    "last_request_time": "REAL NOT NULL",
+                    "tat": "REAL"
                 }
             )
+            self.database_service.add_column("user_rate_limits", "tat", "REAL")
             
             logger.info("Queue database initialized")
         except Exception as e:
@@ -80,20 +86,23 @@ class SQLiteQueueRepository(QueueRepository):
             # Convert request item to JSON
             request_data = json.dumps(item.to_dict())
             
-            # Insert into database
-            self.database_service.insert(
+            # Upsert through the journal
+            values = {
+                "request_id": item.request_id,
+                "request_data": request_data,
+                "priority": item.priority,
+                "user_id": item.user_id,
+                "added_at": item.added_at,
+                "started_at": item.started_at,
+                "completed_at": item.completed_at,
+                "status": item.status.value,
+                "error_message": item.error_message
+            }
+            await self.journal.upsert(
                 "queue_items",
-                {
-                    "request_id": item.request_id,
-                    "request_data": request_data,
-                    "priority": item.priority,
-                    "user_id": item.user_id,
-                    "added_at": item.added_at,
-                    "started_at": item.started_at,
-                    "completed_at": item.completed_at,
-                    "status": item.status.value,
-                    "error_message": item.error_message
-                }
+                "request_id",
+                values,
+                update_columns=[column for column in values if column != "request_id"]
             )
             
             logger.debug(f"Saved queue item: {item.request_id}")
@@ -110,6 +119,9 @@ class SQLiteQueueRepository(QueueRepository):
             List of pending queue items
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             # Get pending items from database
             rows = self.database_service.fetch_all(
                 "SELECT request_data FROM queue_items WHERE status = ? ORDER BY priority, added_at",
@@ -158,13 +170,8 @@ class SQLiteQueueRepository(QueueRepository):
             if error_message is not None:
                 update_data["error_message"] = error_message
                 
-            # Update in database
-            self.database_service.update(
-                "queue_items",
-                update_data,
-                "request_id = ?",
-                (request_id,)
-            )
+            # Update through the journal
+            await self.journal.update("queue_items", "request_id", request_id, update_data)
             
             logger.debug(f"Updated queue item status: {request_id} -> {status}")
             return True
@@ -184,6 +191,9 @@ class SQLiteQueueRepository(QueueRepository):
             Number of requests
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             # Calculate cutoff time
             cutoff_time = time.time() - time_window
             
@@ -200,47 +210,31 @@ class SQLiteQueueRepository(QueueRepository):
             logger.error(f"Error getting user request count: {e}")
             return 0
         
-    async def update_user_rate_limit(self, user_id: str) -> bool:
+    async def update_user_rate_limit(self, user_id: str, tat: Optional[float] = None) -> bool:
         """
         Update a user's rate limit.
         
         Args:
             user_id: User ID
+            tat: Theoretical arrival time of the user's rate limiter state
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Get current rate limit
-            row = self.database_service.fetch_one(
-                "SELECT request_count, last_request_time FROM user_rate_limits WHERE user_id = ?",
-                (user_id,)
+            # Upsert through the journal, counting requests on conflict
+            await self.journal.upsert(
+                "user_rate_limits",
+                "user_id",
+                {
+                    "user_id": user_id,
+                    "request_count": 1,
+                    "last_request_time": time.time(),
+                    "tat": tat
+                },
+                update_columns=["last_request_time", "tat"],
+                increment_columns=["request_count"]
             )
-            
-            current_time = time.time()
-            
-            if row:
-                # Update existing rate limit
-                request_count = row[0] + 1
-                self.database_service.update(
-                    "user_rate_limits",
-                    {
-                        "request_count": request_count,
-                        "last_request_time": current_time
-                    },
-                    "user_id = ?",
-                    (user_id,)
-                )
-            else:
-                # Insert new rate limit
-                self.database_service.insert(
-                    "user_rate_limits",
-                    {
-                        "user_id": user_id,
-                        "request_count": 1,
-                        "last_request_time": current_time
-                    }
-                )
                 
             logger.debug(f"Updated rate limit for user {user_id}")
             return True
@@ -248,6 +242,26 @@ class SQLiteQueueRepository(QueueRepository):
             logger.error(f"Error updating user rate limit: {e}")
             return False
         
+    async def get_user_rate_limit_states(self) -> Dict[str, float]:
+        """
+        Get the persisted rate limiter state of all users with an active limit.
+        
+        Returns:
+            Mapping of user ID to theoretical arrival time
+        """
+        try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
+            rows = self.database_service.fetch_all(
+                "SELECT user_id, tat FROM user_rate_limits WHERE tat > ?",
+                (time.time(),)
+            )
+            return {row[0]: row[1] for row in rows}
+        except Exception as e:
+            logger.error(f"Error getting user rate limit states: {e}")
+            return {}
+        
     async def get_queue_stats(self, days: int = 7) -> List[Dict[str, Any]]:
         """
         Get queue statistics.
@@ -259,6 +273,9 @@ class SQLiteQueueRepository(QueueRepository):
             Queue statistics
         """
         try:
+            # Make sure journaled writes are visible
+            await self.journal.flush()
+
             # Calculate cutoff time
             cutoff_time = time.time() - (days * 24 * 60 * 60)
             
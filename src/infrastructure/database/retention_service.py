@@ -0,0 +1,288 @@
+"""
+Retention, archiving and compaction for the SQLite databases.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Callable
+
+from src.infrastructure.database.database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+# Databases the tables live in
+MAIN_DATABASE = "main"
+ANALYTICS_DATABASE = "analytics"
+
+# Tables that support retention: table -> (timestamp column, extra condition for rows
+# that may be archived, database the table lives in)
+RETENTION_TABLES: Dict[str, Tuple[str, Optional[str], str]] = {
+    "queue_items": ("added_at", "status NOT IN ('pending', 'processing')", MAIN_DATABASE),
+    "filter_violations": ("timestamp", None, MAIN_DATABASE),
+    "user_warnings": ("warned_at", None, MAIN_DATABASE),
+    # Written to analytics.db by the analytics service and repository
+    "image_stats": ("timestamp", None, ANALYTICS_DATABASE),
+    "command_usage": ("timestamp", None, ANALYTICS_DATABASE),
+    "user_activity": ("timestamp", None, ANALYTICS_DATABASE),
+    "job_traces": ("started_at", None, MAIN_DATABASE),
+}
+
+class RetentionService:
+    """
+    Moves rows older than a per-table retention period into gzip-compressed
+    JSONL archives partitioned by month (archive/<table>/<YYYY-MM>.jsonl.gz),
+    deletes them in small batches and then reclaims the freed pages with an
+    incremental VACUUM, so the hot databases stay small.
+    """
+
+    def __init__(self,
+                 database_service: DatabaseService,
+                 policies: Dict[str, int],
+                 archive_dir: str = "archive",
+                 batch_size: int = 500,
+                 vacuum_pages: int = 1000,
+                 on_tables_pruned: Optional[Callable[[List[str]], None]] = None,
+                 analytics_db_path: str = "analytics.db"):
+        """
+        Initialize the retention service.
+
+        Args:
+            database_service: Database service for database access
+            policies: Mapping of table name to retention period in days
+            archive_dir: Directory for the archive files
+            batch_size: Number of rows archived and deleted per transaction
+            vacuum_pages: Maximum number of free pages reclaimed per incremental VACUUM step
+            on_tables_pruned: Called with the names of tables that had rows removed
+            analytics_db_path: Path to the analytics database
+        """
+        self.database_service = database_service
+        self.analytics_db_path = analytics_db_path
+        self.policies = {}
+        for table, days in policies.items():
+            if table not in RETENTION_TABLES:
+                logger.warning(f"Retention is not supported for table '{table}', ignoring")
+            elif days > 0:
+                self.policies[table] = days
+
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.on_tables_pruned = on_tables_pruned
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, interval_hours: float = 24):
+        """
+        Run retention periodically in the background.
+
+        Args:
+            interval_hours: Time between runs in hours
+        """
+        if not self.policies or self._task is not None:
+            return
+
+        self._task = asyncio.create_task(self._run_periodically(interval_hours * 3600))
+        logger.info(f"Retention service started for {', '.join(self.policies)}")
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_periodically(self, interval: float):
+        """Background task that runs retention every interval seconds"""
+        while True:
+            try:
+                await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error running retention: {e}")
+            await asyncio.sleep(interval)
+
+    async def run(self) -> Dict[str, int]:
+        """
+        Apply all retention policies once, off the event loop.
+
+        Returns:
+            Mapping of table name to number of archived rows
+        """
+        loop = asyncio.get_running_loop()
+        archived = await loop.run_in_executor(None, self.run_sync)
+
+        pruned = [table for table, count in archived.items() if count]
+        if pruned and self.on_tables_pruned:
+            self.on_tables_pruned(pruned)
+
+        return archived
+
+    def run_sync(self) -> Dict[str, int]:
+        """
+        Apply all retention policies once.
+
+        Returns:
+            Mapping of table name to number of archived rows
+        """
+        archived = {}
+        pruned_databases = set()
+        for table, days in self.policies.items():
+            try:
+                database = self._database_of(table)
+                if database is None:
+                    logger.warning(f"Retention is configured for table '{table}', but it doesn't exist in any database")
+                    continue
+                archived[table] = self.archive_table(table, days, database)
+                if archived[table]:
+                    pruned_databases.add(database)
+            except Exception as e:
+                logger.error(f"Error applying retention to {table}: {e}")
+
+        for database in pruned_databases:
+            self.incremental_vacuum(database)
+
+        return archived
+
+    def _database_of(self, table: str) -> Optional[str]:
+        """
+        Find the database a table lives in. Analytics tables are looked for in the
+        main database too, as DatabaseService is a singleton and the analytics
+        repository may have created them there.
+
+        Args:
+            table: Name of the table
+
+        Returns:
+            MAIN_DATABASE, ANALYTICS_DATABASE, or None if the table doesn't exist
+        """
+        database = RETENTION_TABLES[table][2]
+        if self._table_exists(database, table):
+            return database
+        if database != MAIN_DATABASE and self._table_exists(MAIN_DATABASE, table):
+            return MAIN_DATABASE
+        return None
+
+    def _connect(self, database: str) -> sqlite3.Connection:
+        """
+        Open a connection to one of the databases.
+
+        Args:
+            database: MAIN_DATABASE or ANALYTICS_DATABASE
+
+        Returns:
+            A database connection
+        """
+        if database == ANALYTICS_DATABASE:
+            return sqlite3.connect(self.analytics_db_path)
+        return self.database_service.get_connection()
+
+    def _table_exists(self, database: str, table: str) -> bool:
+        """Check if a table exists in one of the databases"""
+        if database == ANALYTICS_DATABASE and not os.path.exists(self.analytics_db_path):
+            # Don't create an empty analytics database just to look
+            return False
+        conn = self._connect(database)
+        try:
+            return conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)
+            ).fetchone() is not None
+        finally:
+            conn.close()
+
+    def archive_table(self, table: str, days: int, database: Optional[str] = None) -> int:
+        """
+        Archive and delete rows of a table older than the retention period.
+
+        Args:
+            table: Name of the table
+            days: Retention period in days
+            database: Database the table lives in, defaults to the one in RETENTION_TABLES
+
+        Returns:
+            Number of archived rows
+        """
+        timestamp_column, condition, default_database = RETENTION_TABLES[table]
+        database = database or default_database
+        cutoff_time = time.time() - days * 24 * 60 * 60
+        where = f"{timestamp_column} < ?" + (f" AND {condition}" if condition else "")
+
+        total = 0
+        conn = self._connect(database)
+        try:
+            while True:
+                cursor = conn.execute(
+                    f"SELECT rowid, * FROM {table} WHERE {where} ORDER BY rowid LIMIT ?",
+                    (cutoff_time, self.batch_size)
+                )
+                columns = [description[0] for description in cursor.description][1:]
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                # Write the archive before deleting, so a crash can only duplicate rows
+                self._write_archive(table, timestamp_column, columns, [row[1:] for row in rows])
+
+                conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(row[0],) for row in rows])
+                conn.commit()
+                total += len(rows)
+        finally:
+            conn.close()
+
+        if total:
+            logger.info(f"Archived {total} rows from {table} older than {days} days")
+        return total
+
+    def _write_archive(self, table: str, timestamp_column: str, columns: List[str], rows: List[Tuple]):
+        """
+        Append rows to the monthly archive files of a table.
+
+        Args:
+            table: Name of the table
+            timestamp_column: Column used to pick the month partition
+            columns: Column names
+            rows: Rows to archive
+        """
+        timestamp_index = columns.index(timestamp_column)
+        partitions: Dict[str, List[str]] = {}
+        for row in rows:
+            month = datetime.fromtimestamp(row[timestamp_index] or 0).strftime("%Y-%m")
+            partitions.setdefault(month, []).append(json.dumps(dict(zip(columns, row))))
+
+        table_dir = os.path.join(self.archive_dir, table)
+        os.makedirs(table_dir, exist_ok=True)
+        for month, lines in partitions.items():
+            # Each append adds a gzip member; gzip readers concatenate them transparently
+            with gzip.open(os.path.join(table_dir, f"{month}.jsonl.gz"), "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def incremental_vacuum(self, database: str = MAIN_DATABASE):
+        """
+        Reclaim free pages, switching the database to incremental auto-vacuum on first use.
+
+        Args:
+            database: MAIN_DATABASE or ANALYTICS_DATABASE
+        """
+        conn = self._connect(database)
+        try:
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if auto_vacuum != 2:
+                # auto_vacuum only takes effect after a full VACUUM, which is a one-off
+                logger.info("Enabling incremental auto-vacuum (one-off full VACUUM)")
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error vacuuming the {database} database: {e}")
+        finally:
+            conn.close()
@@ -0,0 +1,140 @@
+"""
+Repository for job trace data access.
+"""
+
+import logging
+import time
+from typing import List, Optional
+
+from src.domain.models.job_trace import JobTrace
+from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.database.write_behind_journal import WriteBehindJournal
+
+logger = logging.getLogger(__name__)
+
+class TraceRepository:
+    """
+    Repository for job traces.
+    Stores one row per job with its phase marks as a compact JSON array.
+    """
+
+    def __init__(self, database_service: DatabaseService, journal: Optional[WriteBehindJournal] = None):
+        """
+        Initialize the trace repository.
+
+        Args:
+            database_service: Database service for database access
+            journal: Write-behind journal for trace writes (writes through if not provided)
+        """
+        self.database_service = database_service
+        self.journal = journal or WriteBehindJournal(database_service)
+        self._init_db()
+
+    def _init_db(self):
+        """Initialize the database schema"""
+        try:
+            self.database_service.create_table(
+                "job_traces",
+                {
+                    "request_id": "TEXT PRIMARY KEY",
+                    "workflow_type": "TEXT NOT NULL",
+                    "started_at": "REAL NOT NULL",
+                    "total_time": "REAL",
+                    "phases": "TEXT NOT NULL"  # JSON array of [phase, milliseconds since the first mark]
+                }
+            )
+            self.database_service.create_index(
+                "idx_job_traces_type_started", "job_traces", ["workflow_type", "started_at"]
+            )
+
+            logger.info("Trace database initialized")
+        except Exception as e:
+            logger.error(f"Error initializing trace database: {e}")
+            raise
+
+    async def save_trace(self, request_id: str, trace: JobTrace) -> bool:
+        """
+        Save a job trace.
+
+        Args:
+            request_id: ID of the request
+            trace: Trace to save
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            await self.journal.upsert(
+                "job_traces",
+                "request_id",
+                {
+                    "request_id": request_id,
+                    "workflow_type": trace.workflow_type,
+                    "started_at": trace.started_at,
+                    "total_time": trace.total_time,
+                    "phases": trace.to_compact()
+                },
+                update_columns=["total_time", "phases"]
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving trace for {request_id}: {e}")
+            return False
+
+    async def get_trace(self, request_id: str) -> Optional[JobTrace]:
+        """
+        Get the trace of a job.
+
+        Args:
+            request_id: ID of the request
+
+        Returns:
+            The trace or None if not found
+        """
+        try:
+            await self.journal.flush()
+            row = self.database_service.fetch_one(
+                "SELECT workflow_type, started_at, phases FROM job_traces WHERE request_id = ?",
+                (request_id,)
+            )
+            if not row:
+                return None
+            return JobTrace.from_compact(row[2], workflow_type=row[0], started_at=row[1])
+        except Exception as e:
+            logger.error(f"Error getting trace for {request_id}: {e}")
+            return None
+
+    async def get_traces(self, workflow_type: Optional[str] = None, days: Optional[int] = 7,
+                         limit: int = 10000) -> List[JobTrace]:
+        """
+        Get recent job traces.
+
+        Args:
+            workflow_type: Only return traces of this workflow type
+            days: Only return traces started in the last N days, None for all
+            limit: Maximum number of traces, most recent first
+
+        Returns:
+            List of traces
+        """
+        try:
+            await self.journal.flush()
+
+            conditions = []
+            params = []
+            if workflow_type:
+                conditions.append("workflow_type = ?")
+                params.append(workflow_type)
+            if days is not None:
+                conditions.append("started_at > ?")
+                params.append(time.time() - days * 24 * 60 * 60)
+
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = self.database_service.fetch_all(
+                f"SELECT workflow_type, started_at, phases FROM job_traces {where} ORDER BY started_at DESC LIMIT ?",
+                tuple(params) + (limit,)
+            )
+            return [JobTrace.from_compact(row[2], workflow_type=row[0], started_at=row[1]) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting traces: {e}")
+            return []
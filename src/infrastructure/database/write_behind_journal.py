@@ -0,0 +1,431 @@
+"""
+Write-behind journal for database writes.
+Coalesces row writes per key and commits them in small group transactions.
+"""
+
+import asyncio
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from src.infrastructure.database.database_service import DatabaseService, transaction_seconds
+
+logger = logging.getLogger(__name__)
+
+# Durability modes
+DURABILITY_IMMEDIATE = "immediate"  # Every write is committed before the call returns
+DURABILITY_BATCHED = "batched"  # Writes are committed by the background flusher
+
+# Flushes a write may fail, other than while the database is locked, before it is dropped
+MAX_WRITE_ATTEMPTS = 5
+# Number of dropped writes kept for inspection
+DEAD_LETTER_LIMIT = 100
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a write failed because of the database rather than the row, e.g. a lock"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        reason in message for reason in ("locked", "busy", "unable to open", "disk i/o")
+    )
+
+class _JournalEntry:
+    """Pending write for a single row, identified by table and key"""
+
+    def __init__(self,
+                 table: str,
+                 key_column: str,
+                 key: Any,
+                 values: Dict[str, Any],
+                 insert: bool,
+                 update_columns: Iterable[str] = (),
+                 increment_columns: Iterable[str] = ()):
+        self.table = table
+        self.key_column = key_column
+        self.key = key
+        self.values = dict(values)
+        self.insert = insert
+        self.update_columns = set(update_columns)
+        self.increment_columns = set(increment_columns)
+        # Failed flushes of this write
+        self.attempts = 0
+
+    def merge(self, other: '_JournalEntry'):
+        """
+        Merge a later write for the same row into this entry.
+
+        Args:
+            other: The later write
+        """
+        for column, value in other.values.items():
+            if column in other.increment_columns and column in self.values:
+                self.values[column] = (self.values[column] or 0) + value
+            elif column in other.update_columns or column not in self.values:
+                self.values[column] = value
+
+        self.insert = self.insert or other.insert
+        self.update_columns |= other.update_columns
+        self.increment_columns |= other.increment_columns
+
+    def to_statement(self) -> Tuple[str, Tuple]:
+        """
+        Build the SQL statement for this entry.
+
+        Returns:
+            Tuple of (query, params)
+        """
+        if self.insert:
+            values = dict(self.values)
+            values[self.key_column] = self.key
+            columns = list(values.keys())
+            placeholders = ", ".join(["?" for _ in columns])
+
+            assignments = []
+            for column in columns:
+                if column == self.key_column:
+                    continue
+                if column in self.increment_columns:
+                    assignments.append(f"{column} = {self.table}.{column} + excluded.{column}")
+                elif column in self.update_columns:
+                    assignments.append(f"{column} = excluded.{column}")
+
+            conflict_clause = f"DO UPDATE SET {', '.join(assignments)}" if assignments else "DO NOTHING"
+            query = (
+                f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT({self.key_column}) {conflict_clause}"
+            )
+            return query, tuple(values[column] for column in columns)
+
+        columns = [column for column in self.values if column != self.key_column]
+        assignments = [
+            f"{column} = {column} + ?" if column in self.increment_columns else f"{column} = ?"
+            for column in columns
+        ]
+        query = f"UPDATE {self.table} SET {', '.join(assignments)} WHERE {self.key_column} = ?"
+        return query, tuple(self.values[column] for column in columns) + (self.key,)
+
+class WriteBehindJournal:
+    """
+    Write-behind journal for database writes.
+    Repositories enqueue row writes here instead of committing them one by one.
+    Writes to the same row are coalesced and all pending writes are committed
+    together in a single transaction by a background flusher.
+    """
+
+    def __init__(self,
+                 database_service: DatabaseService,
+                 durability: str = DURABILITY_BATCHED,
+                 flush_interval: float = 1.0,
+                 max_batch: int = 200):
+        """
+        Initialize the journal.
+
+        Args:
+            database_service: Database service for database access
+            durability: DURABILITY_BATCHED to group commit in the background,
+                DURABILITY_IMMEDIATE to commit every write before returning
+            flush_interval: Maximum time in seconds a write stays pending
+            max_batch: Number of pending rows that triggers an early flush
+        """
+        if durability not in (DURABILITY_BATCHED, DURABILITY_IMMEDIATE):
+            logger.warning(f"Unknown durability mode '{durability}', using '{DURABILITY_BATCHED}'")
+            durability = DURABILITY_BATCHED
+
+        self.database_service = database_service
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._entries: "OrderedDict[Tuple[str, Any], _JournalEntry]" = OrderedDict()
+        self._appends: List[Tuple[str, Tuple]] = []
+        # Failed flushes of pending appends
+        self._append_attempts: Dict[Tuple[str, Tuple], int] = {}
+        # Writes dropped after failing MAX_WRITE_ATTEMPTS flushes, as (statement, params, error)
+        self.dead_letters: deque = deque(maxlen=DEAD_LETTER_LIMIT)
+        self._write_lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Last line of defence if the application exits without calling close()
+        atexit.register(self.flush_sync)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of rows waiting to be committed"""
+        return len(self._entries) + len(self._appends)
+
+    async def start(self):
+        """Start the background flusher"""
+        if self._flush_task is not None or self.durability == DURABILITY_IMMEDIATE:
+            return
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Write-behind journal started (flush interval: {self.flush_interval}s)")
+
+    async def close(self):
+        """Stop the background flusher and commit everything still pending"""
+        self._closed = True
+
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        await self.flush()
+        logger.info("Write-behind journal closed")
+
+    async def upsert(self,
+                     table: str,
+                     key_column: str,
+                     values: Dict[str, Any],
+                     update_columns: Iterable[str] = (),
+                     increment_columns: Iterable[str] = ()):
+        """
+        Insert a row, or update it if a row with the same key already exists.
+
+        Args:
+            table: Name of the table
+            key_column: Primary key or unique column used as the conflict target
+            values: Column values for the inserted row, including the key
+            update_columns: Columns overwritten when the row already exists
+            increment_columns: Columns added to the existing value when the row already exists
+        """
+        entry = _JournalEntry(
+            table, key_column, values[key_column],
+            {column: value for column, value in values.items() if column != key_column},
+            insert=True,
+            update_columns=update_columns,
+            increment_columns=increment_columns
+        )
+        await self._enqueue(entry)
+
+    async def update(self, table: str, key_column: str, key: Any, values: Dict[str, Any]):
+        """
+        Update columns of an existing row.
+
+        Args:
+            table: Name of the table
+            key_column: Primary key column
+            key: Primary key value of the row
+            values: Column values to set
+        """
+        entry = _JournalEntry(table, key_column, key, values, insert=False, update_columns=values.keys())
+        await self._enqueue(entry)
+
+    async def insert_ignore(self, table: str, rows: List[Dict[str, Any]]):
+        """
+        Append rows that are inserted unless they violate a unique constraint.
+
+        Args:
+            table: Name of the table
+            rows: Rows to insert, all with the same columns
+        """
+        if not rows:
+            return
+
+        columns = list(rows[0].keys())
+        placeholders = ", ".join(["?" for _ in columns])
+        query = f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        self._appends.extend((query, tuple(row[column] for column in columns)) for row in rows)
+        await self._after_enqueue()
+
+    async def _enqueue(self, entry: _JournalEntry):
+        """Add an entry, coalescing it with a pending write for the same row"""
+        key = (entry.table, entry.key)
+        if key in self._entries:
+            self._entries[key].merge(entry)
+        else:
+            self._entries[key] = entry
+        await self._after_enqueue()
+
+    async def _after_enqueue(self):
+        """Commit now or wake the flusher, depending on durability and batch size"""
+        if self._flush_task is None:
+            # Immediate durability, or the flusher is not running (e.g. in tools and scripts)
+            await self.flush()
+        elif self.pending_count >= self.max_batch:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        """Background task that periodically commits pending writes"""
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in write-behind flush loop: {e}")
+
+    async def flush(self):
+        """
+        Commit all pending writes in a single transaction. Also waits for a flush
+        already in progress, whose writes are no longer pending but may not be
+        committed yet, so a read after flush() sees every earlier write.
+        """
+        if self._flush_lock is None:
+            if self.pending_count:
+                self._write_pending()
+            return
+
+        async with self._flush_lock:
+            entries, appends = self._take_pending()
+            if not entries and not appends:
+                return
+
+            loop = asyncio.get_running_loop()
+            try:
+                failures = await loop.run_in_executor(None, self._write_or_isolate, entries, appends)
+            except Exception as e:
+                logger.error(f"Error flushing write-behind journal, will retry: {e}")
+                self._restore_pending(entries, appends)
+                return
+            self._retry_or_drop(failures)
+
+    def flush_sync(self):
+        """Commit all pending writes from the calling thread"""
+        if self.pending_count:
+            self._write_pending()
+
+    def _write_pending(self):
+        """Take and write pending entries on the calling thread"""
+        entries, appends = self._take_pending()
+        try:
+            failures = self._write_or_isolate(entries, appends)
+        except Exception as e:
+            logger.error(f"Error flushing write-behind journal: {e}")
+            self._restore_pending(entries, appends)
+            if self._flush_task is None:
+                raise
+            return
+        self._retry_or_drop(failures)
+
+    def _write_or_isolate(self, entries: List[_JournalEntry],
+                          appends: List[Tuple[str, Tuple]]) -> List[Tuple[Any, Exception]]:
+        """
+        Write a batch in one transaction, or, if a row makes it fail, write each
+        row in its own transaction so the other rows are still committed.
+
+        Args:
+            entries: Coalesced row writes
+            appends: Appended insert statements
+
+        Returns:
+            The writes that failed, entries or appends, with their errors
+
+        Raises:
+            Exception: If the batch failed because of the database, e.g. a lock
+        """
+        try:
+            self._write_batch(entries, appends)
+            return []
+        except Exception as e:
+            if _is_transient(e):
+                raise
+            logger.warning(f"Write-behind batch failed, writing its rows one at a time: {e}")
+
+        failures = []
+        with self._write_lock:
+            conn = self.database_service.get_connection()
+            try:
+                for write in [*entries, *appends]:
+                    query, params = write.to_statement() if isinstance(write, _JournalEntry) else write
+                    try:
+                        conn.execute(query, params)
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        failures.append((write, e))
+            finally:
+                conn.close()
+        return failures
+
+    def _retry_or_drop(self, failures: List[Tuple[Any, Exception]]):
+        """Put failed writes back for the next flush, dropping those that failed too often"""
+        entries, appends = [], []
+        append_attempts = {}
+        for write, error in failures:
+            is_entry = isinstance(write, _JournalEntry)
+            attempts = write.attempts if is_entry else self._append_attempts.get(write, 0)
+            if not _is_transient(error):
+                attempts += 1
+
+            if attempts < MAX_WRITE_ATTEMPTS:
+                if is_entry:
+                    write.attempts = attempts
+                    entries.append(write)
+                else:
+                    append_attempts[write] = attempts
+                    appends.append(write)
+                continue
+
+            query, params = write.to_statement() if is_entry else write
+            self.dead_letters.append((query, params, str(error)))
+            logger.error(f"Dropped write-behind write after {attempts} failed flushes: {query} {params}: {error}")
+
+        # Appends that were written or dropped are no longer tracked
+        self._append_attempts = append_attempts
+        if entries or appends:
+            self._restore_pending(entries, appends)
+
+    def _take_pending(self) -> Tuple[List[_JournalEntry], List[Tuple[str, Tuple]]]:
+        """Detach the pending writes so new writes can accumulate during a flush"""
+        entries = list(self._entries.values())
+        appends = self._appends
+        self._entries = OrderedDict()
+        self._appends = []
+        return entries, appends
+
+    def _restore_pending(self, entries: List[_JournalEntry], appends: List[Tuple[str, Tuple]]):
+        """Put writes from a failed flush back in front of newer writes"""
+        restored = OrderedDict()
+        for entry in entries:
+            restored[(entry.table, entry.key)] = entry
+        for key, entry in self._entries.items():
+            if key in restored:
+                restored[key].merge(entry)
+            else:
+                restored[key] = entry
+        self._entries = restored
+        self._appends = appends + self._appends
+
+    def _write_batch(self, entries: List[_JournalEntry], appends: List[Tuple[str, Tuple]]):
+        """
+        Write a batch of entries in one transaction.
+
+        Args:
+            entries: Coalesced row writes
+            appends: Appended insert statements
+        """
+        with self._write_lock:
+            conn = self.database_service.get_connection()
+            start = time.perf_counter()
+            try:
+                cursor = conn.cursor()
+                for entry in entries:
+                    query, params = entry.to_statement()
+                    cursor.execute(query, params)
+                for query, params in appends:
+                    cursor.execute(query, params)
+                conn.commit()
+                transaction_seconds.observe(time.perf_counter() - start, ("journal",))
+                logger.debug(f"Committed {len(entries)} rows and {len(appends)} appended rows")
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
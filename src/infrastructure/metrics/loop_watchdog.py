@@ -0,0 +1,185 @@
+"""
+Watchdog that detects callbacks blocking the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Any, List, Optional
+
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Root of the project, used to find the application frame responsible for a stall
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def find_call_site(stack: traceback.StackSummary) -> str:
+    """
+    Get the innermost application frame of a stack as file:line (function).
+
+    Args:
+        stack: Extracted stack, outermost frame first
+
+    Returns:
+        Call site, or the innermost frame if no frame belongs to the application
+    """
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(PROJECT_ROOT) and "site-packages" not in path:
+            return f"{os.path.relpath(path, PROJECT_ROOT)}:{frame.lineno} ({frame.name})"
+    if stack:
+        frame = stack[-1]
+        return f"{frame.filename}:{frame.lineno} ({frame.name})"
+    return "unknown"
+
+class StallStats:
+    """Stalls attributed to one call site"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'total_time': self.total_time, 'max_time': self.max_time}
+
+class LoopWatchdog:
+    """
+    Measures event loop lag with a heartbeat task and watches it from a
+    separate thread. When the loop misses its heartbeat for longer than the
+    threshold, the thread captures the loop thread's stack while it is still
+    blocked, so the stall can be attributed to the callback holding the loop.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern to ensure only one watchdog exists"""
+        if cls._instance is None:
+            cls._instance = super(LoopWatchdog, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05):
+        """
+        Initialize the watchdog.
+
+        Args:
+            threshold: Lag in seconds after which the loop is considered stalled
+            interval: Heartbeat interval in seconds
+        """
+        # Only initialize once (singleton pattern)
+        if self._initialized:
+            return
+
+        self.threshold = threshold
+        self.interval = interval
+        self.loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._captured_beat: Optional[float] = None
+        self._captured_site: Optional[str] = None
+        self._stalls: Dict[str, StallStats] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        registry = MetricsRegistry()
+        self._lag_seconds = registry.histogram(
+            "event_loop_lag_seconds", "Delay of the event loop heartbeat beyond its interval",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+        )
+        self._stalls_total = registry.counter(
+            "event_loop_stalls_total", "Event loop stalls beyond the threshold by call site", ("site",)
+        )
+        self._initialized = True
+
+    async def start(self):
+        """Start the heartbeat task and the monitor thread on the running loop"""
+        if self._task is not None:
+            return
+
+        self.loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog-heartbeat")
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        """Stop the heartbeat task and the monitor thread"""
+        if self._task is None:
+            return
+
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._thread = None
+
+    def get_stalls(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the stalls recorded per call site.
+
+        Args:
+            limit: Maximum number of call sites, those with the most stall time first
+
+        Returns:
+            List of dictionaries with site, count, total_time and max_time
+        """
+        stalls = sorted(self._stalls.items(), key=lambda item: item[1].total_time, reverse=True)
+        return [dict(site=site, **stats.to_dict()) for site, stats in stalls[:limit]]
+
+    async def _heartbeat(self):
+        """Sleep for the interval and measure how late the loop wakes up"""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self._last_beat = now
+            self._lag_seconds.observe(lag)
+
+            if lag >= self.threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        """Attribute a finished stall to the call site captured while it was happening"""
+        site = self._captured_site or "unknown"
+        self._captured_site = None
+
+        stats = self._stalls.get(site)
+        if stats is None:
+            stats = self._stalls[site] = StallStats()
+        stats.count += 1
+        stats.total_time += lag
+        stats.max_time = max(stats.max_time, lag)
+        self._stalls_total.inc((site,))
+        logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms at {site}")
+
+    def _monitor(self):
+        """Thread that captures the loop thread's stack when the heartbeat is late"""
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            if time.monotonic() - beat < self.threshold + self.interval or self._captured_beat == beat:
+                continue
+
+            # Capture once per stall, while the blocking callback is still running
+            self._captured_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            self._captured_site = find_call_site(stack)
+            logger.warning(
+                f"Event loop blocked for over {self.threshold * 1000:.0f} ms, "
+                f"loop thread stack:\n{''.join(stack.format())}"
+            )
@@ -0,0 +1,267 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+"""
+
+import bisect
+import logging
+import os
+from typing import Dict, List, Optional, Tuple, Callable, Union, Iterable
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+# A metric function returns either a single value or a mapping of label values to values
+MetricFunction = Callable[[], Union[float, Dict[LabelValues, float]]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value) -> str:
+    """Escape a label value"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: LabelValues, extra: str = "") -> str:
+    """Format a label set as {name="value",...}"""
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    """Format a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class _Metric:
+    """Base class for metrics"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 function: Optional[MetricFunction] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values: Dict[LabelValues, float] = {}
+
+    def _samples(self) -> Dict[LabelValues, float]:
+        """Current values by label values"""
+        if self.function is None:
+            return self._values
+        try:
+            result = self.function()
+        except Exception as e:
+            logger.error(f"Error collecting metric {self.name}: {e}")
+            return {}
+        return result if isinstance(result, dict) else {(): result}
+
+    def render(self) -> List[str]:
+        """Render the metric in the text exposition format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labelvalues, value in self._samples().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    type_name = "counter"
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0):
+        """
+        Increment the counter.
+
+        Args:
+            labels: Label values, in the order of the label names
+            amount: Amount to add
+        """
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, labels: LabelValues = ()):
+        """
+        Set the gauge.
+
+        Args:
+            value: New value
+            labels: Label values, in the order of the label names
+        """
+        self._values[labels] = value
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0):
+        """
+        Increment the gauge.
+
+        Args:
+            labels: Label values, in the order of the label names
+            amount: Amount to add (negative to decrement)
+        """
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (+Inf last), sum]
+        self._observations: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()):
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value
+            labels: Label values, in the order of the label names
+        """
+        state = self._observations.get(labels)
+        if state is None:
+            state = self._observations[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labelvalues, (counts, total) in list(self._observations.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Registry of the application's metrics.
+    Updates are plain dictionary operations with no locking or I/O, so they
+    are cheap enough for hot paths; values are only formatted when scraped.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern to ensure only one metrics registry exists"""
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, prefix: str = "fluxai_"):
+        """
+        Initialize the metrics registry.
+
+        Args:
+            prefix: Prefix added to every metric name
+        """
+        # Only initialize once (singleton pattern)
+        if self._initialized:
+            return
+
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._initialized = True
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        """Get a registered metric, creating it on first use"""
+        full_name = self.prefix + name
+        metric = self._metrics.get(full_name)
+        if metric is None:
+            metric = self._metrics[full_name] = cls(full_name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                function: Optional[MetricFunction] = None) -> Counter:
+        """
+        Get or create a counter.
+
+        Args:
+            name: Metric name without the prefix
+            documentation: Help text
+            labelnames: Names of the labels
+            function: Called at scrape time for the value(s) instead of using inc()
+
+        Returns:
+            The counter
+        """
+        return self._get_or_create(Counter, name, documentation, labelnames, function)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              function: Optional[MetricFunction] = None) -> Gauge:
+        """
+        Get or create a gauge.
+
+        Args:
+            name: Metric name without the prefix
+            documentation: Help text
+            labelnames: Names of the labels
+            function: Called at scrape time for the value(s) instead of using set()
+
+        Returns:
+            The gauge
+        """
+        return self._get_or_create(Gauge, name, documentation, labelnames, function)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Get or create a histogram.
+
+        Args:
+            name: Metric name without the prefix
+            documentation: Help text
+            labelnames: Names of the labels
+            buckets: Upper bounds of the buckets
+
+        Returns:
+            The histogram
+        """
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            The exposition text
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+def get_process_rss() -> Optional[float]:
+    """
+    Get the resident set size of this process without external dependencies.
+
+    Returns:
+        RSS in bytes, or None if it can't be determined on this platform
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+        import sys
+        # ru_maxrss is the peak RSS, in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
@@ -0,0 +1,131 @@
+"""
+Sampling profiler for the running process.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from src.infrastructure.metrics.loop_watchdog import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """
+    Periodically samples thread stacks from a background thread, without
+    tracing hooks, so it can profile the live bot at a low overhead.
+    The result is in the collapsed stack format read by flamegraph.pl,
+    speedscope and similar tools.
+    """
+
+    def __init__(self, max_duration: float = 60.0):
+        """
+        Initialize the sampling profiler.
+
+        Args:
+            max_duration: Maximum profile duration in seconds
+        """
+        self.max_duration = max_duration
+        self._running = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether a profile is being captured"""
+        return self._running.locked()
+
+    async def profile(self, duration: float, interval: float = 0.005, all_threads: bool = False) -> str:
+        """
+        Capture a profile without blocking the event loop.
+
+        Args:
+            duration: Time to sample for in seconds, capped at max_duration
+            interval: Time between samples in seconds
+            all_threads: Sample every thread instead of only the event loop thread
+
+        Returns:
+            Collapsed stacks, one "frame;frame;... count" line per distinct stack
+
+        Raises:
+            RuntimeError: If a profile is already being captured
+        """
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A profile is already being captured")
+
+        thread_id = None if all_threads else threading.get_ident()
+        duration = min(max(duration, interval), self.max_duration)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def run():
+            try:
+                future.set_result(self._sample(duration, interval, thread_id))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._running.release()
+
+        # A dedicated thread, so a busy default executor can't delay or skew the samples
+        threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+        samples = await asyncio.wrap_future(future)
+        logger.info(f"Captured {sum(samples.values())} samples over {duration:.1f} s")
+        return self.collapse(samples)
+
+    def _sample(self, duration: float, interval: float, thread_id: Optional[int]) -> Counter:
+        """Sample stacks until the duration has passed"""
+        own_id = threading.get_ident()
+        names: Dict[int, str] = {}
+        samples: Counter = Counter()
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_id or (thread_id is not None and ident != thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                    frame = frame.f_back
+                if thread_id is None:
+                    if ident not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    stack.append((None, names.get(ident, str(ident)), 0))
+                samples[tuple(reversed(stack))] += 1
+            time.sleep(interval)
+
+        return samples
+
+    @staticmethod
+    def collapse(samples: Counter) -> str:
+        """
+        Format samples as collapsed stacks.
+
+        Args:
+            samples: Count of each stack, as (filename, function, first line) frames outermost first
+
+        Returns:
+            Collapsed stacks, most frequent first
+        """
+        labels: Dict[tuple, str] = {}
+
+        def label(frame: tuple) -> str:
+            if frame not in labels:
+                filename, name, line = frame
+                if filename is None:
+                    labels[frame] = name.replace(";", ":").replace(" ", "_")
+                else:
+                    path = os.path.abspath(filename)
+                    if path.startswith(PROJECT_ROOT):
+                        path = os.path.relpath(path, PROJECT_ROOT)
+                    labels[frame] = f"{name} ({path}:{line})".replace(";", ":")
+            return labels[frame]
+
+        return "\n".join(
+            f"{';'.join(label(frame) for frame in stack)} {count}"
+            for stack, count in samples.most_common()
+        ) + "\n"
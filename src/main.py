@@ -5,25 +5,33 @@ Main application entry point.
 import asyncio
 import logging
 import os
-import sys
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('logs/bot.log', encoding='utf-8')
-    ]
-)
 
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
+from dotenv import load_dotenv
+
+from src.infrastructure.config.logging_config import setup_logging, parse_categories
+
+load_dotenv()
+
+# Configure logging: records are written by a listener thread, and noisy
+# categories are rate limited (LOG_RATE_LIMITS="category:per second") or
+# sampled (LOG_SAMPLE_RATES="category:N" keeps one in N)
+setup_logging(
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO),
+    log_file=os.getenv('LOG_FILE', 'logs/bot.log') or None,
+    json_output=os.getenv('LOG_FORMAT', 'text').lower() == 'json',
+    rate_limits={
+        category: (rate, max(rate * 5, 1))
+        for category, rate in {
+            'websocket': 2.0, 'progress': 2.0, 'analytics': 5.0,
+            **parse_categories(os.getenv('LOG_RATE_LIMITS', ''), float)
+        }.items()
+    },
+    sample_rates=parse_categories(os.getenv('LOG_SAMPLE_RATES', ''), int)
+)
 
-# Set log level for all loggers
-logging.getLogger().setLevel(logging.INFO)
+# Let all loggers follow the root level
 for name in logging.root.manager.loggerDict:
-    logging.getLogger(name).setLevel(logging.INFO)
+    logging.getLogger(name).setLevel(logging.NOTSET)
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +40,20 @@ from src.infrastructure.config.config_manager import ConfigManager
 from src.infrastructure.di.container import DIContainer
 from src.infrastructure.database.database_service import DatabaseService
 from src.infrastructure.database.image_repository import ImageRepository
+from src.infrastructure.database.write_behind_journal import WriteBehindJournal
+from src.infrastructure.database.retention_service import RetentionService
+from src.domain.events.event_bus import EventBus
+from src.infrastructure.metrics.loop_watchdog import LoopWatchdog
 from src.infrastructure.comfyui.comfyui_service import ComfyUIService
 from src.application.queue.queue_service import QueueService
 from src.application.analytics.analytics_service import AnalyticsService
+from src.application.analytics.trace_service import TraceService
 from src.application.content_filter.content_filter_service import ContentFilterService
 from src.application.image_generation.image_generation_service import ImageGenerationService
+from src.application.image_generation.workflow_preflight import WorkflowPreflight
 from src.presentation.discord.bot import DiscordBot
+from src.application.ai.ai_service import AIService
+from src.infrastructure.ai_providers.provider_factory import AIProviderFactory
 
 async def start_queue_processor(queue_service, image_generation_service):
     """Start the queue processor"""
@@ -61,15 +77,30 @@ async def setup_database():
     # Create database service
     db_service = DatabaseService()
 
+    # Create the write-behind journal shared by the queue and image repositories
+    config = ConfigManager()
+    journal = WriteBehindJournal(
+        db_service,
+        durability=config.db_write_durability,
+        flush_interval=config.db_flush_interval
+    )
+    await journal.start()
+
     # Create repositories
     from src.infrastructure.database.queue_repository import SQLiteQueueRepository
     from src.infrastructure.database.analytics_repository import SQLiteAnalyticsRepository
     from src.infrastructure.database.image_repository import ImageRepository
+    from src.infrastructure.database.trace_repository import TraceRepository
 
     # Initialize repositories
-    queue_repository = SQLiteQueueRepository(db_service)
+    queue_repository = SQLiteQueueRepository(db_service, journal=journal)
     analytics_repository = SQLiteAnalyticsRepository(db_service)
-    image_repository = ImageRepository(db_service)
+    image_repository = ImageRepository(db_service, journal=journal)
+
+    # Create the job trace service before the services that record phases
+    TraceService(TraceRepository(db_service, journal=journal))
+
+    DIContainer().register(WriteBehindJournal, journal)
 
     return db_service, queue_repository, analytics_repository, image_repository
 
@@ -90,7 +121,13 @@ async def setup_services(db_service, queue_repository, analytics_repository, ima
     content_filter_service = ContentFilterService(db_service)
 
     # Create queue service
-    queue_service = QueueService(queue_repository)
+    queue_service = QueueService(
+        queue_repository,
+        rate_limit=config.rate_limit,
+        rate_window=config.rate_window,
+        role_limits=config.rate_limit_roles,
+        job_costs=config.rate_limit_job_costs
+    )
 
     # Create image generation service without bot reference
     image_generation_service = ImageGenerationService(
@@ -101,6 +138,16 @@ async def setup_services(db_service, queue_repository, analytics_repository, ima
         bot=None  # We'll set this later
     )
 
+    # Check requests against ComfyUI's installed nodes and models before queueing them
+    workflow_preflight = None
+    if config.comfyui_preflight:
+        workflow_preflight = WorkflowPreflight(
+            comfyui_service,
+            image_generation_service.render_workflow,
+            refresh_interval=config.comfyui_object_info_refresh
+        )
+        queue_service.preflight = workflow_preflight.check
+
     # Register services with DI container
     container = DIContainer()
     container.register(DatabaseService, db_service)
@@ -110,14 +157,51 @@ async def setup_services(db_service, queue_repository, analytics_repository, ima
     container.register(ImageGenerationService, image_generation_service)
     container.register(QueueService, queue_service)
     container.register(ImageRepository, image_repository)
+    container.register(TraceService, TraceService())
+
+    # Archive and prune old rows in the background
+    def on_tables_pruned(tables):
+        if 'user_warnings' in tables:
+            content_filter_service.moderation_state.load(db_service)
+
+    retention_service = RetentionService(
+        db_service,
+        config.retention_days,
+        archive_dir=config.retention_archive_dir,
+        on_tables_pruned=on_tables_pruned
+    )
+    container.register(RetentionService, retention_service)
+    if workflow_preflight:
+        container.register(WorkflowPreflight, workflow_preflight)
 
     # Note: We don't register the bot in the container to avoid circular dependencies
 
     # Initialize services
+    await LoopWatchdog(threshold=config.loop_stall_threshold).start()
+    await EventBus().start()
     await queue_service.initialize()
+    await retention_service.start(config.retention_interval_hours)
+    if workflow_preflight:
+        await workflow_preflight.start()
 
     return container
 
+async def warm_up(bot: DiscordBot, content_filter_service: ContentFilterService):
+    """
+    Load heavy dependencies in the background once the bot has connected
+    and registered its commands, so they don't hold up startup.
+
+    Args:
+        bot: The Discord bot
+        content_filter_service: Content filter whose models to load
+    """
+    await bot.wait_until_ready()
+    logger.info("Warming up content filter models and AI provider")
+    await asyncio.gather(
+        content_filter_service.warm_up(),
+        asyncio.get_running_loop().run_in_executor(None, AIService.preload)
+    )
+
 async def main():
     """Main application entry point"""
     logger.info("=== Starting Application ===")
@@ -170,10 +254,31 @@ async def main():
 
         async with bot:
             logger.info("Starting bot...")
+            warm_up_task = asyncio.create_task(warm_up(bot, content_filter_service))
             await bot.start(config.discord_token)
 
     except Exception as e:
         logger.error(f"Error in main: {e}", exc_info=True)
+    finally:
+        # Deliver queued events before exiting
+        await EventBus().stop()
+        await LoopWatchdog().stop()
+
+        retention_service = DIContainer().resolve(RetentionService)
+        if retention_service:
+            await retention_service.stop()
+
+        workflow_preflight = DIContainer().resolve(WorkflowPreflight)
+        if workflow_preflight:
+            await workflow_preflight.stop()
+
+        # Commit any journaled database writes before exiting
+        journal = DIContainer().resolve(WriteBehindJournal)
+        if journal:
+            await journal.close()
+
+        # Close the pooled connections to the AI providers
+        await AIProviderFactory.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -22,9 +22,26 @@ from src.application.queue.queue_service import QueueService
 from src.application.analytics.analytics_service import AnalyticsService
 from src.application.content_filter.content_filter_service import ContentFilterService
 from src.application.image_generation.image_generation_service import ImageGenerationService
+from src.domain.lora_management import LoraManager
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry
 
 logger = logging.getLogger(__name__)
 
+class _RateLimitCounter(logging.Filter):
+    """Counts the rate limit warnings discord.py logs when Discord responds with 429"""
+
+    def __init__(self, counter):
+        super().__init__()
+        self.counter = counter
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = str(record.msg)
+        if "429" in message:
+            self.counter.inc(("route",))
+        elif "rate limit" in message.lower() and "global" in message.lower():
+            self.counter.inc(("global",))
+        return True
+
 class DiscordBot(discord_commands.Bot):
     """
     Discord bot for image generation.
@@ -82,7 +99,6 @@ class DiscordBot(discord_commands.Bot):
         # Initialize state
         self.allowed_channels = set(self.config.channel_ids)
         self.resolution_options = []
-        self.lora_options = []
 
         # Load options
         self._load_options()
@@ -95,13 +111,16 @@ class DiscordBot(discord_commands.Bot):
             self.resolution_options = list(ratios_data.get('ratios', {}).keys())
             logger.info(f"Loaded {len(self.resolution_options)} resolution options")
 
-            # Load LoRA options
-            lora_data = self.config.load_json('lora.json')
-            self.lora_options = lora_data.get('available_loras', [])
+            # LoRA options come from the shared catalog, which reloads itself when lora.json changes
             logger.info(f"Loaded {len(self.lora_options)} LoRA options")
         except Exception as e:
             logger.error(f"Error loading options: {e}")
 
+    @property
+    def lora_options(self) -> List[Dict[str, Any]]:
+        """Available LoRAs from the current catalog snapshot"""
+        return LoraManager().get_all_loras()
+
     async def reload_options(self):
         """Reload resolution and LoRA options"""
         try:
@@ -115,6 +134,8 @@ class DiscordBot(discord_commands.Bot):
         """Set up the bot"""
         logger.info("Setting up bot...")
 
+        self._instrument_http()
+
         # Register commands
         await self._register_commands()
 
@@ -127,6 +148,22 @@ class DiscordBot(discord_commands.Bot):
 
         logger.info("Bot setup complete")
 
+    def _instrument_http(self):
+        """Count Discord REST calls by method and route, and rate limited responses"""
+        registry = MetricsRegistry()
+        calls = registry.counter("discord_rest_calls_total", "Discord REST API calls", ("method", "route"))
+        rate_limits = registry.counter("discord_rate_limits_total", "Discord REST responses with status 429", ("scope",))
+        logging.getLogger("discord.http").addFilter(_RateLimitCounter(rate_limits))
+
+        request = self.http.request
+
+        async def counted_request(route, **kwargs):
+            # Route.path is the template (e.g. /channels/{channel_id}/messages), so cardinality stays low
+            calls.inc((route.method, route.path))
+            return await request(route, **kwargs)
+
+        self.http.request = counted_request
+
     async def _register_persistent_views(self):
         """Register persistent views that work after bot restarts"""
         try:
@@ -409,6 +446,11 @@ class DiscordBot(discord_commands.Bot):
             else:
                 await interaction.response.send_message("Command handler not found", ephemeral=True)
 
+        @lorainfo_command.autocomplete('lora_name')
+        async def lorainfo_lora_name_autocomplete(interaction, current: str):
+            cog = self.get_cog(lora_commands.LoraCommands.__name__)
+            return await cog.lora_name_autocomplete(interaction, current) if cog else []
+
         @self.tree.command(name="sync", description="Sync commands with Discord")
         async def sync_command(interaction):
             cog = self.get_cog(image_commands.ImageCommands.__name__)
@@ -439,6 +481,17 @@ class DiscordBot(discord_commands.Bot):
         except Exception as e:
             logger.error(f"Failed to sync commands: {e}")
 
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Record the user's roles for per-role rate limits"""
+        if not self.queue_service or not isinstance(interaction.user, discord.Member):
+            return
+
+        roles = [str(role.id) for role in interaction.user.roles]
+        if interaction.user.guild_permissions.administrator or self.config.bot_manager_role_id in [role.id for role in interaction.user.roles]:
+            roles.append("manager")
+
+        self.queue_service.rate_limiter.set_user_roles(str(interaction.user.id), roles)
+
     async def on_tree_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         """Handle command errors"""
         if isinstance(error, app_commands.CommandOnCooldown):
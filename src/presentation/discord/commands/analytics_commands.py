@@ -3,6 +3,7 @@ Discord commands for analytics.
 """
 
 import discord
+import io
 import logging
 import time
 from discord import app_commands
@@ -11,6 +12,8 @@ from discord.ext import commands
 from src.domain.events.event_bus import EventBus
 from src.domain.events.common_events import CommandExecutedEvent
 from src.infrastructure.database.image_repository import ImageRepository
+from src.infrastructure.metrics.loop_watchdog import LoopWatchdog
+from src.infrastructure.metrics.sampling_profiler import SamplingProfiler
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,7 @@ class AnalyticsCommands(commands.Cog):
         """
         self.bot = bot
         self.event_bus = EventBus()
+        self.profiler = SamplingProfiler(max_duration=bot.config.profile_max_seconds)
 
     async def cog_load(self):
         """Called when the cog is loaded"""
@@ -472,4 +476,75 @@ class AnalyticsCommands(commands.Cog):
                 channel_id=str(interaction.channel_id),
                 execution_time=time.time() - start_time,
                 success=False
-            ))
\ No newline at end of file
+            ))
+
+    @app_commands.command(name="profile", description="Capture a sampling profile of the running bot")
+    @app_commands.describe(
+        seconds="How long to sample for (default: 10)",
+        all_threads="Sample every thread instead of only the event loop"
+    )
+    async def profile_command(self, interaction: discord.Interaction, seconds: int = 10, all_threads: bool = False):
+        """
+        Capture a sampling profile and event loop stall report.
+
+        Args:
+            interaction: Discord interaction
+            seconds: How long to sample for
+            all_threads: Sample every thread instead of only the event loop
+        """
+        start_time = time.time()
+
+        try:
+            if not self._check_admin(interaction):
+                await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
+                return
+
+            if self.profiler.running:
+                await interaction.response.send_message("A profile is already being captured.", ephemeral=True)
+                return
+
+            await interaction.response.defer(ephemeral=True)
+
+            profile = await self.profiler.profile(seconds, all_threads=all_threads)
+
+            stalls = LoopWatchdog().get_stalls(limit=5)
+            if stalls:
+                summary = "\n".join(
+                    f"`{stall['site']}`: {stall['count']} stalls, max {stall['max_time'] * 1000:.0f} ms"
+                    for stall in stalls
+                )
+            else:
+                summary = "No event loop stalls recorded."
+
+            await interaction.followup.send(
+                f"Collapsed stacks for flamegraph.pl or speedscope.\n**Top event loop stalls:**\n{summary}",
+                file=discord.File(io.BytesIO(profile.encode('utf-8')), filename=f"profile-{int(start_time)}.folded"),
+                ephemeral=True
+            )
+
+            # Record command execution
+            self.event_bus.publish(CommandExecutedEvent(
+                command_name="profile",
+                user_id=str(interaction.user.id),
+                guild_id=str(interaction.guild_id) if interaction.guild_id else None,
+                channel_id=str(interaction.channel_id),
+                execution_time=time.time() - start_time,
+                success=True
+            ))
+
+        except Exception as e:
+            logger.error(f"Error in profile command: {e}", exc_info=True)
+            if interaction.response.is_done():
+                await interaction.followup.send("An error occurred while capturing the profile.", ephemeral=True)
+            else:
+                await interaction.response.send_message("An error occurred while capturing the profile.", ephemeral=True)
+
+            # Record command execution
+            self.event_bus.publish(CommandExecutedEvent(
+                command_name="profile",
+                user_id=str(interaction.user.id),
+                guild_id=str(interaction.guild_id) if interaction.guild_id else None,
+                channel_id=str(interaction.channel_id),
+                execution_time=time.time() - start_time,
+                success=False
+            ))
@@ -16,14 +16,19 @@ from discord import app_commands
 from discord.ext import commands
 
 from src.domain.models.queue_item import RequestItem, QueuePriority
+from src.domain.models.job_trace import (
+    JobTrace, PHASE_ENHANCEMENT_START, PHASE_ENHANCEMENT_END
+)
 from src.domain.events.event_bus import EventBus
 from src.domain.events.common_events import CommandExecutedEvent
 from src.application.queue.queue_service import QueueService
 from src.application.content_filter.content_filter_service import ContentFilterService
 from src.application.ai.ai_service import AIService
+from src.application.queue.submit_pipeline import SubmitPipeline
 from src.infrastructure.config.config_loader import get_config
 from src.presentation.discord.views.image_view import ImageControlView
 from src.presentation.discord.views.prompt_modal import PromptModal
+from src.presentation.discord.views.enhancement_progress_view import enhance_with_progress
 from src.presentation.discord.views.redux_modal import ReduxModal
 from src.presentation.discord.views.pulid_modal import PulidModal
 
@@ -55,37 +60,92 @@ class ImageCommands(commands.Cog):
 
     async def _process_with_enhancement(self, interaction: discord.Interaction, original_prompt: str,
                                        enhancement_level: int, resolution: str = None,
-                                       upscale_factor: int = 1, seed: Optional[int] = None):
-        """Process a prompt with AI enhancement"""
+                                       upscale_factor: int = 1, seed: Optional[int] = None,
+                                       trace: Optional[JobTrace] = None,
+                                       moderation: Optional[asyncio.Task] = None):
+        """Process a prompt with AI enhancement, moderating the prompt while it is enhanced"""
         start_time = time.time()
+        trace = trace or JobTrace()
+        submission = None
 
         try:
             # Defer response to give us time to process
             await interaction.response.defer(ephemeral=False)
 
+            # Use default resolution if not provided
+            if not resolution and self.bot.resolution_options:
+                resolution = self.bot.resolution_options[0]
+
+            # Create request item
+            request_item = RequestItem(
+                id=str(uuid.uuid4()),
+                user_id=str(interaction.user.id),
+                channel_id=str(interaction.channel_id),
+                interaction_id=str(interaction.id),
+                original_message_id="",  # Set once the processing message is sent
+                prompt=original_prompt,
+                resolution=resolution,
+                loras=[],  # Will be selected in the UI
+                upscale_factor=upscale_factor,
+                workflow_filename=None,
+                seed=seed,
+                is_pulid=False
+            )
+            request_item.trace = trace
+
+            # Hold a place in the queue while the prompt is moderated and enhanced
+            pipeline = SubmitPipeline(self.bot.queue_service, self.bot.content_filter_service)
+            submission, queue_message = pipeline.begin(request_item, QueuePriority.NORMAL, moderation=moderation)
+            if submission is None:
+                await interaction.followup.send(
+                    f"Failed to add request to queue: {queue_message}",
+                    ephemeral=True
+                )
+                self._record_command("generate", interaction, start_time, False)
+                return
+
             # Send processing message (same as without enhancement)
             message = await interaction.followup.send(
                 "🚀 Starting generation process...",
                 ephemeral=False
             )
+            request_item.original_message_id = str(message.id)
 
-            # Initialize AI service
+            # Shared AI service, configured once for the lifetime of the bot
             ai_service = AIService()
 
-            # Enhance the prompt with AI
-            enhanced_prompt = await ai_service.enhance_prompt(original_prompt, enhancement_level)
-
-            # Only show enhancement message if the prompt was actually enhanced (level > 1)
+            # Enhance the prompt with AI; during moderation only with providers trusted with
+            # unmoderated prompts, and without showing anything before the prompt passes
+            trace.mark(PHASE_ENHANCEMENT_START)
+            # Give up on the enhancement if it can't be done before the interaction expires
+            deadline = time.monotonic() + (interaction.expires_at - discord.utils.utcnow()).total_seconds()
+            # Only show the enhancement if the prompt is actually enhanced (level > 1)
             if enhancement_level > 1:
-                # Send a private message with the enhanced prompt
+                # Stream the enhanced prompt into a private message as it is written
+                def enhance():
+                    return enhance_with_progress(
+                        interaction, ai_service, original_prompt, enhancement_level,
+                        deadline=deadline, moderation=submission.moderation
+                    )
+            else:
+                def enhance():
+                    return ai_service.enhance_prompt(
+                        original_prompt, enhancement_level,
+                        user_id=str(interaction.user.id), deadline=deadline
+                    )
+            is_allowed, violation_details = await submission.moderate(
+                enhance, before_moderation=ai_service.can_enhance_before_moderation()
+            )
+            trace.mark(PHASE_ENHANCEMENT_END)
+
+            if not is_allowed:
+                await self._delete_message(message)
                 await interaction.followup.send(
-                    f"**Your prompt was enhanced:**\n\n**Original:** {original_prompt}\n\n**Enhanced:** {enhanced_prompt}",
+                    f"Your prompt was flagged by our content filter: {violation_details}",
                     ephemeral=True
                 )
-
-            # Use default resolution if not provided
-            if not resolution and self.bot.resolution_options:
-                resolution = self.bot.resolution_options[0]
+                self._record_command("generate", interaction, start_time, False)
+                return
 
             # Show LoRA selection view
             try:
@@ -107,61 +167,26 @@ class ImageCommands(commands.Cog):
                 # Just log the error and continue without showing a message to the user
                 logger.error(f"Error showing LoRA selection: {str(e)}", exc_info=True)
                 selected_loras = []
+            request_item.loras = selected_loras  # Use selected LoRAs
 
-            # Create request item
-            request_uuid = str(uuid.uuid4())
-            request_item = RequestItem(
-                id=request_uuid,
-                user_id=str(interaction.user.id),
-                channel_id=str(interaction.channel_id),
-                interaction_id=str(interaction.id),
-                original_message_id=str(message.id),
-                prompt=enhanced_prompt,
-                resolution=resolution,
-                loras=selected_loras,  # Use selected LoRAs
-                upscale_factor=upscale_factor,
-                workflow_filename=None,
-                seed=seed,
-                is_pulid=False
-            )
-
-            # Add to pending requests for progress updates
-            self.bot.pending_requests[request_uuid] = request_item
-            logger.info(f"Added request {request_uuid} to pending_requests with AI-enhanced prompt and {len(selected_loras)} LoRAs")
-
-            # Add to queue
-            success, request_id, queue_message = await self.bot.queue_service.add_request(
-                request_item,
-                QueuePriority.NORMAL
-            )
+            # Add to queue in the reserved place
+            success, request_id, queue_message = await submission.commit()
 
             if not success:
                 await interaction.followup.send(
                     f"Failed to add request to queue: {queue_message}",
                     ephemeral=True
                 )
-
-                # Record command execution
-                self.event_bus.publish(CommandExecutedEvent(
-                    command_name="generate",
-                    user_id=str(interaction.user.id),
-                    guild_id=str(interaction.guild_id) if interaction.guild_id else None,
-                    channel_id=str(interaction.channel_id),
-                    execution_time=time.time() - start_time,
-                    success=False
-                ))
-
+                self._record_command("generate", interaction, start_time, False)
                 return
 
+            # Add to pending requests for progress updates
+            request_item.id = request_id
+            self.bot.pending_requests[request_id] = request_item
+            logger.info(f"Added request {request_id} to pending_requests with AI-enhanced prompt and {len(selected_loras)} LoRAs")
+
             # Record command execution
-            self.event_bus.publish(CommandExecutedEvent(
-                command_name="generate",
-                user_id=str(interaction.user.id),
-                guild_id=str(interaction.guild_id) if interaction.guild_id else None,
-                channel_id=str(interaction.channel_id),
-                execution_time=time.time() - start_time,
-                success=True
-            ))
+            self._record_command("generate", interaction, start_time, True)
 
         except Exception as e:
             logger.error(f"Error in enhanced prompt processing: {e}", exc_info=True)
@@ -172,14 +197,29 @@ class ImageCommands(commands.Cog):
             )
 
             # Record command execution
-            self.event_bus.publish(CommandExecutedEvent(
-                command_name="generate",
-                user_id=str(interaction.user.id),
-                guild_id=str(interaction.guild_id) if interaction.guild_id else None,
-                channel_id=str(interaction.channel_id),
-                execution_time=time.time() - start_time,
-                success=False
-            ))
+            self._record_command("generate", interaction, start_time, False)
+        finally:
+            if submission:
+                submission.release()
+
+    def _record_command(self, command_name: str, interaction: discord.Interaction, start_time: float, success: bool):
+        """Publish the execution of a command"""
+        self.event_bus.publish(CommandExecutedEvent(
+            command_name=command_name,
+            user_id=str(interaction.user.id),
+            guild_id=str(interaction.guild_id) if interaction.guild_id else None,
+            channel_id=str(interaction.channel_id),
+            execution_time=time.time() - start_time,
+            success=success
+        ))
+
+    @staticmethod
+    async def _delete_message(message):
+        """Delete a processing message of a request that won't be queued"""
+        try:
+            await message.delete()
+        except Exception as e:
+            logger.debug(f"Could not delete processing message: {e}")
 
     def __init__(self, bot):
         """
@@ -244,29 +284,11 @@ class ImageCommands(commands.Cog):
                 # Record command execution (will be recorded when modal is submitted)
                 return
 
-            # Check content filter
-            is_allowed, violation_type, violation_details = self.bot.content_filter_service.check_prompt(
-                str(interaction.user.id),
-                prompt
-            )
-
-            if not is_allowed:
-                await interaction.response.send_message(
-                    f"Your prompt was flagged by our content filter: {violation_details}",
-                    ephemeral=True
-                )
-
-                # Record command execution
-                self.event_bus.publish(CommandExecutedEvent(
-                    command_name="generate",
-                    user_id=str(interaction.user.id),
-                    guild_id=str(interaction.guild_id) if interaction.guild_id else None,
-                    channel_id=str(interaction.channel_id),
-                    execution_time=time.time() - start_time,
-                    success=False
-                ))
-
-                return
+            # Moderate in the background while the user picks the enhancement level
+            # or the processing message is sent
+            trace = JobTrace()
+            pipeline = SubmitPipeline(self.bot.queue_service, self.bot.content_filter_service)
+            moderation = pipeline.start_moderation(str(interaction.user.id), prompt, trace)
 
             # Check if prompt enhancement is enabled
             config = get_config()
@@ -278,7 +300,7 @@ class ImageCommands(commands.Cog):
 
                 # Create a callback function to process the enhanced prompt
                 async def process_enhanced_prompt(interaction, original_prompt, enhancement_level):
-                    await self._process_with_enhancement(interaction, original_prompt, enhancement_level, resolution, upscale_factor, seed)
+                    await self._process_with_enhancement(interaction, original_prompt, enhancement_level, resolution, upscale_factor, seed, trace, moderation)
 
                 enhancement_modal = EnhancementModal(
                     original_prompt=prompt,
@@ -296,19 +318,13 @@ class ImageCommands(commands.Cog):
             if not resolution and self.bot.resolution_options:
                 resolution = self.bot.resolution_options[0]
 
-            # Create processing message
-            message = await interaction.followup.send(
-                "🚀 Starting generation process...",
-                ephemeral=False
-            )
-
             # Create request item
             request_item = RequestItem(
                 id=str(uuid.uuid4()),
                 user_id=str(interaction.user.id),
                 channel_id=str(interaction.channel_id),
                 interaction_id=str(interaction.id),
-                original_message_id=str(message.id),
+                original_message_id="",  # Set once the processing message is sent
                 prompt=prompt,
                 resolution=resolution,
                 loras=[],  # Will be selected in the UI
@@ -317,12 +333,40 @@ class ImageCommands(commands.Cog):
                 seed=seed,
                 is_pulid=False
             )
+            request_item.trace = trace
 
-            # Add to queue
-            success, request_id, message = await self.bot.queue_service.add_request(
-                request_item,
-                QueuePriority.NORMAL
-            )
+            # Hold a place in the queue while the prompt is moderated
+            submission, queue_message = pipeline.begin(request_item, QueuePriority.NORMAL, moderation=moderation)
+            if submission is None:
+                await interaction.followup.send(
+                    f"Failed to add request to queue: {queue_message}",
+                    ephemeral=True
+                )
+                self._record_command("generate", interaction, start_time, False)
+                return
+
+            try:
+                # Create processing message
+                message = await interaction.followup.send(
+                    "🚀 Starting generation process...",
+                    ephemeral=False
+                )
+                request_item.original_message_id = str(message.id)
+
+                is_allowed, violation_details = await submission.moderate()
+                if not is_allowed:
+                    await self._delete_message(message)
+                    await interaction.followup.send(
+                        f"Your prompt was flagged by our content filter: {violation_details}",
+                        ephemeral=True
+                    )
+                    self._record_command("generate", interaction, start_time, False)
+                    return
+
+                # Add to queue in the reserved place
+                success, request_id, queue_message = await submission.commit()
+            finally:
+                submission.release()
 
             # Store in pending requests for progress updates
             if success:
@@ -332,31 +376,16 @@ class ImageCommands(commands.Cog):
 
             if not success:
                 await interaction.followup.send(
-                    f"Failed to add request to queue: {message}",
+                    f"Failed to add request to queue: {queue_message}",
                     ephemeral=True
                 )
 
                 # Record command execution
-                self.event_bus.publish(CommandExecutedEvent(
-                    command_name="generate",
-                    user_id=str(interaction.user.id),
-                    guild_id=str(interaction.guild_id) if interaction.guild_id else None,
-                    channel_id=str(interaction.channel_id),
-                    execution_time=time.time() - start_time,
-                    success=False
-                ))
-
+                self._record_command("generate", interaction, start_time, False)
                 return
 
             # Record command execution
-            self.event_bus.publish(CommandExecutedEvent(
-                command_name="comfy",
-                user_id=str(interaction.user.id),
-                guild_id=str(interaction.guild_id) if interaction.guild_id else None,
-                channel_id=str(interaction.channel_id),
-                execution_time=time.time() - start_time,
-                success=True
-            ))
+            self._record_command("comfy", interaction, start_time, True)
 
         except Exception as e:
             logger.error(f"Error in generate command: {e}", exc_info=True)
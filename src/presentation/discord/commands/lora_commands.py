@@ -3,12 +3,11 @@ Discord commands for LoRA management.
 """
 
 import discord
+import asyncio
 import logging
 import time
 import json
-import aiohttp
 import os
-import re
 from typing import Dict, Any, List, Optional
 from discord import app_commands, ui
 from discord.ext import commands
@@ -16,14 +15,19 @@ from discord.ext import commands
 from src.domain.events.event_bus import EventBus
 from src.domain.events.common_events import CommandExecutedEvent
 from src.infrastructure.config.config_manager import ConfigManager
+from src.domain.lora_management import LoraManager
+from src.application.lora_management.civitai_cache import CivitaiCache, extract_model_id
+from src.infrastructure.civitai import CivitaiClient, LocalCivitaiClient
+from src.infrastructure.database.database_service import DatabaseService
 
 logger = logging.getLogger(__name__)
 
 class LoraInfoView(ui.View):
     """A paginated view for displaying LoRA information"""
-    def __init__(self, loras: List[dict]):
+    def __init__(self, loras: List[dict], civitai_cache: CivitaiCache):
         super().__init__(timeout=300)  # 5 minute timeout
         self.loras = loras
+        self.civitai_cache = civitai_cache
         self.current_page = 0
         self.items_per_page = 5  # Show 5 LoRAs per page
         self.total_pages = (len(self.loras) + self.items_per_page - 1) // self.items_per_page
@@ -32,14 +36,7 @@ class LoraInfoView(ui.View):
 
     def extract_civitai_model_id(self, url: str) -> str:
         """Extract the model ID from a Civitai URL"""
-        if not url or 'civitai.com' not in url:
-            return None
-
-        # Try to extract the model ID using regex
-        model_id_match = re.search(r'models/([0-9]+)', url)
-        if model_id_match:
-            return model_id_match.group(1)
-        return None
+        return extract_model_id(url)
 
     async def get_preview_image_url(self, url: str) -> str:
         """Get a preview image URL for a Civitai model"""
@@ -55,30 +52,18 @@ class LoraInfoView(ui.View):
             return None
 
         try:
-            # Use Civitai's official API to get model information
-            async with aiohttp.ClientSession() as session:
-                api_url = f"https://civitai.com/api/v1/models/{model_id}"
-                logger.info(f"Fetching model info from: {api_url}")
-                async with session.get(api_url) as response:
-                    if response.status != 200:
-                        logger.warning(f"Failed to get model info: {response.status}")
-                        return None
-
-                    data = await response.json()
-
-                    # Get the first model version
-                    if 'modelVersions' in data and len(data['modelVersions']) > 0:
-                        model_version = data['modelVersions'][0]
-
-                        # Get the first image
-                        if 'images' in model_version and len(model_version['images']) > 0:
-                            image = model_version['images'][0]
-                            return image.get('url')
+            # Cached, revalidated with Civitai's API once it expires
+            return await self.civitai_cache.get_preview_url(model_id)
         except Exception as e:
             logger.error(f"Error getting preview image: {e}")
 
         return None
 
+    def _page_loras(self, page: int) -> List[dict]:
+        """Get the LoRAs shown on a page"""
+        start_idx = page * self.items_per_page
+        return self.loras[start_idx:start_idx + self.items_per_page]
+
     def update_buttons(self):
         """Update navigation buttons based on current page"""
         # Clear existing buttons
@@ -142,9 +127,16 @@ class LoraInfoView(ui.View):
         embed.set_footer(text=f"Page {self.current_page + 1}/{self.total_pages} | Use /lorainfo [lora_name] for details")
 
         # Get LoRAs for the current page
-        start_idx = self.current_page * self.items_per_page
-        end_idx = min(start_idx + self.items_per_page, len(self.loras))
-        page_loras = self.loras[start_idx:end_idx]
+        page_loras = self._page_loras(self.current_page)
+
+        # Look up the page's preview images together, and warm the cache for the next page
+        preview_urls = await asyncio.gather(
+            *(self.get_preview_image_url(lora.get('url', '')) for lora in page_loras),
+            return_exceptions=True
+        )
+        self.civitai_cache.prefetch(
+            extract_model_id(lora.get('url', '')) for lora in self._page_loras(self.current_page + 1)
+        )
 
         # Process each LoRA
         for i, lora in enumerate(page_loras):
@@ -156,15 +148,13 @@ class LoraInfoView(ui.View):
             # Create field value with LoRA details
             field_value = ""
 
-            # Try to get a preview image for this LoRA
-            if url:
-                try:
-                    preview_url = await self.get_preview_image_url(url)
-                    if preview_url:
-                        # Make the preview link very prominent
-                        field_value += f"**[🖼️ CLICK HERE FOR PREVIEW IMAGE]({preview_url})**\n\n"
-                except Exception as e:
-                    logger.error(f"Error getting preview image: {e}")
+            # Add the preview image found for this LoRA
+            preview_url = preview_urls[i]
+            if isinstance(preview_url, Exception):
+                logger.error(f"Error getting preview image: {preview_url}")
+            elif preview_url:
+                # Make the preview link very prominent
+                field_value += f"**[🖼️ CLICK HERE FOR PREVIEW IMAGE]({preview_url})**\n\n"
 
             # Add the rest of the LoRA information
             if url:
@@ -224,6 +214,19 @@ class LoraCommands(commands.Cog):
         self.event_bus = EventBus()
         self.config = ConfigManager()
 
+        # Civitai metadata is cached across /lorainfo views and restarts
+        if self.config.civitai_local_metadata:
+            civitai_client = LocalCivitaiClient(path=self.config.civitai_local_metadata)
+        else:
+            civitai_client = CivitaiClient(self.config.civitai_api_url)
+        self.civitai_cache = CivitaiCache(
+            civitai_client,
+            ttl=self.config.civitai_cache_ttl,
+            negative_ttl=self.config.civitai_negative_ttl,
+            max_concurrency=self.config.civitai_max_concurrency,
+            database_service=DatabaseService() if self.config.civitai_cache_persist else None
+        )
+
     async def cog_load(self):
         """Called when the cog is loaded"""
         logger.info("LoRA commands loaded")
@@ -258,6 +261,27 @@ class LoraCommands(commands.Cog):
 
         return False
 
+    async def lora_name_autocomplete(self, interaction: discord.Interaction,
+                                     current: str) -> List[app_commands.Choice[str]]:
+        """
+        Suggest LoRA names matching what the user has typed so far.
+
+        Args:
+            interaction: Discord interaction
+            current: Text typed so far
+
+        Returns:
+            Up to 25 choices, the most Discord shows
+        """
+        try:
+            return [
+                app_commands.Choice(name=lora['name'][:100], value=lora['name'][:100])
+                for lora in LoraManager().search(current, limit=25)
+            ]
+        except Exception as e:
+            logger.error(f"Error in LoRA autocomplete: {e}")
+            return []
+
     # Command is registered in bot.py
     async def lorainfo_command(self, interaction: discord.Interaction, lora_name: str = None):
         """
@@ -274,8 +298,7 @@ class LoraCommands(commands.Cog):
             await interaction.response.defer(ephemeral=True)
 
             # Load LoRA data
-            lora_data = self.config.load_json('lora.json')
-            available_loras = lora_data.get('available_loras', [])
+            available_loras = LoraManager().get_all_loras()
 
             if not available_loras:
                 await interaction.followup.send(
@@ -301,8 +324,10 @@ class LoraCommands(commands.Cog):
                 lora = next((l for l in available_loras if l.get('name', '').lower() == lora_name.lower()), None)
 
                 if not lora:
+                    suggestions = LoraManager().search(lora_name, limit=5)
+                    hint = f" Did you mean: {', '.join(l['name'] for l in suggestions)}?" if suggestions else ""
                     await interaction.followup.send(
-                        f"LoRA '{lora_name}' not found.",
+                        f"LoRA '{lora_name}' not found.{hint}",
                         ephemeral=True
                     )
 
@@ -360,7 +385,7 @@ class LoraCommands(commands.Cog):
 
             else:
                 # Create the view and embed for all LoRAs
-                view = LoraInfoView(available_loras)
+                view = LoraInfoView(available_loras, self.civitai_cache)
                 embed = await view.create_embed()
 
                 # Send the response with the embed and view
@@ -410,25 +435,8 @@ class LoraCommands(commands.Cog):
             URL of the preview image, or None if not found
         """
         try:
-            # Use Civitai API to get model info
-            url = f"https://civitai.com/api/v1/models/{civitai_id}"
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logger.error(f"Error getting model info from Civitai: {response.status}")
-                        return None
-
-                    data = await response.json()
-
-                    # Get the first image
-                    if 'modelVersions' in data and data['modelVersions']:
-                        version = data['modelVersions'][0]
-                        if 'images' in version and version['images']:
-                            image = version['images'][0]
-                            return image.get('url')
-
-            return None
+            # Cached, revalidated with Civitai's API once it expires
+            return await self.civitai_cache.get_preview_url(str(civitai_id))
         except Exception as e:
             logger.error(f"Error getting LoRA preview: {e}")
             return None
@@ -466,15 +474,14 @@ class LoraCommands(commands.Cog):
             # Defer response to give us time to process
             await interaction.response.defer(ephemeral=True)
 
-            # Reload LoRAs
-            # This would normally involve scanning the LoRA directory
-            # For now, we'll just reload the JSON file
+            # Rebuild the shared LoRA catalog even if lora.json looks unchanged
+            catalog = LoraManager().reload()
 
             # Reload options
             await self.bot.reload_options()
 
             await interaction.followup.send(
-                "LoRA list reloaded.",
+                f"LoRA list reloaded ({len(catalog)} LoRAs).",
                 ephemeral=True
             )
 
@@ -0,0 +1,217 @@
+"""
+Discord view showing a prompt enhancement as it streams in.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import discord
+
+from src.application.ai.ai_service import AIService
+from src.infrastructure.config.config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# Discord rejects messages longer than this
+MAX_MESSAGE_LENGTH = 2000
+
+async def moderation_passed(moderation: Optional[asyncio.Future]) -> bool:
+    """
+    Wait for a prompt's moderation without cancelling it when the caller is cancelled.
+
+    Args:
+        moderation: Task resolving to (is_allowed, violation_type, violation_details), None if already moderated
+
+    Returns:
+        True if the prompt passed moderation
+    """
+    if moderation is None:
+        return True
+    try:
+        return (await asyncio.shield(moderation))[0]
+    except Exception as e:
+        logger.debug(f"Moderation failed, not showing the enhancement: {e}")
+        return False
+
+class EnhancementProgressView(discord.ui.View):
+    """
+    Shows the enhanced prompt growing as the AI writes it, and lets the user
+    accept the text so far instead of waiting for the rest. Message edits are
+    throttled to stay inside Discord's rate limits. While the prompt is still
+    being moderated the text is only recorded, so nothing generated from a
+    prompt that is rejected is ever shown.
+    """
+
+    def __init__(self, original_prompt: str, edit_interval: float = 1.0, timeout: Optional[float] = 300,
+                 moderation: Optional[asyncio.Future] = None):
+        """
+        Initialize the view.
+
+        Args:
+            original_prompt: The prompt being enhanced
+            edit_interval: Minimum seconds between message edits
+            timeout: View timeout in seconds
+            moderation: Task moderating the prompt, resolving to (is_allowed, violation_type, violation_details)
+        """
+        super().__init__(timeout=timeout)
+        self.original_prompt = original_prompt
+        self.edit_interval = edit_interval
+        self.moderation = moderation
+        self.moderated = moderation is None
+        self.message = None
+        self.enhancement: Optional[asyncio.Task] = None
+        self.text = ""
+        self.accepted: Optional[str] = None
+        self._last_edit = 0.0
+        self._edit_task: Optional[asyncio.Task] = None
+
+    def render(self, title: str, enhanced_prompt: str) -> str:
+        """
+        Build the message content, shortening the enhanced prompt to fit in a message.
+
+        Args:
+            title: First line of the message
+            enhanced_prompt: Enhanced prompt so far
+
+        Returns:
+            Message content
+        """
+        content = f"{title}\n\n**Original:** {self.original_prompt}\n\n**Enhanced:** "
+        room = MAX_MESSAGE_LENGTH - len(content)
+        if len(enhanced_prompt) > room:
+            enhanced_prompt = enhanced_prompt[:max(room - 1, 0)] + "…"
+        return content + enhanced_prompt
+
+    async def update(self, text: str):
+        """
+        Record the text generated so far, editing the message unless it was edited recently.
+
+        Args:
+            text: Enhanced prompt so far
+        """
+        self.text = text
+        if self.message is None or self.accepted is not None or not self.moderated:
+            return
+        if self._edit_task and not self._edit_task.done():
+            return
+        if time.monotonic() - self._last_edit < self.edit_interval:
+            return
+
+        self._last_edit = time.monotonic()
+        # Edit in the background so the stream isn't held up by Discord
+        self._edit_task = asyncio.create_task(
+            self._edit(self.render("✨ **Enhancing your prompt...**", text.strip() + " ▌"), self)
+        )
+
+    async def wait_for_moderation(self) -> bool:
+        """
+        Wait for the prompt's moderation, then show the text held back meanwhile.
+
+        Returns:
+            True if the prompt passed moderation
+        """
+        if not self.moderated:
+            if not await moderation_passed(self.moderation):
+                return False
+            self.moderated = True
+            if self.text:
+                await self.update(self.text)
+        return True
+
+    @discord.ui.button(label="Use this", style=discord.ButtonStyle.success, emoji="✅")
+    async def accept_callback(self, interaction: discord.Interaction, _: discord.ui.Button):
+        """Callback for the accept button - stops the enhancement and keeps the text so far"""
+        self.accepted = self.text.strip()
+        await interaction.response.defer()
+        if self.enhancement and not self.enhancement.done():
+            self.enhancement.cancel()
+        self.stop()
+
+    async def finish(self, enhanced_prompt: str):
+        """
+        Show the final enhanced prompt and remove the button.
+
+        Args:
+            enhanced_prompt: The enhanced prompt that will be used
+        """
+        self.stop()
+        if self._edit_task and not self._edit_task.done():
+            # Let the pending edit land first so it can't overwrite the final text
+            await self._edit_task
+        await self._edit(self.render("**Your prompt was enhanced:**", enhanced_prompt), None)
+
+    async def _edit(self, content: str, view: Optional[discord.ui.View]):
+        """Edit the message, ignoring failures such as a dismissed message"""
+        try:
+            await self.message.edit(content=content, view=view)
+        except Exception as e:
+            logger.debug(f"Could not update enhancement message: {e}")
+
+async def enhance_with_progress(interaction: discord.Interaction, ai_service: AIService,
+                                original_prompt: str, enhancement_level: int,
+                                deadline: Optional[float] = None,
+                                moderation: Optional[asyncio.Future] = None) -> str:
+    """
+    Enhance a prompt, streaming the enhancement into a private message the user can accept early.
+    Falls back to a single message once the enhancement is done if streaming is disabled.
+
+    Args:
+        interaction: The Discord interaction, already responded to
+        ai_service: AI service
+        original_prompt: The prompt to enhance
+        enhancement_level: Level of enhancement from 2-10
+        deadline: time.monotonic() after which the enhancement is no longer useful
+        moderation: Task moderating the prompt; no enhanced text is shown until it passes
+
+    Returns:
+        The enhanced prompt, the text the user accepted, or the original prompt
+    """
+    user_id = str(interaction.user.id)
+    config = ConfigManager()
+    if not config.enhancement_streaming:
+        enhanced_prompt = await ai_service.enhance_prompt(
+            original_prompt, enhancement_level, user_id=user_id, deadline=deadline
+        )
+        if not await moderation_passed(moderation):
+            return original_prompt
+        await interaction.followup.send(
+            f"**Your prompt was enhanced:**\n\n**Original:** {original_prompt}\n\n**Enhanced:** {enhanced_prompt}",
+            ephemeral=True
+        )
+        return enhanced_prompt
+
+    view = EnhancementProgressView(
+        original_prompt, edit_interval=config.enhancement_stream_edit_interval, moderation=moderation
+    )
+    view.message = await interaction.followup.send(
+        view.render("✨ **Enhancing your prompt...**", "▌"),
+        view=view,
+        ephemeral=True
+    )
+
+    view.enhancement = asyncio.create_task(ai_service.enhance_prompt(
+        original_prompt, enhancement_level, user_id=user_id, deadline=deadline, on_progress=view.update
+    ))
+    # Show the text held back during moderation as soon as the prompt passes
+    release = asyncio.create_task(view.wait_for_moderation())
+    try:
+        enhanced_prompt = await asyncio.shield(view.enhancement)
+    except asyncio.CancelledError:
+        if not view.enhancement.cancelled() or view.accepted is None:
+            # We were cancelled ourselves, not by the accept button
+            view.enhancement.cancel()
+            release.cancel()
+            view.stop()
+            asyncio.create_task(view._edit("Enhancement stopped.", None))
+            raise
+        enhanced_prompt = view.accepted or original_prompt
+        logger.info(f"User accepted the enhancement early: {enhanced_prompt}")
+
+    if not await release:
+        view.stop()
+        await view._edit("Enhancement stopped.", None)
+        return original_prompt
+    await view.finish(enhanced_prompt)
+    return enhanced_prompt
@@ -1,8 +1,10 @@
 import discord
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from discord import ui, SelectOption
 
+from src.domain.lora_management import LoraManager
+
 logger = logging.getLogger(__name__)
 
 class PaginatedLoraSelect(ui.Select):
@@ -46,8 +48,38 @@ class PaginatedLoraSelect(ui.Select):
         )
 
 
+class LoraSearchModal(ui.Modal):
+    """Modal asking for the text to filter the LoRA selection by"""
+
+    def __init__(self, view: 'LoraSelectionView'):
+        """
+        Initialize the search modal.
+
+        Args:
+            view: The selection view to filter
+        """
+        super().__init__(title="Search LoRAs")
+        self.view = view
+        self.query = ui.TextInput(
+            label="Name, file or trigger words",
+            placeholder="e.g. anime, watercolor, midjourney",
+            default=view.query or None,
+            required=False,
+            max_length=100
+        )
+        self.add_item(self.query)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        """Filter the selection view by the entered text"""
+        query = self.query.value.strip()
+        if not self.view.apply_filter(query):
+            await interaction.response.send_message(f"No LoRAs match '{query}'.", ephemeral=True)
+            return
+        await interaction.response.edit_message(view=self.view)
+
+
 class LoraSelectionView(ui.View):
-    """A view for selecting LoRAs with pagination"""
+    """A view for selecting LoRAs with pagination and search"""
 
     def __init__(self, loras: List[Dict[str, Any]], timeout: int = 300):
         """
@@ -58,7 +90,9 @@ class LoraSelectionView(ui.View):
             timeout: View timeout in seconds
         """
         super().__init__(timeout=timeout)
-        self.loras = loras
+        self.all_loras = loras
+        self.loras = loras  # LoRAs matching the current search
+        self.query: Optional[str] = None
         self.current_page = 0
         self.selected_loras = []
         self.has_confirmed = False
@@ -83,6 +117,32 @@ class LoraSelectionView(ui.View):
                     pass
         self.stop()
 
+    def apply_filter(self, query: str) -> bool:
+        """
+        Show only the LoRAs matching a search, best matches first. Selections
+        of LoRAs that are filtered out are kept.
+
+        Args:
+            query: Text to search for, empty to show all LoRAs
+
+        Returns:
+            False if nothing matches, in which case the view is unchanged
+        """
+        if query:
+            available = {lora['file'] for lora in self.all_loras}
+            matches = [lora for lora in LoraManager().search(query, limit=None) if lora['file'] in available]
+            if not matches:
+                return False
+            self.loras = matches
+        else:
+            self.loras = self.all_loras
+
+        self.query = query or None
+        self.current_page = 0
+        self.total_pages = (len(self.loras) - 1) // self.loras_per_page + 1
+        self.update_view()
+        return True
+
     def update_view(self):
         """Update the view with current selections and pagination"""
         # Clear existing items
@@ -151,6 +211,27 @@ class LoraSelectionView(ui.View):
         cancel_button.callback = self.cancel_callback
         self.add_item(cancel_button)
 
+        # Add search buttons
+        search_button = ui.Button(
+            label="Search",
+            style=discord.ButtonStyle.primary,
+            emoji="🔍",
+            custom_id="search",
+            row=3
+        )
+        search_button.callback = self.search_callback
+        self.add_item(search_button)
+
+        if self.query:
+            clear_button = ui.Button(
+                label=f"Clear search '{self.query[:40]}'",
+                style=discord.ButtonStyle.secondary,
+                custom_id="clear_search",
+                row=3
+            )
+            clear_button.callback = self.clear_search_callback
+            self.add_item(clear_button)
+
     async def lora_select_callback(self, interaction: discord.Interaction):
         """Handle LoRA selection"""
         # Get the selected LoRAs from this page
@@ -172,6 +253,15 @@ class LoraSelectionView(ui.View):
 
         await interaction.response.edit_message(view=self)
 
+    async def search_callback(self, interaction: discord.Interaction):
+        """Handle search button click"""
+        await interaction.response.send_modal(LoraSearchModal(self))
+
+    async def clear_search_callback(self, interaction: discord.Interaction):
+        """Handle clear search button click"""
+        self.apply_filter("")
+        await interaction.response.edit_message(view=self)
+
     async def prev_page_callback(self, interaction: discord.Interaction):
         """Handle previous page button click"""
         self.current_page = max(0, self.current_page - 1)
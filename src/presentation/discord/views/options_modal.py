@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 from discord.ui import View
 
 from src.infrastructure.config.config_manager import ConfigManager
+from src.domain.lora_management import LoraManager
 
 logger = logging.getLogger(__name__)
 
@@ -164,9 +165,7 @@ class OptionsView(View):
     def _load_loras(self) -> List[Dict[str, Any]]:
         """Load available LoRAs from config"""
         try:
-            config_manager = ConfigManager()
-            lora_data = config_manager.load_json("config/lora.json")
-            return lora_data.get("available_loras", [])
+            return LoraManager().get_all_loras()
         except Exception as e:
             logger.error(f"Error loading LoRAs: {str(e)}")
             return []  # Empty list as fallback
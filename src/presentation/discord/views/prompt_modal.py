@@ -11,9 +11,13 @@ from typing import Dict, Any, List, Optional
 from discord.ui import Modal, TextInput
 
 from src.domain.models.queue_item import RequestItem, QueuePriority
+from src.domain.models.job_trace import (
+    JobTrace, PHASE_MODERATION_START, PHASE_MODERATION_END, PHASE_ENHANCEMENT_START, PHASE_ENHANCEMENT_END
+)
 from src.domain.events.event_bus import EventBus
 from src.domain.events.common_events import CommandExecutedEvent
 from src.presentation.discord.views.enhancement_modal import EnhancementModal
+from src.presentation.discord.views.enhancement_progress_view import enhance_with_progress
 from src.application.ai.ai_service import AIService
 from src.infrastructure.config.config_loader import get_config
 
@@ -35,6 +39,7 @@ class PromptModal(Modal):
         super().__init__(title="Generate Image")
         self.bot = bot
         self.event_bus = EventBus()
+        self.trace = JobTrace()
 
         # Default values
         self.resolution = "512x512"
@@ -44,7 +49,7 @@ class PromptModal(Modal):
         self.config = get_config()
         self.enable_prompt_enhancement = self.config.get('enable_prompt_enhancement', 'False').lower() == 'true'
 
-        # Initialize AI service
+        # Shared AI service, configured once for the lifetime of the bot
         if self.enable_prompt_enhancement:
             self.ai_service = AIService()
 
@@ -89,10 +94,12 @@ class PromptModal(Modal):
                 full_prompt = prompt
 
             # Check content filter
+            self.trace.mark(PHASE_MODERATION_START)
             is_allowed, violation_type, violation_details = self.bot.content_filter_service.check_prompt(
                 str(interaction.user.id),
                 full_prompt
             )
+            self.trace.mark(PHASE_MODERATION_END)
 
             if not is_allowed:
                 await interaction.response.send_message(
@@ -175,7 +182,20 @@ class PromptModal(Modal):
                 )
 
             # Enhance the prompt with AI
-            enhanced_prompt = await self.ai_service.enhance_prompt(original_prompt, enhancement_level)
+            self.trace.mark(PHASE_ENHANCEMENT_START)
+            # Give up on the enhancement if it can't be done before the interaction expires
+            deadline = time.monotonic() + (interaction.expires_at - discord.utils.utcnow()).total_seconds()
+            if enhancement_level > 1:
+                # Stream the enhanced prompt into a private message as it is written
+                enhanced_prompt = await enhance_with_progress(
+                    interaction, self.ai_service, original_prompt, enhancement_level, deadline=deadline
+                )
+            else:
+                enhanced_prompt = await self.ai_service.enhance_prompt(
+                    original_prompt, enhancement_level,
+                    user_id=str(interaction.user.id), deadline=deadline
+                )
+            self.trace.mark(PHASE_ENHANCEMENT_END)
 
             # Create request item
             request_uuid = str(uuid.uuid4())
@@ -193,6 +213,7 @@ class PromptModal(Modal):
                 seed=None,
                 is_pulid=False
             )
+            request_item.trace = self.trace
 
             # Add to pending requests for progress updates
             self.bot.pending_requests[request_uuid] = request_item
@@ -280,6 +301,7 @@ class PromptModal(Modal):
                 seed=None,
                 is_pulid=False
             )
+            request_item.trace = self.trace
 
             # Add to pending requests for progress updates
             self.bot.pending_requests[request_uuid] = request_item
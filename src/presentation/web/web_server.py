@@ -6,8 +6,13 @@ import asyncio
 import time
 import os
 import shutil
+import json
 from aiohttp import web
 from src.domain.models.queue_item import RequestItem
+from src.domain.models.job_trace import PHASE_UPLOAD_START, PHASE_UPLOAD_END, PHASE_SUBMITTED, PHASE_EXECUTION_END, PHASE_FAILED
+from src.application.analytics.trace_service import TraceService
+from src.domain.events.event_bus import EventBus
+from src.infrastructure.metrics.metrics_registry import MetricsRegistry, get_process_rss
 from src.presentation.web.image_handler import create_view_for_request, create_embed_for_image
 
 logger = logging.getLogger(__name__)
@@ -57,8 +62,11 @@ async def update_progress(request):
         if not request_id:
             return web.Response(text="Missing request_id", status=400)
 
-        # Log all pending request IDs for debugging
-        logger.info(f"Pending request IDs: {list(request.app['bot'].pending_requests.keys())}")
+        # A failed job's trace ends with the marks recorded by the generation process
+        if progress_data.get('status') == 'error':
+            trace_service = TraceService()
+            trace_service.extend(request_id, progress_data.get('trace', []))
+            await trace_service.finish(request_id, PHASE_FAILED)
 
         # Try to get the request item from pending requests
         request_item = None
@@ -73,10 +81,10 @@ async def update_progress(request):
                     request_item = await request.app['image_repository'].create_request_item_from_data(image_data)
                     # Add to pending requests for future updates
                     request.app['bot'].pending_requests[request_id] = request_item
-                    logger.info(f"Loaded request {request_id} from database")
+                    logger.debug("Loaded request from database", extra={'request_id': request_id})
 
         if not request_item:
-            logger.warning(f"Unknown request_id: {request_id}")
+            logger.warning(f"Unknown request_id: {request_id} ({len(request.app['bot'].pending_requests)} pending)")
             return web.Response(text="Unknown request_id", status=404)
 
         try:
@@ -145,7 +153,8 @@ async def update_progress(request):
                     message.edit(content=formatted_message),
                     timeout=2.0  # 2 second timeout
                 )
-                logger.info(f"Updated progress message: {formatted_message}")
+                logger.debug("Updated progress message: %s", formatted_message,
+                             extra={'category': 'progress', 'request_id': request_id})
             except asyncio.TimeoutError:
                 logger.warning("Message edit timed out, likely due to Discord rate limits")
             except discord.errors.HTTPException as e:
@@ -182,6 +191,7 @@ async def send_image(request):
         request_id = None
         image_data = None
         filename = None
+        trace_marks = []
 
         # Process all form fields
         while True:
@@ -191,12 +201,17 @@ async def send_image(request):
 
             if field.name == 'request_id':
                 request_id = await field.text()
-                logger.info(f"Got request_id: {request_id}")
+                logger.debug("Got request_id: %s", request_id)
             elif field.name == 'image_data' or field.name == 'video_data':
                 image_data = await field.read()
                 filename = field.filename
                 is_video = field.name == 'video_data'
-                logger.info(f"Got {'video' if is_video else 'image'} data: {filename}, size: {len(image_data)} bytes")
+                logger.debug("Got %s data: %s, size: %d bytes", 'video' if is_video else 'image', filename, len(image_data))
+            elif field.name == 'trace':
+                try:
+                    trace_marks = json.loads(await field.text())
+                except ValueError:
+                    logger.warning("Ignoring malformed trace")
 
         if not request_id:
             logger.error("Missing request_id")
@@ -219,19 +234,23 @@ async def send_image(request):
                     request_item = await request.app['image_repository'].create_request_item_from_data(image_data)
                     # Add to pending requests for future updates
                     request.app['bot'].pending_requests[request_id] = request_item
-                    logger.info(f"Loaded request {request_id} from database")
+                    logger.debug("Loaded request from database", extra={'request_id': request_id})
 
         if not request_item:
-            logger.warning(f"Unknown request_id: {request_id}")
+            logger.warning(f"Unknown request_id: {request_id} ({len(request.app['bot'].pending_requests)} pending)")
             return web.Response(text="Unknown request_id", status=404)
 
+        trace_service = TraceService()
+        trace_service.extend(request_id, trace_marks)
+
         # Set is_video flag based on the field name or file extension
         if 'is_video' in locals() and is_video:
             request_item.is_video = True
         elif filename and filename.lower().endswith(('.mp4', '.webm', '.avi', '.mov', '.mkv')):
             request_item.is_video = True
 
-        logger.info(f"Found request item: {request_item.channel_id}, {request_item.original_message_id}, is_video: {getattr(request_item, 'is_video', False)}")
+        logger.debug("Found request item: %s, %s, is_video: %s", request_item.channel_id, request_item.original_message_id,
+                     getattr(request_item, 'is_video', False), extra={'request_id': request_id})
 
         try:
             # Get the channel and message
@@ -309,35 +328,35 @@ async def send_image(request):
                 # Check if this is a redux request by examining the request_item type
                 if hasattr(request_item, 'is_redux'):
                     is_redux = request_item.is_redux
-                    logger.info(f"Request {request_id} has is_redux attribute: {is_redux}")
+                    logger.debug("Request %s has is_redux attribute: %s", request_id, is_redux)
 
                 # Check if this is a pulid request by examining the request_item type
                 if hasattr(request_item, 'is_pulid'):
                     is_pulid = request_item.is_pulid
-                    logger.info(f"Request {request_id} has is_pulid attribute: {is_pulid}")
+                    logger.debug("Request %s has is_pulid attribute: %s", request_id, is_pulid)
 
                 # Also check if this is a ReduxRequestItem type
                 from src.domain.models.queue_item import ReduxRequestItem
                 if isinstance(request_item, ReduxRequestItem):
                     is_redux = True
-                    logger.info(f"Request {request_id} is a ReduxRequestItem instance")
+                    logger.debug("Request %s is a ReduxRequestItem instance", request_id)
 
                 # Check if the command name contains 'redux' or 'pulid'
                 if hasattr(request_item, 'command_name'):
                     if 'redux' in request_item.command_name.lower():
                         is_redux = True
-                        logger.info(f"Request {request_id} has redux in command name: {request_item.command_name}")
+                        logger.debug("Request %s has redux in command name: %s", request_id, request_item.command_name)
                     elif 'pulid' in request_item.command_name.lower():
                         is_pulid = True
-                        logger.info(f"Request {request_id} has pulid in command name: {request_item.command_name}")
+                        logger.debug("Request %s has pulid in command name: %s", request_id, request_item.command_name)
 
                 # Check if the workflow filename contains 'pulid'
                 if hasattr(request_item, 'workflow_filename') and request_item.workflow_filename:
                     if 'pulid' in request_item.workflow_filename.lower():
                         is_pulid = True
-                        logger.info(f"Request {request_id} has pulid in workflow filename: {request_item.workflow_filename}")
+                        logger.debug("Request %s has pulid in workflow filename: %s", request_id, request_item.workflow_filename)
 
-                logger.info(f"Request {request_id} final determinations: is_redux={is_redux}, is_pulid={is_pulid}")
+                logger.debug("Request %s final determinations: is_redux=%s, is_pulid=%s", request_id, is_redux, is_pulid)
 
                 if is_redux:
                     # For redux images, use the ReduxView (only delete button)
@@ -365,6 +384,7 @@ async def send_image(request):
             # CRITICAL PRIORITY: Update the original message with the media, embed, and view
             # This is the most important part for user experience - do this FIRST and IMMEDIATELY
             # Use a very short timeout to ensure the message is sent as fast as possible
+            trace_service.mark(request_id, PHASE_UPLOAD_START)
             try:
                 # OPTIMIZATION: Use asyncio.wait_for with a short timeout to ensure we don't block
                 # First, try to edit the message with the file
@@ -430,6 +450,8 @@ async def send_image(request):
                         await channel.send(file=final_file)
                     except Exception as final_error:
                         logger.error(f"All attempts to send image failed: {final_error}")
+            trace_service.mark(request_id, PHASE_UPLOAD_END)
+            trace = await trace_service.finish(request_id)
 
             # Save image to disk in the background
             if 'image_repository' in request.app and request.app['image_repository']:
@@ -439,18 +461,18 @@ async def send_image(request):
                     with open(image_path, 'wb') as f:
                         f.write(image_data)
 
-                    # Calculate generation time
-                    generation_time = time.time() - request_item.created_at if hasattr(request_item, 'created_at') else None
+                    # Generation time is from submission to ComfyUI to the end of execution
+                    generation_time = trace.elapsed(PHASE_SUBMITTED, PHASE_EXECUTION_END) if trace else None
 
-                    # Save to database
-                    asyncio.create_task(request.app['image_repository'].save_image_generation(
+                    # Save to database (journaled, committed by the write-behind flusher)
+                    await request.app['image_repository'].save_image_generation(
                         request_id=request_id,
                         request_item=request_item,
                         image_path=image_path,
                         generation_time=generation_time,
                         completed=True
-                    ))
-                    logger.info(f"Started background task to save image generation data for request {request_id}")
+                    )
+                    logger.info(f"Queued image generation data for request {request_id}")
 
                     # Clean up temporary files for Redux requests
                     if hasattr(request_item, 'is_redux') and request_item.is_redux:
@@ -514,6 +536,35 @@ async def cleanup_redux_files(request_id):
     except Exception as e:
         logger.error(f"Error cleaning up Redux files: {e}")
 
+async def metrics(request):
+    """Serve metrics in the Prometheus text exposition format"""
+    return web.Response(
+        body=MetricsRegistry().render().encode('utf-8'),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+def _event_metric(key):
+    """Scrape-time values of one event bus counter by event type"""
+    def collect():
+        return {(name,): stats[key] for name, stats in EventBus().get_metrics()['events'].items()}
+    return collect
+
+def _register_process_metrics():
+    """Register metrics that are read from the event bus and the process when scraped"""
+    registry = MetricsRegistry()
+    registry.gauge("process_resident_memory_bytes", "Resident memory size of the process",
+                   function=lambda: get_process_rss() or 0)
+    registry.gauge("event_bus_queued", "Events waiting to be dispatched", ("event",),
+                   function=_event_metric('queued'))
+    registry.counter("event_bus_delivered_total", "Events taken off the dispatch queue", ("event",),
+                     function=_event_metric('delivered'))
+    registry.counter("event_bus_dropped_total", "Events dropped because the dispatch queue was full", ("event",),
+                     function=_event_metric('dropped'))
+    registry.counter("event_bus_lag_seconds_total", "Total time events spent queued before dispatch", ("event",),
+                     function=_event_metric('lag_total'))
+    registry.gauge("event_bus_lag_max_seconds", "Longest time an event spent queued before dispatch", ("event",),
+                   function=_event_metric('lag_max'))
+
 async def start_web_server(bot, port=8090, image_repository=None):
     app = web.Application()
 
@@ -522,6 +573,9 @@ async def start_web_server(bot, port=8090, image_repository=None):
     app.router.add_post('/update_progress', update_progress)
     app.router.add_post('/send_image', send_image)
     app.router.add_post('/image_generated', send_image)  # Alias for compatibility
+    app.router.add_get('/metrics', metrics)
+
+    _register_process_metrics()
 
     app['bot'] = bot
 
@@ -0,0 +1,153 @@
+"""
+Startup time benchmark.
+Breaks down import time with `python -X importtime` and measures the time
+from process start to the bot's commands being registered, without
+connecting to Discord.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Runs the startup sequence of src/main.py up to command registration and prints
+# the wall clock time of each milestone as JSON
+PROBE = """
+import asyncio, json, sys, time
+marks = {}
+import src.main as app
+marks['imports'] = time.time()
+
+async def run():
+    db_service, queue_repository, analytics_repository, image_repository = await app.setup_database()
+    marks['database'] = time.time()
+    container = await app.setup_services(db_service, queue_repository, analytics_repository, image_repository)
+    marks['services'] = time.time()
+    content_filter_service = container.resolve(app.ContentFilterService)
+    bot = app.DiscordBot(
+        queue_service=container.resolve(app.QueueService),
+        analytics_service=container.resolve(app.AnalyticsService),
+        content_filter_service=content_filter_service,
+        image_generation_service=container.resolve(app.ImageGenerationService)
+    )
+    await bot._register_commands()
+    marks['commands_registered'] = time.time()
+    if '--warm-up' in sys.argv:
+        await content_filter_service.warm_up()
+        await asyncio.get_running_loop().run_in_executor(None, app.AIService.preload)
+        marks['warmed_up'] = time.time()
+
+    await app.EventBus().stop()
+    await app.LoopWatchdog().stop()
+    await container.resolve(app.RetentionService).stop()
+    await container.resolve(app.WriteBehindJournal).close()
+
+asyncio.run(run())
+print('STARTUP_MARKS ' + json.dumps(marks))
+"""
+
+def probe_environment(workdir: str) -> dict:
+    """Environment for a probe process running in a scratch directory"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env['LOG_FILE'] = os.path.join(workdir, 'bot.log')
+    env['LOG_LEVEL'] = 'WARNING'
+    return env
+
+def make_workdir() -> str:
+    """Scratch directory with the repository's config, so the probe doesn't touch the real databases"""
+    workdir = tempfile.mkdtemp(prefix='startup-benchmark-')
+    config_dir = os.path.join(REPO_ROOT, 'config')
+    if os.path.isdir(config_dir):
+        os.symlink(config_dir, os.path.join(workdir, 'config'))
+    return workdir
+
+def measure_import_time(python: str, top: int):
+    """
+    Import src.main with -X importtime and summarize where the time goes.
+
+    Args:
+        python: Python interpreter
+        top: Number of packages and modules to show
+    """
+    workdir = make_workdir()
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=workdir, env=probe_environment(workdir), capture_output=True, text=True
+    )
+
+    by_package = defaultdict(int)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        by_package[name.split('.')[0]] += self_us
+        modules.append((cumulative_us, depth, name))
+
+    if result.returncode != 0:
+        print(f"Import failed:\n{result.stderr[-2000:]}")
+
+    total = sum(by_package.values())
+    print(f"\nImport time of src.main: {total / 1e6:.3f} s")
+    print(f"\n{'Package':<40}{'Self time (s)':>15}{'Share':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{package:<40}{self_us / 1e6:>15.3f}{self_us / total:>8.1%}")
+
+    print(f"\n{'Slowest application imports':<60}{'Cumulative (s)':>15}")
+    app_modules = sorted((m for m in modules if m[2].startswith('src.')), reverse=True)[:top]
+    for cumulative_us, depth, name in app_modules:
+        print(f"{name:<60}{cumulative_us / 1e6:>15.3f}")
+
+def measure_startup(python: str, runs: int, warm_up: bool):
+    """
+    Time the startup milestones over several runs.
+
+    Args:
+        python: Python interpreter
+        runs: Number of runs
+        warm_up: Also time loading the content filter models and AI provider SDK
+    """
+    samples = defaultdict(list)
+    for _ in range(runs):
+        workdir = make_workdir()
+        args = [python, '-c', PROBE] + (['--warm-up'] if warm_up else [])
+        started = time.time()
+        result = subprocess.run(args, cwd=workdir, env=probe_environment(workdir), capture_output=True, text=True)
+        marks_line = next((line for line in result.stdout.splitlines() if line.startswith('STARTUP_MARKS ')), None)
+        if result.returncode != 0 or marks_line is None:
+            print(f"Startup probe failed:\n{result.stderr[-2000:]}")
+            return
+        for milestone, at in json.loads(marks_line[len('STARTUP_MARKS '):]).items():
+            samples[milestone].append(at - started)
+
+    print(f"\n{'Time from process start to':<40}{'Median (s)':>12}{'Min (s)':>10}{'Max (s)':>10}")
+    for milestone, values in samples.items():
+        print(f"{milestone:<40}{statistics.median(values):>12.3f}{min(values):>10.3f}{max(values):>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the bot')
+    parser.add_argument('--runs', type=int, default=3, help='Number of startup runs to time')
+    parser.add_argument('--top', type=int, default=15, help='Number of packages and modules to list')
+    parser.add_argument('--warm-up', action='store_true', help='Also time the background model warm-up')
+    parser.add_argument('--python', default=sys.executable, help='Python interpreter to benchmark')
+    args = parser.parse_args()
+
+    measure_import_time(args.python, args.top)
+    measure_startup(args.python, args.runs, args.warm_up)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Tests for the image repository.
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.database.image_repository import ImageRepository, GENERATION_LORAS_BACKFILL
+
+
+@pytest.fixture
+def database_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(DatabaseService, "_instance", None)
+    return DatabaseService(db_path=str(tmp_path / "database.db"))
+
+
+def seed_generations(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM schema_migrations")
+    conn.executemany(
+        "INSERT INTO image_generations (request_id, user_id, channel_id, prompt, resolution, loras, created_at) "
+        "VALUES (?, 'user', 'channel', 'a cat', '1024x1024', ?, ?)",
+        [(f"req-{i}", json.dumps([{"file": "style.safetensors", "strength": 0.8}]), 1000.0 + i) for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_failed_backfill_is_retried_until_it_completes(tmp_path, database_service, monkeypatch):
+    ImageRepository(database_service)
+    seed_generations(database_service.db_path, 3)
+    execute_many = database_service.execute_many
+
+    def fail(*args, **kwargs):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(database_service, "execute_many", fail)
+    repository = ImageRepository(database_service)
+    assert not repository._migration_done(GENERATION_LORAS_BACKFILL)
+
+    monkeypatch.setattr(database_service, "execute_many", execute_many)
+    repository = ImageRepository(database_service)
+
+    assert repository._migration_done(GENERATION_LORAS_BACKFILL)
+    assert database_service.fetch_one("SELECT COUNT(*) FROM generation_loras")[0] == 3
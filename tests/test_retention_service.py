@@ -0,0 +1,66 @@
+"""
+Tests for the retention service.
+"""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.database.retention_service import RetentionService
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def database_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(DatabaseService, "_instance", None)
+    return DatabaseService(db_path=str(tmp_path / "database.db"))
+
+
+def create_table(path, table, timestamps):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, timestamp REAL NOT NULL)")
+    conn.executemany(f"INSERT INTO {table} (user_id, timestamp) VALUES ('user', ?)", [(t,) for t in timestamps])
+    conn.commit()
+    conn.close()
+
+
+def count_rows(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("table", ["image_stats", "command_usage", "user_activity"])
+def test_prunes_old_rows_in_analytics_database(tmp_path, database_service, table):
+    analytics_db_path = str(tmp_path / "analytics.db")
+    now = time.time()
+    create_table(analytics_db_path, table, [now - 100 * DAY, now - 90 * DAY, now])
+    retention = RetentionService(
+        database_service, {table: 30},
+        archive_dir=str(tmp_path / "archive"), analytics_db_path=analytics_db_path
+    )
+
+    archived = retention.run_sync()
+
+    assert archived == {table: 2}
+    assert count_rows(analytics_db_path, table) == 1
+    assert os.listdir(tmp_path / "archive" / table)
+
+
+def test_prunes_analytics_table_kept_in_main_database(tmp_path, database_service):
+    now = time.time()
+    create_table(database_service.db_path, "command_usage", [now - 100 * DAY, now])
+    retention = RetentionService(
+        database_service, {"command_usage": 30},
+        archive_dir=str(tmp_path / "archive"), analytics_db_path=str(tmp_path / "analytics.db")
+    )
+
+    assert retention.run_sync() == {"command_usage": 1}
+    assert count_rows(database_service.db_path, "command_usage") == 1
+    assert not os.path.exists(tmp_path / "analytics.db")
@@ -0,0 +1,72 @@
+"""
+Tests for the content filter's term index.
+"""
+
+import pytest
+
+from src.application.content_filter.enhanced_transformer_filter import EnhancedTransformerFilter
+from src.application.content_filter.term_index import TermIndex
+
+
+@pytest.fixture(scope="module")
+def content_filter():
+    return EnhancedTransformerFilter(defer_loading=True)
+
+
+@pytest.mark.parametrize("word, group", [
+    ("beaten", "harmful"),
+    ("violently", "harmful"),
+    ("harmful", "harmful"),
+    ("exploitation", "harmful"),
+    ("sexually", "child_harmful"),
+    ("explicitly", "child_harmful"),
+    ("schoolgirl", "child_related"),
+    ("schoolboy", "child_related"),
+    ("teenage", "child_related"),
+    ("kiddie", "child_related"),
+])
+def test_inflections_and_compounds_match(content_filter, word, group):
+    assert content_filter.term_index.scan(f"a {word} picture").has(group)
+
+
+@pytest.mark.parametrize("text", [
+    "a person walking", "a season of rain", "education center",
+    "a song about a storm", "a boycott protest", "babylonian warrior", "kidney beans",
+])
+def test_child_terms_match_whole_words(content_filter, text):
+    assert not content_filter.term_index.scan(text).has("child_related")
+
+
+def test_harmful_child_context_rule(content_filter):
+    is_safe, _, violation_type, _, _ = content_filter.check_content("violently beaten schoolgirl")
+
+    assert not is_safe
+    assert violation_type == "harmful_child_content"
+
+
+@pytest.mark.parametrize("text", [
+    "a song about a violent storm",
+    "a boycott protest turned violent",
+    "babylonian warrior killing enemies with a sword",
+])
+def test_words_starting_with_child_terms_are_not_children(content_filter, text):
+    assert content_filter.match_term_rules(text) is None
+
+
+def test_whole_words_and_inflections():
+    index = TermIndex({"animal": ["cat"], "child": ["son"]})
+
+    assert index.scan("two cats").has("animal")
+    assert not index.scan("education").has("animal")
+    assert index.scan("three sons").has("child")
+    assert not index.scan("songs").has("child")
+    assert not index.scan("person").has("child")
+
+
+def test_stems_match_any_word_they_start():
+    index = TermIndex({"harmful": ["violent*"], "child": ["little girl"]})
+
+    assert index.scan("violently").has("harmful")
+    assert not index.scan("violet").has("harmful")
+    assert index.scan("two little girls").has("child")
+    assert not index.scan("a little dog and a girl").has("child")
@@ -0,0 +1,53 @@
+"""
+Tests for the write-behind journal.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from src.infrastructure.database.database_service import DatabaseService
+from src.infrastructure.database.write_behind_journal import MAX_WRITE_ATTEMPTS, WriteBehindJournal
+
+
+@pytest.fixture
+def database_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(DatabaseService, "_instance", None)
+    service = DatabaseService(db_path=str(tmp_path / "database.db"))
+    conn = sqlite3.connect(service.db_path)
+    conn.execute("CREATE TABLE items (id TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    conn.commit()
+    conn.close()
+    return service
+
+
+def rows(database_service):
+    conn = sqlite3.connect(database_service.db_path)
+    try:
+        return dict(conn.execute("SELECT id, count FROM items").fetchall())
+    finally:
+        conn.close()
+
+
+def test_bad_row_does_not_block_other_writes(database_service):
+    async def run():
+        journal = WriteBehindJournal(database_service, flush_interval=60)
+        await journal.start()
+        await journal.upsert("items", "id", {"id": "a", "count": 1})
+        await journal.upsert("items", "id", {"id": "bad", "count": None})
+        await journal.upsert("items", "id", {"id": "b", "count": 2})
+        await journal.flush()
+        assert rows(database_service) == {"a": 1, "b": 2}
+        assert journal.pending_count == 1
+
+        for _ in range(MAX_WRITE_ATTEMPTS - 1):
+            await journal.flush()
+        assert journal.pending_count == 0
+        assert len(journal.dead_letters) == 1
+
+        await journal.upsert("items", "id", {"id": "c", "count": 3})
+        await journal.close()
+        assert rows(database_service) == {"a": 1, "b": 2, "c": 3}
+
+    asyncio.run(run())